@@ -18,6 +18,8 @@
 #
 # Identifies and parses Application Compatibility Shim Cache entries for forensic data.
 
+from __future__ import print_function
+
 import sys
 import struct
 import zipfile
@@ -25,10 +27,25 @@ import argparse
 import binascii
 import datetime
 import codecs
-import cStringIO as sio
-import xml.etree.cElementTree as et
+import numbers
+import hashlib
+import itertools
+import multiprocessing
 from os import path
 from csv import writer
+from collections import namedtuple
+
+try:
+    import xml.etree.cElementTree as et
+except ImportError:
+    # Removed in Python 3.9, the C implementation is used by default since 3.3
+    import xml.etree.ElementTree as et
+
+try:
+    from helper_scripts import filetime, hive_reader
+except ImportError:
+    import filetime
+    import hive_reader
 
 # Values used by Windows 5.2 and 6.0 (Server 2003 through Vista/Server 2008)
 CACHE_MAGIC_NT5_2 = 0xbadc0ffe
@@ -51,28 +68,52 @@ MAX_PATH = 520
 
 # Values used by Windows 8
 WIN8_STATS_SIZE = 0x80
-WIN8_MAGIC = '00ts'
+WIN8_MAGIC = b'00ts'
 
 # Magic value used by Windows 8.1
-WIN81_MAGIC = '10ts'
+WIN81_MAGIC = b'10ts'
 
 # Values used by Windows 10
 WIN10_STATS_SIZE = 0x30
 WIN10_CREATORS_STATS_SIZE = 0x34
-WIN10_MAGIC = '10ts'
+WIN10_MAGIC = b'10ts'
 CACHE_HEADER_SIZE_NT6_4 = 0x30
 CACHE_MAGIC_NT6_4 = 0x30
 
+# Size of the reads of a .reg export
+REG_CHUNK_SIZE = 1 << 20
+
+# Root key names of hives saved from below the ControlSet
+partial_hive_path = ('Session Manager', 'AppCompatCache', 'AppCompatibility')
+
+# Precompiled entry layouts, keyed by is32bit for the NT5/NT6 tables
+NT5_ENTRY = {True: struct.Struct('<2H 3L 2L'), False: struct.Struct('<2H 4x Q 2L 2L')}
+NT6_ENTRY = {True: struct.Struct('<2H 7L'), False: struct.Struct('<2H 4x Q 4L 2Q')}
+APPHELP_ENTRY_HEADER = struct.Struct('<4sLL')
+WIN8_ENTRY_DATA = struct.Struct('<LLLLL')
+WIN10_ENTRY_DATA = struct.Struct('<LL')
+UINT16 = struct.Struct('<H')
+
 bad_entry_data = 'N/A'
 g_verbose = False
 g_usebom = False
 output_header  = ["Last Modified", "Last Update", "Path", "File Size", "Exec Flag"]
+# Entry of parse_appcompat, the dates are raw FILETIMEs or bad_entry_data.
+AppCompatRecord = namedtuple("AppCompatRecord", ["last_modified", "last_update", "path", "file_size", "exec_flag"])
+zip_header = ("Hostname", "Last Modified", "Last Update", "Path", "File Size", "File Executed", "Key Path")
+# Columns of the Last Modified and Last Update dates, MIR zip rows start with
+# the hostname
+DATE_COLUMNS = (0, 1)
+ZIP_DATE_COLUMNS = (1, 2)
 
 # Date Formats
 DATE_MDY = "%m/%d/%y %H:%M:%S"
 DATE_ISO = "%Y-%m-%d %H:%M:%S"
 g_timeformat = DATE_ISO
 
+# strftime of Python 2 does not format years before 1900, such dates are bad entry data
+MIN_FILETIME = filetime.year_start(1900)
+
 # Shim Cache format used by Windows 5.2 and 6.0 (Server 2003 through Vista/Server 2008)
 class CacheEntryNt5(object):
 
@@ -84,10 +125,7 @@ class CacheEntryNt5(object):
 
     def update(self, data):
 
-        if self.is32bit:
-            entry = struct.unpack('<2H 3L 2L', data)
-        else:
-            entry = struct.unpack('<2H 4x Q 2L 2L', data)
+        entry = NT5_ENTRY[self.is32bit].unpack(data)
         self.wLength = entry[0]
         self.wMaximumLength =  entry[1]
         self.Offset = entry[2]
@@ -114,10 +152,7 @@ class CacheEntryNt6(object):
 
     def update(self, data):
 
-        if self.is32bit:
-            entry = struct.unpack('<2H 7L', data)
-        else:
-            entry = struct.unpack('<2H 4x Q 4L 2Q', data)
+        entry = NT6_ENTRY[self.is32bit].unpack(data)
         self.wLength = entry[0]
         self.wMaximumLength =  entry[1]
         self.Offset = entry[2]
@@ -144,18 +179,115 @@ def convert_filetime(dwLowDateTime, dwHighDateTime):
         temp_time = dwHighDateTime
         temp_time <<= 32
         temp_time |= dwLowDateTime
-        return date + datetime.timedelta(microseconds=temp_time/10)
-    except OverflowError, err:
+        return date + datetime.timedelta(microseconds=temp_time // 10)
+    except OverflowError as err:
         return None
 
+# Entries keep their dates as raw FILETIMEs until written, dates that
+# can't be formatted are bad entry data right away.
+def make_filetime(dwLowDateTime, dwHighDateTime):
+
+    value = (dwHighDateTime << 32) | dwLowDateTime
+    if not filetime.is_valid(value, MIN_FILETIME):
+        return bad_entry_data
+    return value
+
+# Format the raw FILETIMEs of the date columns, one batch per column.
+def format_dates(rows, columns=DATE_COLUMNS):
+
+    for column in columns:
+        index = [i for i, row in enumerate(rows)
+                 if len(row) > column and isinstance(row[column], numbers.Integral)]
+        dates = filetime.to_strings([rows[i][column] for i in index], g_timeformat,
+                                    minimum=MIN_FILETIME, invalid=bad_entry_data)
+        for i, date in zip(index, dates):
+            rows[i][column] = date
+    return rows
+
+# Unpack count fixed size entries starting at offset.
+def iter_entries(layout, buf, offset, count):
+
+    table = buf[offset:offset + layout.size * count]
+    if len(table) < layout.size * count:
+        raise struct.error("Shim Cache data is truncated")
+    # Struct.iter_unpack is only available on Python 3
+    if hasattr(layout, 'iter_unpack'):
+        return layout.iter_unpack(table)
+    return (layout.unpack_from(table, offset) for offset in range(0, len(table), layout.size))
+
+# Decode UTF-16 path bytes. Paths are UTF-8 byte strings on Python 2 and text
+# on Python 3, both are written out as the same UTF-8 bytes.
+if sys.version_info[0] < 3:
+    def decode_path(raw, errors='replace'):
+        return raw.decode('utf-16le', errors).encode('utf-8')
+else:
+    def decode_path(raw, errors='replace'):
+        return raw.decode('utf-16le', errors)
+
+# Decode a UNICODE_STRING path of the cache data.
+def read_path(buf, offset, length):
+
+    path = decode_path(buf[offset:offset + length].tobytes())
+    return path.replace("\\??\\", "")
+
+# Open the CSV output file, in text mode on Python 3.
+def open_csv(outfile):
+
+    if sys.version_info[0] < 3:
+        f = open(outfile, 'wb')
+        bom = codecs.BOM_UTF8
+    else:
+        f = open(outfile, 'w', newline='', encoding='utf-8')
+        bom = u'\ufeff'
+    if g_usebom:
+        f.write(bom)
+    return f
+
+# Order preserving duplicate removal. Rows are compared as tuples through a
+# set, in streaming mode only a digest of each row is kept so rows can be
+# written out as they come while deduplicating across many inputs. Raw
+# The raw FILETIMEs of the date columns are compared at the one second
+# resolution of the written dates, like the formatted dates were. Other
+# columns, such as the XP file size, are compared as they are.
+class RowDeduplicator(object):
+
+    def __init__(self, streaming=False, date_columns=DATE_COLUMNS):
+
+        self.streaming = streaming
+        self.date_columns = date_columns
+        self.seen = set()
+
+    def key(self, row):
+
+        key = list(row)
+        for column in self.date_columns:
+            if len(key) > column and isinstance(key[column], numbers.Integral):
+                key[column] //= filetime.HUNDREDS_OF_NANOSECONDS
+        key = tuple(key)
+        if self.streaming:
+            return hashlib.sha1(repr(key).encode('utf-8')).digest()
+        return key
+
+    # Return True the first time a row is seen.
+    def add(self, row):
+
+        key = self.key(row)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+    # Yield the rows of an iterable that were not seen before.
+    def filter(self, rows):
+
+        for row in rows:
+            if self.add(row):
+                yield row
+
 # Return a unique list while preserving ordering.
 def unique_list(li):
 
-    ret_list = []
-    for entry in li:
-        if entry not in ret_list:
-            ret_list.append(entry)
-    return ret_list
+    return list(RowDeduplicator().filter(li))
 
 # Write the Log.
 def write_it(rows, outfile=None):
@@ -163,28 +295,32 @@ def write_it(rows, outfile=None):
     try:
 
         if not rows:
-            print "[-] No data to write..."
+            print("[-] No data to write...")
             return
 
+        # Dates are formatted here, MIR zip rows start with the hostname.
+        if rows[0][0] == "Hostname":
+            format_dates(rows, ZIP_DATE_COLUMNS)
+        else:
+            format_dates(rows)
+
         if not outfile:
             for row in rows:
-                print " ".join(["%s"%x for x in row])
+                print(" ".join(["%s"%x for x in row]))
         else:
-            print "[+] Writing output to %s..."%outfile
+            print("[+] Writing output to %s..."%outfile)
             try:
-                f = open(outfile, 'wb')
-                if g_usebom:
-                    f.write(codecs.BOM_UTF8)
+                f = open_csv(outfile)
                 csv_writer = writer(f, delimiter=',')
                 csv_writer.writerow(["date","","path","",""])
                 csv_writer.writerows(rows)
                 f.close()
-            except IOError, err:
-                print "[-] Error writing output file: %s" % str(err)
+            except IOError as err:
+                print("[-] Error writing output file: %s" % str(err))
                 return
 
-    except UnicodeEncodeError, err:
-        print "[-] Error writing output file: %s" % str(err)
+    except UnicodeEncodeError as err:
+        print("[-] Error writing output file: %s" % str(err))
         return
 
 # Read the Shim Cache format, return a list of last modified dates/paths.
@@ -210,14 +346,14 @@ def read_cache(cachebin, quiet=False):
             if (test_max_size-test_size == 2 and
                 struct.unpack("<L", cachebin[12:16])[0] ) == 0:
                 if not quiet:
-                    print "[+] Found 64bit Windows 2k3/Vista/2k8 Shim Cache data..."
+                    print("[+] Found 64bit Windows 2k3/Vista/2k8 Shim Cache data...")
                 entry = CacheEntryNt5(False)
                 return read_nt5_entries(cachebin, entry)
 
             # Otherwise it's 32-bit data.
             else:
                 if not quiet:
-                    print "[+] Found 32bit Windows 2k3/Vista/2k8 Shim Cache data..."
+                    print("[+] Found 32bit Windows 2k3/Vista/2k8 Shim Cache data...")
                 entry = CacheEntryNt5(True)
                 return read_nt5_entries(cachebin, entry)
 
@@ -237,90 +373,102 @@ def read_cache(cachebin, quiet=False):
                 struct.unpack("<L", cachebin[CACHE_HEADER_SIZE_NT6_1+4:
                 CACHE_HEADER_SIZE_NT6_1 + 8])[0] ) == 0:
                 if not quiet:
-                    print "[+] Found 64bit Windows 7/2k8-R2 Shim Cache data..."
+                    print("[+] Found 64bit Windows 7/2k8-R2 Shim Cache data...")
                 entry = CacheEntryNt6(False)
                 return read_nt6_entries(cachebin, entry)
             else:
                 if not quiet:
-                    print "[+] Found 32bit Windows 7/2k8-R2 Shim Cache data..."
+                    print("[+] Found 32bit Windows 7/2k8-R2 Shim Cache data...")
                 entry = CacheEntryNt6(True)
                 return read_nt6_entries(cachebin, entry)
 
         # This is WinXP cache data
         elif magic == WINXP_MAGIC32:
             if not quiet:
-                print "[+] Found 32bit Windows XP Shim Cache data..."
+                print("[+] Found 32bit Windows XP Shim Cache data...")
             return read_winxp_entries(cachebin)
 
         # Check the data set to see if it matches the Windows 8 format.
         elif len(cachebin) > WIN8_STATS_SIZE and cachebin[WIN8_STATS_SIZE:WIN8_STATS_SIZE+4] == WIN8_MAGIC:
             if not quiet:
-                print "[+] Found Windows 8/2k12 Apphelp Cache data..."
+                print("[+] Found Windows 8/2k12 Apphelp Cache data...")
             return read_win8_entries(cachebin, WIN8_MAGIC)
 
         # Windows 8.1 will use a different magic dword, check for it
         elif len(cachebin) > WIN8_STATS_SIZE and cachebin[WIN8_STATS_SIZE:WIN8_STATS_SIZE+4] == WIN81_MAGIC:
             if not quiet:
-                print "[+] Found Windows 8.1 Apphelp Cache data..."
+                print("[+] Found Windows 8.1 Apphelp Cache data...")
             return read_win8_entries(cachebin, WIN81_MAGIC)
 
         # Windows 10 will use a different magic dword, check for it
         elif len(cachebin) > WIN10_STATS_SIZE and cachebin[WIN10_STATS_SIZE:WIN10_STATS_SIZE+4] == WIN10_MAGIC:
             if not quiet:
-                print "[+] Found Windows 10 Apphelp Cache data..."
+                print("[+] Found Windows 10 Apphelp Cache data...")
             return read_win10_entries(cachebin, WIN10_MAGIC)
 
         # Windows 10 Creators Update will use a different STATS_SIZE, account for it
         elif len(cachebin) > WIN10_CREATORS_STATS_SIZE and cachebin[WIN10_CREATORS_STATS_SIZE:WIN10_CREATORS_STATS_SIZE+4] == WIN10_MAGIC:
             if not quiet:
-                print "[+] Found Windows 10 Creators Update Apphelp Cache data..."
+                print("[+] Found Windows 10 Creators Update Apphelp Cache data...")
             return read_win10_entries(cachebin, WIN10_MAGIC, creators_update=True)
 
         else:
-            print "[-] Got an unrecognized magic value of 0x%x... bailing" % magic
+            print("[-] Got an unrecognized magic value of 0x%x... bailing" % magic)
             return None
 
-    except (RuntimeError, TypeError, NameError), err:
-        print "[-] Error reading Shim Cache data: %s" % err
+    except (RuntimeError, TypeError, NameError) as err:
+        print("[-] Error reading Shim Cache data: %s" % err)
         return None
 
-# Read Windows 8/2k12/8.1 Apphelp Cache entry formats.
-def read_win8_entries(bin_data, ver_magic):
-    offset = 0
-    entry_meta_len = 12
-    entry_list = []
-
-    # Skip past the stats in the header
-    cache_data = bin_data[WIN8_STATS_SIZE:]
+# Walk the Windows 8/8.1/10 Apphelp Cache entries. Yields each entry's data
+# as a memoryview, no copy is made.
+def iter_apphelp_entries(buf, ver_magic):
 
-    data = sio.StringIO(cache_data)
-    while data.tell() < len(cache_data):
-        header = data.read(entry_meta_len)
+    offset = 0
+    while offset < len(buf):
         # Read in the entry metadata
         # Note: the crc32 hash is of the cache entry data
-        magic, crc32_hash, entry_len = struct.unpack('<4sLL', header)
+        magic, crc32_hash, entry_len = APPHELP_ENTRY_HEADER.unpack_from(buf, offset)
 
         # Check the magic tag
         if magic != ver_magic:
             raise Exception("Invalid version magic tag found: 0x%x" % struct.unpack("<L", magic)[0])
 
-        entry_data = sio.StringIO(data.read(entry_len))
+        offset += APPHELP_ENTRY_HEADER.size
+        yield buf[offset:offset + entry_len]
+        offset += entry_len
 
+# Parse an AppCompatCache value held in memory, without any file round trip.
+# Yields the unique entries as AppCompatRecord, at most limit of them. The
+# records are built lazily, so a consumer can stop early.
+def parse_appcompat(bin_data, limit=None, quiet=False):
+
+    rows = read_cache(bin_data, quiet) or []
+    records = (AppCompatRecord(*row) for row in RowDeduplicator().filter(rows))
+    return itertools.islice(records, limit)
+
+# Read Windows 8/2k12/8.1 Apphelp Cache entry formats.
+def read_win8_entries(bin_data, ver_magic):
+    entry_list = []
+
+    # Skip past the stats in the header
+    cache_data = memoryview(bin_data)[WIN8_STATS_SIZE:]
+
+    for entry_data in iter_apphelp_entries(cache_data, ver_magic):
         # Read the path length
-        path_len = struct.unpack('<H', entry_data.read(2))[0]
+        path_len = UINT16.unpack_from(entry_data, 0)[0]
         if path_len == 0:
             path = 'None'
         else:
-            path = entry_data.read(path_len).decode('utf-16le', 'replace').encode('utf-8')
+            path = decode_path(entry_data[2:2 + path_len].tobytes())
 
         # Check for package data
-        package_len = struct.unpack('<H', entry_data.read(2))[0]
-        if package_len > 0:
-            # Just skip past the package data if present (for now)
-            entry_data.seek(package_len, 1)
+        # Just skip past the package data if present (for now)
+        package_len = UINT16.unpack_from(entry_data, 2 + path_len)[0]
 
         # Read the remaining entry data
-        flags, unk_1, low_datetime, high_datetime, unk_2 = struct.unpack('<LLLLL', entry_data.read(20))
+        flags, unk_1, low_datetime, high_datetime, unk_2 = WIN8_ENTRY_DATA.unpack_from(
+            entry_data, 4 + path_len + package_len)
 
         # Check the flag set in CSRSS
         if (flags & CSRSS_FLAG):
@@ -328,11 +476,7 @@ def read_win8_entries(bin_data, ver_magic):
         else:
             exec_flag = 'False'
 
-        last_mod_date = convert_filetime(low_datetime, high_datetime)
-        try:
-            last_mod_date = last_mod_date.strftime(g_timeformat)
-        except ValueError:
-            last_mod_date = bad_entry_data
+        last_mod_date = make_filetime(low_datetime, high_datetime)
 
         row = [last_mod_date, 'N/A', path, 'N/A', exec_flag]
         entry_list.append(row)
@@ -342,49 +486,33 @@ def read_win8_entries(bin_data, ver_magic):
 # Read Windows 10 Apphelp Cache entry format
 def read_win10_entries(bin_data, ver_magic, creators_update=False):
 
-    offset = 0
-    entry_meta_len = 12
     entry_list = []
 
     # Skip past the stats in the header
     if creators_update:
-        cache_data = bin_data[WIN10_CREATORS_STATS_SIZE:]
+        cache_data = memoryview(bin_data)[WIN10_CREATORS_STATS_SIZE:]
     else:
-        cache_data = bin_data[WIN10_STATS_SIZE:]
-
-    data = sio.StringIO(cache_data)
-    while data.tell() < len(cache_data):
-        header = data.read(entry_meta_len)
-        # Read in the entry metadata
-        # Note: the crc32 hash is of the cache entry data
-        magic, crc32_hash, entry_len = struct.unpack('<4sLL', header)
-
-        # Check the magic tag
-        if magic != ver_magic:
-            raise Exception("Invalid version magic tag found: 0x%x" % struct.unpack("<L", magic)[0])
-
-        entry_data = sio.StringIO(data.read(entry_len))
+        cache_data = memoryview(bin_data)[WIN10_STATS_SIZE:]
 
+    for entry_data in iter_apphelp_entries(cache_data, ver_magic):
         # Read the path length
-        path_len = struct.unpack('<H', entry_data.read(2))[0]
-        if path_len == 0:
-            path = 'None'
-        else:
-            path = entry_data.read(path_len).decode('utf-16le', 'replace').encode('utf-8')
+        path_len = UINT16.unpack_from(entry_data, 0)[0]
 
         # Read the remaining entry data
-        low_datetime, high_datetime = struct.unpack('<LL', entry_data.read(8))
+        low_datetime, high_datetime = WIN10_ENTRY_DATA.unpack_from(entry_data, 2 + path_len)
 
-        last_mod_date = convert_filetime(low_datetime, high_datetime)
-        try:
-            last_mod_date = last_mod_date.strftime(g_timeformat)
-        except ValueError:
-            last_mod_date = bad_entry_data
+        last_mod_date = make_filetime(low_datetime, high_datetime)
 
         # Skip the unrecognized Microsoft App entry format for now
         if last_mod_date == bad_entry_data:
             continue
 
+        # Paths are only decoded for the entries that are kept
+        if path_len == 0:
+            path = 'None'
+        else:
+            path = decode_path(entry_data[2:2 + path_len].tobytes())
+
         row = [last_mod_date, 'N/A', path, 'N/A', 'N/A']
         entry_list.append(row)
 
@@ -395,62 +523,51 @@ def read_nt5_entries(bin_data, entry):
 
     try:
         entry_list = []
-        contains_file_size = False
-        entry_size = entry.size()
+        seen = RowDeduplicator()
         exec_flag = ''
 
         num_entries = struct.unpack('<L', bin_data[4:8])[0]
         if num_entries == 0:
             return None
 
+        buf = memoryview(bin_data)
+        entries = list(iter_entries(NT5_ENTRY[entry.is32bit], buf, CACHE_HEADER_SIZE_NT5_2, num_entries))
+
         # On Windows Server 2008/Vista, the filesize is swapped out of this
         # structure with two 4-byte flags. Check to see if any of the values in
         # "dwFileSizeLow" are larger than 2-bits. This indicates the entry contained file sizes.
-        for offset in xrange(CACHE_HEADER_SIZE_NT5_2, (num_entries * entry_size) + CACHE_HEADER_SIZE_NT5_2,
-                             entry_size):
-
-            entry.update(bin_data[offset:offset+entry_size])
-
-            if entry.dwFileSizeLow > 3:
-                contains_file_size = True
-                break
+        contains_file_size = any(dwFileSizeLow > 3 for (wLength, wMaximumLength, Offset, dwLowDateTime,
+                                                        dwHighDateTime, dwFileSizeLow, dwFileSizeHigh) in entries)
 
         # Now grab all the data in the value.
-        for offset in xrange(CACHE_HEADER_SIZE_NT5_2, (num_entries  * entry_size) + CACHE_HEADER_SIZE_NT5_2,
-                             entry_size):
+        for (wLength, wMaximumLength, Offset, dwLowDateTime, dwHighDateTime,
+             dwFileSizeLow, dwFileSizeHigh) in entries:
 
-            entry.update(bin_data[offset:offset+entry_size])
-
-            last_mod_date = convert_filetime(entry.dwLowDateTime, entry.dwHighDateTime)
-            try:
-                last_mod_date = last_mod_date.strftime(g_timeformat)
-            except ValueError:
-                last_mod_date = bad_entry_data
-            path = bin_data[entry.Offset:entry.Offset + entry.wLength].decode('utf-16le', 'replace').encode('utf-8')
-            path = path.replace("\\??\\", "")
+            last_mod_date = make_filetime(dwLowDateTime, dwHighDateTime)
+            path = read_path(buf, Offset, wLength)
 
             # It contains file size data.
             if contains_file_size:
-                hit = [last_mod_date, 'N/A', path, str(entry.dwFileSizeLow), 'N/A']
-                if hit not in entry_list:
+                hit = [last_mod_date, 'N/A', path, str(dwFileSizeLow), 'N/A']
+                if seen.add(hit):
                     entry_list.append(hit)
 
             # It contains flags.
             else:
                 # Check the flag set in CSRSS
-                if (entry.dwFileSizeLow & CSRSS_FLAG):
+                if (dwFileSizeLow & CSRSS_FLAG):
                     exec_flag = 'True'
                 else:
                     exec_flag = 'False'
 
                 hit = [last_mod_date, 'N/A', path, 'N/A', exec_flag]
-                if hit not in entry_list:
+                if seen.add(hit):
                     entry_list.append(hit)
 
         return entry_list
 
-    except (RuntimeError, ValueError, NameError), err:
-        print "[-] Error reading Shim Cache data: %s..." % err
+    except (RuntimeError, ValueError, NameError) as err:
+        print("[-] Error reading Shim Cache data: %s..." % err)
         return None
 
 # Read the Shim Cache Windows 7/2k8-R2 entry format,
@@ -459,43 +576,36 @@ def read_nt6_entries(bin_data, entry):
 
     try:
         entry_list = []
+        seen = RowDeduplicator()
         exec_flag = ""
-        entry_size = entry.size()
         num_entries = struct.unpack('<L', bin_data[4:8])[0]
 
         if num_entries == 0:
             return None
 
         # Walk each entry in the data structure.
-        for offset in xrange(CACHE_HEADER_SIZE_NT6_1,
-                             num_entries*entry_size + CACHE_HEADER_SIZE_NT6_1,
-                             entry_size):
+        buf = memoryview(bin_data)
+        for (wLength, wMaximumLength, Offset, dwLowDateTime, dwHighDateTime, FileFlags, Flags,
+             BlobSize, BlobOffset) in iter_entries(NT6_ENTRY[entry.is32bit], buf, CACHE_HEADER_SIZE_NT6_1,
+                                                   num_entries):
 
-            entry.update(bin_data[offset:offset+entry_size])
-            last_mod_date = convert_filetime(entry.dwLowDateTime,
-                                             entry.dwHighDateTime)
-            try:
-                last_mod_date = last_mod_date.strftime(g_timeformat)
-            except ValueError:
-                last_mod_date = 'N/A'
-            path = (bin_data[entry.Offset:entry.Offset +
-                             entry.wLength].decode('utf-16le','replace').encode('utf-8'))
-            path = path.replace("\\??\\", "")
+            last_mod_date = make_filetime(dwLowDateTime, dwHighDateTime)
+            path = read_path(buf, Offset, wLength)
 
             # Test to see if the file may have been executed.
-            if (entry.FileFlags & CSRSS_FLAG):
+            if (FileFlags & CSRSS_FLAG):
                 exec_flag = 'True'
             else:
                 exec_flag = 'False'
 
             hit = [last_mod_date, 'N/A', path, 'N/A', exec_flag]
 
-            if hit not in entry_list:
+            if seen.add(hit):
                 entry_list.append(hit)
         return entry_list
 
-    except (RuntimeError, ValueError, NameError), err:
-        print '[-] Error reading Shim Cache data: %s...' % err
+    except (RuntimeError, ValueError, NameError) as err:
+        print('[-] Error reading Shim Cache data: %s...' % err)
         return None
 
 # Read the WinXP Shim Cache data. Some entries can be missing data but still
@@ -503,6 +613,7 @@ def read_nt6_entries(bin_data, entry):
 def read_winxp_entries(bin_data):
 
     entry_list = []
+    seen = RowDeduplicator()
 
     try:
 
@@ -510,16 +621,16 @@ def read_winxp_entries(bin_data):
         if num_entries == 0:
             return None
 
-        for offset in xrange(WINXP_HEADER_SIZE32,
+        for offset in range(WINXP_HEADER_SIZE32,
                              (num_entries*WINXP_ENTRY_SIZE32) + WINXP_HEADER_SIZE32, WINXP_ENTRY_SIZE32):
 
             # No size values are included in these entries, so search for utf-16 terminator.
-            path_len = bin_data[offset:offset+(MAX_PATH + 8)].find("\x00\x00")
+            path_len = bin_data[offset:offset+(MAX_PATH + 8)].find(b"\x00\x00")
 
             # if path is corrupt, procede to next entry.
             if path_len == 0:
                 continue
-            path =  bin_data[offset:offset+path_len + 1].decode('utf-16le').encode('utf-8')
+            path = decode_path(bin_data[offset:offset+path_len + 1], 'strict')
 
             # Clean up the pathname.
             path = path.replace('\\??\\', '')
@@ -528,12 +639,7 @@ def read_winxp_entries(bin_data):
             entry_data = (offset+(MAX_PATH+8))
 
             # Get last mod time.
-            last_mod_time = struct.unpack('<2L', bin_data[entry_data:entry_data+8])
-            try:
-                last_mod_time = convert_filetime(last_mod_time[0],
-                                                 last_mod_time[1]).strftime(g_timeformat)
-            except ValueError:
-                last_mod_time = 'N/A'
+            last_mod_time = make_filetime(*struct.unpack('<2L', bin_data[entry_data:entry_data+8]))
 
             # Get last file size.
             file_size = struct.unpack('<2L', bin_data[entry_data + 8:entry_data + 16])[0]
@@ -541,89 +647,124 @@ def read_winxp_entries(bin_data):
                 file_size = bad_entry_data
 
             # Get last update time.
-            exec_time = struct.unpack('<2L', bin_data[entry_data + 16:entry_data + 24])
-            try:
-                exec_time = convert_filetime(exec_time[0],
-                                             exec_time[1]).strftime(g_timeformat)
-            except ValueError:
-                exec_time = bad_entry_data
+            exec_time = make_filetime(*struct.unpack('<2L', bin_data[entry_data + 16:entry_data + 24]))
 
             hit = [last_mod_time, exec_time, path, file_size, 'N/A']
-            if hit not in entry_list:
+            if seen.add(hit):
                 entry_list.append(hit)
         return entry_list
 
-    except (RuntimeError, ValueError, NameError), err:
-        print "[-] Error reading Shim Cache data %s" % err
+    except (RuntimeError, ValueError, NameError) as err:
+        print("[-] Error reading Shim Cache data %s" % err)
         return None
 
-# Get Shim Cache data from a registry hive.
-def read_from_hive(hive):
-    out_list = []
-    tmp_list = []
+# Yield (value name or key path, AppCompatCache data) of a registry hive. The
+# hive is memory mapped and only the cells leading to the values are read.
+def iter_hive_cache(hive):
+
+    with hive_reader.Hive(hive) as reg:
+        root = reg.root()
+
+        # Partial hive
+        if root.name in partial_hive_path:
+            if root.name == 'Session Manager':
+                # Only Session Manager
+                # For example extracted with: reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager" "c:\temp\SessionManager.hve" /y
+                print("[+] Partial hive -- 'Session Manager'")
+                root = root.subkey('AppCompatCache')
+                if root is None:
+                    return
+                print("[+] Partial hive -- 'AppCompatCache' or 'AppCompatibility'")
+            # Partial hive AppCompatCache or AppCompatibility
+            # reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager\AppCompatCache" "c:\temp\appCompatCache.hve" /y
+            # reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager\AppCompatibility" "c:\temp\AppCompatibility.hve" /y
+            for value in root.values():
+                yield value.name, value.data
+            return
+
+        # Complete hive, check each ControlSet.
+        for key in root.subkeys():
+            if 'controlset' not in key.name.lower():
+                continue
+            session_man_key = key.find_key('Control\\Session Manager')
+            if session_man_key is None:
+                continue
+            for subkey in session_man_key.subkeys():
+                # Read the Shim Cache structure.
+                if ('appcompatibility' in subkey.name.lower() or
+                    'appcompatcache' in subkey.name.lower()):
+                    value = subkey.value('AppCompatCache')
+                    if value is not None:
+                        yield subkey.path, value.data
+
+# Same as iter_hive_cache through Registry.py, which builds the full key and
+# value objects. Kept to compare the two readers.
+def iter_registry_cache(hive):
 
     # Check for dependencies.
     try:
         from Registry import Registry
     except ImportError:
-        print "[-] Hive parsing requires Registry.py... Didn\'t find it, bailing..."
+        print("[-] Hive parsing requires Registry.py... Didn\'t find it, bailing...")
         sys.exit(2)
 
     try:
         reg = Registry.Registry(hive)
-    except example_scripts.helper_scripts.shim_cache_parser.Registry.RegistryParse.ParseException, err:
-        print "[-] Error parsing %s: %s" % (hive, err)
+    except Registry.RegistryParse.ParseException as err:
+        print("[-] Error parsing %s: %s" % (hive, err))
         sys.exit(1)
 
     # Partial hive
-    partial_hive_path = ('Session Manager', 'AppCompatCache', 'AppCompatibility')
     if reg.root().path() in partial_hive_path:
         if reg.root().path() == 'Session Manager':
-            # Only Session Manager
-            # For example extracted with: reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager" "c:\temp\SessionManager.hve" /y
-            print "[+] Partial hive -- 'Session Manager'"
-            if reg.root().find_key('AppCompatCache').values():
-                print "[+] Partial hive -- 'AppCompatCache' or 'AppCompatibility'"
+            print("[+] Partial hive -- 'Session Manager'")
+            try:
                 keys = reg.root().find_key('AppCompatCache').values()
+            except Registry.RegistryKeyNotFoundException:
+                return
+            print("[+] Partial hive -- 'AppCompatCache' or 'AppCompatibility'")
         else:
-            # Partial hive AppCompatCache or AppCompatibility
-            # reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager\AppCompatCache" "c:\temp\appCompatCache.hve" /y
-            # reg save "HKLM\SYSTEM\CurrentControlSet\Control\Session Manager\AppCompatibility" "c:\temp\AppCompatibility.hve" /y
             keys = reg.root().values()
         for k in keys:
-            bin_data = str(k.value())
-            tmp_list = read_cache(bin_data)
+            yield k.name(), bytes(k.value())
+        return
+
+    # Complete hive
+    for key in reg.root().subkeys():
+        # Check each ControlSet.
+        try:
+            if 'controlset' in key.name().lower():
+                session_man_key = reg.open('%s\\Control\\Session Manager' % key.name())
+                for subkey in session_man_key.subkeys():
+                    # Read the Shim Cache structure.
+                    if ('appcompatibility' in subkey.name().lower() or
+                        'appcompatcache' in subkey.name().lower()):
+                        yield subkey.path(), bytes(subkey['AppCompatCache'].value())
+
+        except (Registry.RegistryKeyNotFoundException, Registry.RegistryValueNotFoundException):
+            continue
+
+# Get Shim Cache data from a registry hive. The values are read with
+# iter_hive_cache unless another reader is given.
+def read_from_hive(hive, reader=iter_hive_cache, quiet=False):
+    out_list = []
+    seen = RowDeduplicator()
+    tmp_list = []
+
+    try:
+        for name, bin_data in reader(hive):
+            tmp_list = read_cache(bin_data, quiet)
 
             if tmp_list:
                 for row in tmp_list:
                     if g_verbose:
-                        row.append(k.name())
-                    if row not in out_list:
+                        row.append(name)
+                    if seen.add(row):
                         out_list.append(row)
-    else:
-        # Complete hive
-        root = reg.root().subkeys()
-        for key in root:
-            # Check each ControlSet.
-            try:
-                if 'controlset' in key.name().lower():
-                    session_man_key = reg.open('%s\\Control\\Session Manager' % key.name())
-                    for subkey in session_man_key.subkeys():
-                        # Read the Shim Cache structure.
-                        if ('appcompatibility' in subkey.name().lower() or
-                            'appcompatcache' in subkey.name().lower()):
-                            bin_data = str(subkey['AppCompatCache'].value())
-                            tmp_list = read_cache(bin_data)
-
-                            if tmp_list:
-                                for row in tmp_list:
-                                    if g_verbose:
-                                        row.append(subkey.path())
-                                    if row not in out_list:
-                                        out_list.append(row)
 
-            except Registry.RegistryKeyNotFoundException:
-                continue
+    except hive_reader.HiveError as err:
+        print("[-] Error parsing %s: %s" % (hive, err))
+        sys.exit(1)
 
     if len(out_list) == 0:
         return None
@@ -641,6 +782,7 @@ def read_from_hive(hive):
 # Get Shim Cache data from MIR registry output file.
 def read_mir(xml_file, quiet=False):
     out_list = []
+    seen = RowDeduplicator()
     tmp_list = []
 
     # Open the MIR output file.
@@ -651,8 +793,8 @@ def read_mir(xml_file, quiet=False):
 
             path_name = reg_item.find("Path").text
             if not path_name:
-                print "[-] Error XML missing Path"
-                print et.tostring(reg_item)
+                print("[-] Error XML missing Path")
+                print(et.tostring(reg_item))
                 reg_item.clear()
                 continue
             path_name = path_name.lower()
@@ -668,12 +810,12 @@ def read_mir(xml_file, quiet=False):
                     for row in tmp_list:
                         if g_verbose:
                             row.append(path_name)
-                        if row not in out_list:
+                        if seen.add(row):
                             out_list.append(row)
             reg_item.clear()
 
-    except (AttributeError, TypeError, IOError),  err:
-        print "[-] Error reading MIR XML: %s" % str(err)
+    except (AttributeError, TypeError, IOError) as err:
+        print("[-] Error reading MIR XML: %s" % str(err))
         return None
 
     if len(out_list) == 0:
@@ -689,63 +831,87 @@ def read_mir(xml_file, quiet=False):
             out_list.insert(0, output_header)
             return out_list
 
+# Yield the lines of a .reg file a chunk at a time. UTF-16 exports are decoded
+# incrementally, anything else is read as ANSI, which is not fully supported.
+def iter_reg_lines(reg_file, chunk_size=REG_CHUNK_SIZE):
+
+    with open(reg_file, 'rb') as f:
+        # At least the byte order mark is needed to pick the decoder
+        chunk = f.read(max(chunk_size, 2))
+        if chunk[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+            decoder = codecs.getincrementaldecoder('utf-16')('replace')
+        else:
+            decoder = codecs.getincrementaldecoder('latin-1')()
+
+        pending = u''
+        while chunk:
+            lines = (pending + decoder.decode(chunk)).split(u'\r\n')
+            # The last line may continue in the next chunk
+            pending = lines.pop()
+            for line in lines:
+                yield line
+            chunk = f.read(chunk_size)
+
+        for line in (pending + decoder.decode(b'', True)).split(u'\r\n'):
+            yield line
+
 # Get Shim Cache data from .reg file.
-# Finds the first key named "AppCompatCache" and parses the
-# Hex data that immediately follows. It's a brittle parser,
-# but the .reg format doesn't change too often.
+# Parses the Hex data of every "AppCompatCache" value of the
+# export, one per control set, and dedups their entries. It's a
+# brittle parser, but the .reg format doesn't change too often.
 def read_from_reg(reg_file, quiet=False):
     out_list = []
+    seen = RowDeduplicator()
 
     if not path.exists(reg_file):
         return None
 
-    f = open(reg_file, 'rb')
-    file_contents = f.read()
-    f.close()
-    try:
-        file_contents = file_contents.decode('utf-16')
-    except:
-        pass #.reg file should be UTF-16, if it's not, it might be ANSI, which is not fully supported here.
-
-    if not file_contents.startswith('Windows Registry Editor'):
-        print "[-] Unable to properly decode .reg file: %s" % reg_file
+    lines = iter_reg_lines(reg_file)
+    if not next(lines, u'').startswith('Windows Registry Editor'):
+        print("[-] Unable to properly decode .reg file: %s" % reg_file)
         return None
 
     path_name = None
-    relevant_lines = []
-    found_appcompat = False
+    hex_data = None
     appcompat_keys = 0
-    for line in file_contents.split("\r\n"):
-        if '\"appcompatcache\"=hex:' in line.lower():
-            relevant_lines.append(line.partition(":")[2])
-            found_appcompat = True
-        elif '\\appcompatcache]' in line.lower() or '\\appcompatibility]' in line.lower():
-            # The Registry path is not case sensitive. Case will depend on export parameter.
-            path_name = line.partition('[')[2].partition(']')[0]
-            appcompat_keys += 1
-        elif found_appcompat and "," in line and '\"' not in line:
-            relevant_lines.append(line)
-        elif found_appcompat and (len(line) == 0 or '\"' in line):
-            # begin processing a block
-            hex_str = "".join(relevant_lines).replace('\\', '').replace(' ', '').replace(',', '')
-            bin_data = binascii.unhexlify(hex_str)
-            tmp_list = read_cache(bin_data, quiet)
+    for line in lines:
+        if hex_data is None:
+            # Keys and values start their line, everything else is skipped
+            # without looking further.
+            first = line[:1]
+            if first == u'[':
+                lower = line.lower()
+                if '\\appcompatcache]' in lower or '\\appcompatibility]' in lower:
+                    # The Registry path is not case sensitive. Case will depend on export parameter.
+                    path_name = line.partition('[')[2].partition(']')[0]
+                    appcompat_keys += 1
+                continue
+            if first != u'"' or '\"appcompatcache\"=hex:' not in line.lower():
+                continue
+            hex_data = bytearray()
+            line = line.partition(":")[2]
+
+        # Decode the hex bytes of the line, a trailing backslash continues the value.
+        line = line.rstrip()
+        continued = line.endswith('\\')
+        hex_data += binascii.unhexlify(line.replace('\\', '').replace(' ', '').replace(',', ''))
+        if continued:
+            continue
 
-            if tmp_list:
-                for row in tmp_list:
-                    if g_verbose:
-                        row.append(path_name)
-                    if row not in out_list:
-                        out_list.append(row)
+        tmp_list = read_cache(bytes(hex_data), quiet)
+        if tmp_list:
+            for row in tmp_list:
+                if g_verbose:
+                    row.append(path_name)
+                if seen.add(row):
+                    out_list.append(row)
 
-            # reset variables for next block
-            found_appcompat = False
-            path_name = None
-            relevant_lines = []
-            break
+        # reset variables for next block
+        path_name = None
+        hex_data = None
 
     if appcompat_keys <= 0:
-        print "[-] Unable to find value in .reg file: %s" % reg_file
+        print("[-] Unable to find value in .reg file: %s" % reg_file)
         return None
 
     if len(out_list) == 0:
@@ -766,23 +932,27 @@ def get_local_data():
 
     tmp_list = []
     out_list = []
+    seen = RowDeduplicator()
     global g_verbose
 
     try:
         import _winreg as reg
     except ImportError:
-        print "[-] \'winreg.py\' not found... Is this a Windows system?"
-        sys.exit(1)
+        try:
+            import winreg as reg
+        except ImportError:
+            print("[-] \'winreg.py\' not found... Is this a Windows system?")
+            sys.exit(1)
 
     hReg = reg.ConnectRegistry(None, reg.HKEY_LOCAL_MACHINE)
     hSystem = reg.OpenKey(hReg, r'SYSTEM')
-    for i in xrange(1024):
+    for i in range(1024):
         try:
             control_name = reg.EnumKey(hSystem, i)
             if 'controlset' in control_name.lower():
                 hSessionMan = reg.OpenKey(hReg,
                                           'SYSTEM\\%s\\Control\\Session Manager' % control_name)
-                for i in xrange(1024):
+                for i in range(1024):
                     try:
                         subkey_name = reg.EnumKey(hSessionMan, i)
                         if ('appcompatibility' in subkey_name.lower()
@@ -797,7 +967,7 @@ def get_local_data():
                                 for row in tmp_list:
                                     if g_verbose:
                                         row.append(path_name)
-                                    if row not in out_list:
+                                    if seen.add(row):
                                         out_list.append(row)
                     except EnvironmentError:
                         break
@@ -817,14 +987,16 @@ def get_local_data():
             out_list.insert(0, output_header)
             return out_list
 
-# Read a MIR XML zip archive.
-def read_zip(zip_name):
+# Read a MIR XML zip archive. With unique, rows repeated across the archive
+# (such as several acquisitions of a host) are only kept once.
+def read_zip(zip_name, unique=False):
 
     zip_contents = []
     tmp_list = []
     final_list = []
     out_list = []
     hostname = ""
+    seen = RowDeduplicator(streaming=True, date_columns=ZIP_DATE_COLUMNS) if unique else None
 
     try:
         # Open the zip archive.
@@ -832,7 +1004,7 @@ def read_zip(zip_name):
         for zip_file in archive.infolist():
             zip_contents.append(zip_file.filename)
 
-        print "[+] Processing %d registry acquisitions..." % len(zip_contents)
+        print("[+] Processing %d registry acquisitions..." % len(zip_contents))
         for item in zip_contents:
             try:
                 if '_w32registry.xml' not in item:
@@ -849,31 +1021,125 @@ def read_zip(zip_name):
                 # Catch possibly corrupt MIR XML data.
                 try:
                     out_list = read_mir(xml_file, quiet=True)
-                except(struct.error, et.ParseError), err:
-                    print "[-] Error reading XML data from host: %s, data looks corrupt. Continuing..." % hostname
+                except(struct.error, et.ParseError) as err:
+                    print("[-] Error reading XML data from host: %s, data looks corrupt. Continuing..." % hostname)
                     continue
 
                 # Add the hostname to the entry list.
                 if not out_list or len(out_list) == 0:
                     continue
                 else:
-                    for li in out_list:
-                        if "Last Modified" not in li[0]:
-                            li.insert(0, hostname)
+                    for li in out_list[1:]:
+                        li.insert(0, hostname)
+                        if seen is None or seen.add(li):
                             final_list.append(li)
 
-            except IOError, err:
-                print "[-] Error opening file: %s in MIR archive: %s" % (item, err)
+            except IOError as err:
+                print("[-] Error opening file: %s in MIR archive: %s" % (item, err))
                 continue
         # Add the final header.
-        final_list.insert(0, ("Hostname", "Last Modified", "Last Update",
-                              "Path", "File Size", "File Executed", "Key Path"))
+        final_list.insert(0, zip_header)
         return final_list
 
-    except (IOError, zipfile.BadZipfile, struct.error), err:
-        print "[-] Error reading zip archive: %s" % zip_name
+    except (IOError, zipfile.BadZipfile, struct.error) as err:
+        print("[-] Error reading zip archive: %s" % zip_name)
         return None
 
+# Parse one MIR XML member of a zip archive in a worker process.
+# Returns (hostname, member, rows, error), errors don't stop the pool.
+def read_zip_member(task):
+
+    global g_verbose
+    zip_name, item, g_verbose = task
+
+    # Get the hostname from the MIR xml filename.
+    hostname = '-'.join(item.split('/').pop().split('-')[:-3])
+    try:
+        archive = zipfile.ZipFile(zip_name)
+        try:
+            out_list = read_mir(archive.open(item), quiet=True)
+        finally:
+            archive.close()
+    except (struct.error, et.ParseError) as err:
+        return hostname, item, None, "data looks corrupt"
+    except Exception as err:
+        return hostname, item, None, str(err)
+
+    rows = []
+    for li in (out_list or [])[1:]:
+        li.insert(0, hostname)
+        rows.append(li)
+    return hostname, item, rows, None
+
+# Read a MIR XML zip archive with a pool of worker processes, each one
+# reopens the archive. Yields the rows of each member as soon as it is parsed.
+def iter_zip(zip_name, workers=None, unique=False):
+
+    seen = RowDeduplicator(streaming=True, date_columns=ZIP_DATE_COLUMNS) if unique else None
+    try:
+        archive = zipfile.ZipFile(zip_name)
+        zip_contents = [zip_file.filename for zip_file in archive.infolist()
+                        if '_w32registry.xml' in zip_file.filename]
+        archive.close()
+    except (IOError, zipfile.BadZipfile) as err:
+        print("[-] Error reading zip archive: %s" % zip_name)
+        return
+
+    workers = workers or multiprocessing.cpu_count()
+    print("[+] Processing %d registry acquisitions with %d workers..." % (len(zip_contents), workers))
+    if not zip_contents:
+        return
+    pool = multiprocessing.Pool(min(workers, len(zip_contents)))
+    try:
+        tasks = [(zip_name, item, g_verbose) for item in zip_contents]
+        for hostname, item, rows, error in pool.imap_unordered(read_zip_member, tasks):
+            if error:
+                print("[-] Error reading XML data from host: %s (%s), %s. Continuing..." % (hostname, item, error))
+                continue
+            if seen is not None:
+                rows = [row for row in rows if seen.add(row)]
+            if rows:
+                yield rows
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Write the batches of rows of iter_zip as they arrive.
+def write_stream(batches, outfile=None):
+
+    count = 0
+    f = None
+    try:
+        if not outfile:
+            print(" ".join(zip_header))
+        else:
+            print("[+] Writing output to %s..." % outfile)
+            f = open_csv(outfile)
+            csv_writer = writer(f, delimiter=',')
+            csv_writer.writerow(["date","","path","",""])
+            csv_writer.writerow(zip_header)
+
+        for rows in batches:
+            format_dates(rows, ZIP_DATE_COLUMNS)
+            count += len(rows)
+            if f:
+                csv_writer.writerows(rows)
+            else:
+                for row in rows:
+                    print(" ".join(["%s"%x for x in row]))
+
+    except IOError as err:
+        print("[-] Error writing output file: %s" % str(err))
+    except UnicodeEncodeError as err:
+        print("[-] Error writing output file: %s" % str(err))
+    finally:
+        if f:
+            f.close()
+
+    if not count:
+        print("[-] No Shim Cache entries found...")
+
 # Do the work.
 def main(argv=[]):
 
@@ -887,6 +1153,10 @@ def main(argv=[]):
     parser.add_argument("-t","--isotime", action="store_const", dest="timeformat", const=DATE_ISO, default=DATE_MDY,
         help="Use YYYY-MM-DD ISO format instead of MM/DD/YY default")
     parser.add_argument("-B", "--bom", action="store_true", help="Write UTF8 BOM to CSV for easier Excel 2007+ import")
+    parser.add_argument("-u", "--unique", action="store_true",
+                        help="Remove rows repeated across the hosts of a MIR ZIP archive")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="Parse a MIR ZIP archive with this many processes, writing each host as it completes")
 
     group = parser.add_argument_group()
     group.add_argument("-o", "--out", metavar="FILE", help="Writes to CSV data to FILE (default is STDOUT)")
@@ -913,70 +1183,74 @@ def main(argv=[]):
 
     # Pull Shim Cache MIR XML.
     if args.mir:
-        print "[+] Reading MIR output XML file: %s..." % args.mir
+        print("[+] Reading MIR output XML file: %s..." % args.mir)
         try:
-            with file(args.mir, 'rb') as xml_data:
+            with open(args.mir, 'rb') as xml_data:
                 entries = read_mir(xml_data)
                 if not entries:
-                    print "[-] No Shim Cache entries found..."
+                    print("[-] No Shim Cache entries found...")
                     return
                 else:
                     write_it(entries, args.out)
-        except IOError, err:
-            print "[-] Error opening binary file: %s" % str(err)
+        except IOError as err:
+            print("[-] Error opening binary file: %s" % str(err))
             return
 
     # Process a MIR XML ZIP archive
+    elif args.zip and args.workers:
+        print("[+] Reading MIR XML zip archive: %s..." % args.zip)
+        write_stream(iter_zip(args.zip, args.workers, args.unique), args.out)
+
     elif args.zip:
-        print "[+] Reading MIR XML zip archive: %s..." % args.zip
-        entries = read_zip(args.zip)
+        print("[+] Reading MIR XML zip archive: %s..." % args.zip)
+        entries = read_zip(args.zip, args.unique)
         if not entries:
-            print "[-] No Shim Cache entries found..."
+            print("[-] No Shim Cache entries found...")
         else:
             write_it(entries, args.out)
 
     # Read the binary file.
     elif args.bin:
-        print "[+] Reading binary file: %s..." % args.bin
+        print("[+] Reading binary file: %s..." % args.bin)
         try:
-            with file(args.bin, 'rb') as bin_data:
+            with open(args.bin, 'rb') as bin_data:
                 bin_data = bin_data.read()
-        except IOError, err:
-            print "[-] Error opening binary file: %s" % str(err)
+        except IOError as err:
+            print("[-] Error opening binary file: %s" % str(err))
             return
         entries = read_cache(bin_data)
         if not entries:
-            print "[-] No Shim Cache entries found..."
+            print("[-] No Shim Cache entries found...")
         else:
             write_it(entries, args.out)
 
     # Read the key data from a registry hive.
     elif args.reg:
-        print "[+] Reading .reg file: %s..." % args.reg
+        print("[+] Reading .reg file: %s..." % args.reg)
         entries = read_from_reg(args.reg)
         if not entries:
-            print "[-] No Shim Cache entries found..."
+            print("[-] No Shim Cache entries found...")
         else:
             write_it(entries, args.out)
 
     elif args.hive:
-        print "[+] Reading registry hive: %s..." % args.hive
+        print("[+] Reading registry hive: %s..." % args.hive)
         try:
             entries = read_from_hive(args.hive)
             if not entries:
-                print "[-] No Shim Cache entries found..."
+                print("[-] No Shim Cache entries found...")
             else:
                 write_it(entries, args.out)
-        except IOError, err:
-            print "[-] Error opening hive file: %s" % str(err)
+        except IOError as err:
+            print("[-] Error opening hive file: %s" % str(err))
             return
 
     # Read the local Shim Cache data from the current system
     elif args.local:
-        print "[+] Dumping Shim Cache data from the current system..."
+        print("[+] Dumping Shim Cache data from the current system...")
         entries = get_local_data()
         if not entries:
-            print "[-] No Shim Cache entries found..."
+            print("[-] No Shim Cache entries found...")
         else:
             write_it(entries, args.out)
 
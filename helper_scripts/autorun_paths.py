@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Extraction of file paths from the data of autorun registry values.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+A value is scanned once, left to right, by a single precompiled pattern that
+recognises quoted strings, paths with spaces in their directories and bare
+words. Commas, quotes and whitespace separate the tokens, so comma separated
+lists need no special handling. Command line switches and words without an
+extension are dropped, and every path is returned once per value.
+EXAMPLE USAGE:::
+extract_paths('"C:\\Program Files\\App\\app.exe" /background,C:\\Windows\\helper.dll')
+"""
+
+import re
+
+# Directory names may hold spaces, a space is only allowed after a word without
+# a dot so "app.exe C:\file.txt" is still split after the executable. The
+# repetitions are bounded so a failed match can not rescan the rest of a long
+# value from every word.
+_SEGMENT = r'(?:[^\s",\\.]+[ \t]+){0,8}[^\s",\\]*'
+_FILE = r'(?:[^\s",\\.]+[ \t]+){0,8}[^\s",\\]*\.[^\s",\\]+'
+_PATH = r'[^\s",\\]*(?:\\' + _SEGMENT + r'){0,32}\\' + _FILE
+
+TOKEN = re.compile(r'"(?P<quoted>[^"]*)"|(?P<path>' + _PATH + r')|(?P<word>[^\s",]+)')
+SWITCH_PREFIXES = ('-', '/')
+
+
+def _tokens(data):
+    for match in TOKEN.finditer(data):
+        quoted = match.group('quoted')
+        if quoted is None:
+            yield match.group('path') or match.group('word')
+        elif ',' in quoted:
+            # A quoted list is split like an unquoted one
+            for token in _tokens(quoted):
+                yield token
+        else:
+            yield quoted.strip()
+
+
+def extract_paths(data):
+    """ Paths found in the data of a registry value, in order of appearance and
+        without duplicates.
+    """
+    paths = []
+    if not data:
+        return paths
+    seen = set()
+    for token in _tokens(data):
+        if '.' not in token or token.startswith(SWITCH_PREFIXES) or token in seen:
+            continue
+        seen.add(token)
+        paths.append(token)
+    return paths
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Throughput benchmarks for the helper parsers.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+EXAMPLE USAGE:::
+python -m helper_scripts.benchmark lzxpress C:/Windows/Prefetch/
+python -m helper_scripts.benchmark prefetch --synthetic 5000
+python -m helper_scripts.benchmark filetime --count 1000000
+python -m helper_scripts.benchmark shimcache --entries 10000
+python -m helper_scripts.benchmark hive --services 5000
+python -m helper_scripts.benchmark autoruns --copies 1000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+
+from helper_scripts import ShimCacheParser, autorun_paths, filetime, hive_reader, lzxpress, prefetch
+
+# Layout of the synthetic prefetch files per version:
+# (file information size, metrics entry size, volume entry size)
+SYNTHETIC_LAYOUTS = {17: (68, 20, 40), 23: (156, 32, 104), 26: (224, 32, 104)}
+
+
+def timed(function, repeat):
+    """ Run function repeat times and return the best wall clock time."""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def list_files(paths, extension):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(extension))
+        else:
+            files.append(path)
+    return files
+
+
+def report(name, count, nbytes, elapsed):
+    print("{0}: {1} items, {2} bytes in {3:.3f}s, {4:.1f} items/s, {5:.2f} MB/s".format(
+        name, count, nbytes, elapsed, count / elapsed if elapsed else 0.0,
+        nbytes / elapsed / (1024 * 1024) if elapsed else 0.0))
+
+
+def synthetic_prefetch(version, index, resource_count=60):
+    """ Build an uncompressed prefetch file of the given version (17, 23 or 26)."""
+    file_information_size, metrics_entry_size, volume_entry_size = SYNTHETIC_LAYOUTS[version]
+    executable = u"APP{0}.EXE".format(index)
+    resources = [u"\\DEVICE\\HARDDISKVOLUME2\\WINDOWS\\SYSTEM32\\MODULE{0}.DLL".format(i)
+                 for i in range(resource_count)]
+    directories = [u"\\DEVICE\\HARDDISKVOLUME2\\WINDOWS", u"\\DEVICE\\HARDDISKVOLUME2\\WINDOWS\\SYSTEM32"]
+
+    metrics_offset = 84 + file_information_size
+    trace_chains_offset = metrics_offset + metrics_entry_size * resource_count
+    filename_strings_offset = trace_chains_offset + 12 * resource_count
+    filename_strings = b"".join(name.encode("utf-16-le") + b"\x00\x00" for name in resources)
+    volumes_offset = filename_strings_offset + len(filename_strings)
+
+    volume_path = u"\\DEVICE\\HARDDISKVOLUME2".encode("utf-16-le") + b"\x00\x00"
+    directory_strings = b"".join(struct.pack("<H", len(name)) + name.encode("utf-16-le") + b"\x00\x00"
+                                 for name in directories)
+    volume = struct.pack("<IIQIIIII", volume_entry_size, len(volume_path) // 2 - 1, 130000000000000000 + index,
+                         0x1234abcd, 0, 0, volume_entry_size + len(volume_path), len(directories))
+    volume = volume.ljust(volume_entry_size, b"\x00") + volume_path + directory_strings
+
+    run_times = [131000000000000000 + index * 1000000 + i for i in range(8 if version == 26 else 1)]
+    last_run_time = b"".join(struct.pack("<Q", t) for t in run_times)
+    counts = struct.pack("<9I", metrics_offset, resource_count, trace_chains_offset, resource_count,
+                         filename_strings_offset, len(filename_strings), volumes_offset, 1, len(volume))
+    if version == 17:
+        file_information = counts + last_run_time + b"\x00" * 16 + struct.pack("<I", index) + b"\x00" * 4
+    else:
+        file_information = (counts + b"\x00" * 8 + last_run_time + b"\x00" * 16 + struct.pack("<I", index))
+        file_information = file_information.ljust(file_information_size, b"\x00")
+
+    metrics = b""
+    filename_offset = 0
+    for i, name in enumerate(resources):
+        if version == 17:
+            metrics += struct.pack("<IIIII", 0, 0, filename_offset, len(name), 0)
+        else:
+            metrics += struct.pack("<IIIIIIIHH", 0, 0, 0, filename_offset, len(name), 0, 1000 + i, 0, 1)
+        filename_offset += (len(name) + 1) * 2
+
+    body = file_information + metrics + b"\x00" * 12 * resource_count + filename_strings + volume
+    header = struct.pack("<4I", version, 0x41434353, 0, 84 + len(body)) + \
+        executable.encode("utf-16-le").ljust(60, b"\x00") + struct.pack("<I", 0x1000 + index) + b"\x00" * 4
+    return header + body
+
+
+def write_synthetic_prefetch(count):
+    """ Write count synthetic prefetch files, mixing versions, into a new temporary directory."""
+    directory = tempfile.mkdtemp(prefix="prefetch_benchmark")
+    versions = sorted(SYNTHETIC_LAYOUTS)
+    for i in range(count):
+        with open(os.path.join(directory, "APP{0}.EXE-{1:08X}.pf".format(i, 0x1000 + i)), "wb") as f:
+            f.write(synthetic_prefetch(versions[i % len(versions)], i))
+    return directory
+
+
+def benchmark_prefetch(args):
+    directory = write_synthetic_prefetch(args.synthetic) if args.synthetic else None
+    try:
+        files = list_files(args.paths or [directory], '.pf')
+        nbytes = sum(os.path.getsize(file_path) for file_path in files)
+        fields = prefetch.TIMESTAMP_FIELDS if args.timestamps_only else None
+        elapsed = timed(lambda: [prefetch.Prefetch(file_path, fields=fields) for file_path in files], args.repeat)
+        report("prefetch Prefetch" + (" (timestamps only)" if args.timestamps_only else ""), len(files), nbytes,
+               elapsed)
+    finally:
+        if directory:
+            shutil.rmtree(directory)
+
+
+def synthetic_filetime(index):
+    return 130000000000000000 + index * 123456789
+
+
+def synthetic_path(index):
+    return u"\\??\\C:\\Windows\\System32\\program{0}.exe".format(index).encode("utf-16-le")
+
+
+def synthetic_nt_cache(magic, header_size, entry_layout, count, fields):
+    """ Build an NT5/NT6 cache, a table of fixed size entries followed by the path strings."""
+    strings = b""
+    entries = b""
+    strings_offset = header_size + entry_layout.size * count
+    for i in range(count):
+        path = synthetic_path(i)
+        timestamp = synthetic_filetime(i)
+        # UNICODE_STRING maximum length is the length plus the terminator
+        entries += entry_layout.pack(len(path), len(path) + 2, strings_offset + len(strings),
+                                     timestamp & 0xFFFFFFFF, timestamp >> 32, *fields(i))
+        strings += path + b"\x00\x00"
+    return struct.pack("<LL", magic, count).ljust(header_size, b"\x00") + entries + strings
+
+
+def synthetic_apphelp_cache(stats_size, magic, count, win8):
+    data = b"\x00" * stats_size
+    for i in range(count):
+        path = synthetic_path(i)
+        timestamp = synthetic_filetime(i)
+        entry = struct.pack("<H", len(path)) + path
+        if win8:
+            entry += struct.pack("<H", 0) + struct.pack("<5L", i & 3, 0, timestamp & 0xFFFFFFFF, timestamp >> 32, 0)
+        else:
+            entry += struct.pack("<LLL", timestamp & 0xFFFFFFFF, timestamp >> 32, 0)
+        data += magic + struct.pack("<LL", 0, len(entry)) + entry
+    return data
+
+
+def synthetic_winxp_cache(count):
+    data = struct.pack("<LLL", ShimCacheParser.WINXP_MAGIC32, 0, count).ljust(ShimCacheParser.WINXP_HEADER_SIZE32,
+                                                                              b"\x00")
+    for i in range(count):
+        entry = (synthetic_path(i) + b"\x00\x00").ljust(ShimCacheParser.MAX_PATH + 8, b"\x00")
+        data += entry + struct.pack("<QQQ", synthetic_filetime(i), 1000 + i, synthetic_filetime(i + 1))
+    return data
+
+
+# Builders of an AppCompatCache value with the given number of entries, per format
+SYNTHETIC_SHIMCACHE = {
+    'nt5_32': lambda count: synthetic_nt_cache(ShimCacheParser.CACHE_MAGIC_NT5_2,
+                                               ShimCacheParser.CACHE_HEADER_SIZE_NT5_2,
+                                               ShimCacheParser.NT5_ENTRY[True], count,
+                                               lambda i: (1000 + i, 0)),
+    'nt5_64': lambda count: synthetic_nt_cache(ShimCacheParser.CACHE_MAGIC_NT5_2,
+                                               ShimCacheParser.CACHE_HEADER_SIZE_NT5_2,
+                                               ShimCacheParser.NT5_ENTRY[False], count,
+                                               lambda i: (i & 3, 0)),
+    'nt6_32': lambda count: synthetic_nt_cache(ShimCacheParser.CACHE_MAGIC_NT6_1,
+                                               ShimCacheParser.CACHE_HEADER_SIZE_NT6_1,
+                                               ShimCacheParser.NT6_ENTRY[True], count,
+                                               lambda i: (i & 3, 0, 0, 0)),
+    'nt6_64': lambda count: synthetic_nt_cache(ShimCacheParser.CACHE_MAGIC_NT6_1,
+                                               ShimCacheParser.CACHE_HEADER_SIZE_NT6_1,
+                                               ShimCacheParser.NT6_ENTRY[False], count,
+                                               lambda i: (i & 3, 0, 0, 0)),
+    'win8': lambda count: synthetic_apphelp_cache(ShimCacheParser.WIN8_STATS_SIZE, b"00ts", count, True),
+    'win81': lambda count: synthetic_apphelp_cache(ShimCacheParser.WIN8_STATS_SIZE, b"10ts", count, True),
+    'win10': lambda count: synthetic_apphelp_cache(ShimCacheParser.WIN10_STATS_SIZE, b"10ts", count, False),
+    'win10_creators': lambda count: synthetic_apphelp_cache(ShimCacheParser.WIN10_CREATORS_STATS_SIZE, b"10ts",
+                                                            count, False),
+    'winxp': synthetic_winxp_cache,
+}
+
+
+def hive_cell(cells, payload):
+    """ Append an allocated cell to the hive bin, return its offset."""
+    size = (len(payload) + 4 + 7) & ~7
+    offset = len(cells)
+    cells += struct.pack("<l", -size) + payload.ljust(size - 4, b"\x00")
+    return offset
+
+
+def hive_value(cells, name, data):
+    data_size = len(data)
+    if data_size <= 4:
+        # Small data is stored in the data offset field
+        data_size |= hive_reader.DATA_INLINE
+        data_offset = struct.unpack("<L", data.ljust(4, b"\x00"))[0]
+    elif len(data) > hive_reader.BIG_DATA_SEGMENT_SIZE:
+        segments = [hive_cell(cells, data[i:i + hive_reader.BIG_DATA_SEGMENT_SIZE])
+                    for i in range(0, len(data), hive_reader.BIG_DATA_SEGMENT_SIZE)]
+        segment_list = hive_cell(cells, struct.pack("<{0}L".format(len(segments)), *segments))
+        data_offset = hive_cell(cells, hive_reader.DB_RECORD.pack(b"db", len(segments), segment_list))
+    else:
+        data_offset = hive_cell(cells, data)
+    return hive_cell(cells, hive_reader.VK_RECORD.pack(b"vk", len(name), data_size, data_offset,
+                                                       hive_reader.REG_BINARY, hive_reader.VALUE_COMP_NAME) + name)
+
+
+def hive_key(cells, key, parent=0, flags=hive_reader.KEY_COMP_NAME):
+    """ Write a (name, subkeys, values) tree, the nk cell is reserved first so the
+        subkeys can point to their parent.
+    """
+    name, subkeys, values = key
+    offset = hive_cell(cells, b"\x00" * (hive_reader.NK_NAME_OFFSET + len(name)))
+    children = sorted((subkey[0].upper(), hive_key(cells, subkey, offset)) for subkey in subkeys)
+    subkey_list = value_list = hive_reader.NO_CELL
+    if children:
+        subkey_list = hive_cell(cells, hive_reader.LIST_HEADER.pack(b"lh", len(children)) + b"".join(
+            struct.pack("<LL", child, hive_reader._lh_hash(child_name.decode("latin-1")))
+            for child_name, child in children))
+    if values:
+        value_offsets = [hive_value(cells, value_name, data) for value_name, data in values]
+        value_list = hive_cell(cells, struct.pack("<{0}L".format(len(value_offsets)), *value_offsets))
+    record = struct.pack("<2sH8xLLLLLLLLL", b"nk", flags, 0, parent, len(children), 0, subkey_list,
+                         hive_reader.NO_CELL, len(values), value_list, hive_reader.NO_CELL)
+    record = record.ljust(0x48, b"\x00") + struct.pack("<HH", len(name), 0) + name
+    cells[offset + 4:offset + 4 + len(record)] = record
+    return offset
+
+
+def synthetic_hive(cache_data, control_sets=2, services=2000):
+    """ Build a SYSTEM hive with an AppCompatCache value per ControlSet and
+        services keys of filler around it.
+    """
+    def control_set(index):
+        service_keys = [("Service{0}".format(i).encode("ascii"), [],
+                         [(b"ImagePath", synthetic_path(i)), (b"Start", struct.pack("<L", 2))])
+                        for i in range(services)]
+        session_manager = (b"Session Manager", [(b"AppCompatCache", [], [(b"AppCompatCache", cache_data)]),
+                                                (b"Environment", [], []), (b"Memory Management", [], [])], [])
+        control = (b"Control", [session_manager, (b"Lsa", [], []), (b"Print", [], [])], [])
+        return ("ControlSet{0:03d}".format(index).encode("ascii"), [control, (b"Services", service_keys, [])], [])
+
+    tree = (b"ROOT", [control_set(i + 1) for i in range(control_sets)] + [(b"Select", [], [])], [])
+    cells = bytearray(32)  # hive bin header
+    root = hive_key(cells, tree, flags=hive_reader.KEY_COMP_NAME | 0x0C)
+    size = (len(cells) + 4 + hive_reader.BASE_BLOCK_SIZE - 1) // hive_reader.BASE_BLOCK_SIZE * \
+        hive_reader.BASE_BLOCK_SIZE
+    cells += struct.pack("<l", size - len(cells)).ljust(size - len(cells), b"\x00")  # free cell up to the end
+    cells[:12] = struct.pack("<4sLL", b"hbin", 0, size)
+    base = struct.pack("<4sLL8xLLLLLLL", b"regf", 1, 1, 1, 5, 0, 1, root, size, 1).ljust(508, b"\x00")
+    checksum = 0
+    for dword in struct.unpack("<127L", base):
+        checksum ^= dword
+    return base + struct.pack("<L", checksum).ljust(hive_reader.BASE_BLOCK_SIZE - 508, b"\x00") + bytes(cells)
+
+
+def benchmark_hive(args):
+    cache_data = SYNTHETIC_SHIMCACHE[args.format](args.entries)
+    directory = tempfile.mkdtemp(prefix="hive_benchmark")
+    try:
+        hive = os.path.join(directory, "SYSTEM")
+        with open(hive, "wb") as f:
+            f.write(synthetic_hive(cache_data, services=args.services))
+        nbytes = os.path.getsize(hive)
+        readers = [("hive_reader", ShimCacheParser.iter_hive_cache)]
+        try:
+            import Registry
+            readers.append(("Registry.py", ShimCacheParser.iter_registry_cache))
+        except ImportError:
+            print("Registry.py is not installed, only the built in reader is measured")
+        for name, reader in readers:
+            elapsed = timed(lambda: ShimCacheParser.read_from_hive(hive, reader, quiet=True), args.repeat)
+            report("ShimCacheParser read_from_hive ({0})".format(name), 1, nbytes, elapsed)
+    finally:
+        shutil.rmtree(directory)
+
+
+# Data of autorun values as returned by the registry queries of scan_autoruns
+AUTORUN_CORPUS = [
+    r'autocheck autochk *',
+    r'C:\Windows\system32\userinit.exe,',
+    r'explorer.exe',
+    r'SystemPropertiesPerformance.exe /pagefile',
+    r'"C:\Program Files\Windows Defender\MSASCuiL.exe"',
+    r'"C:\Program Files (x86)\Common Files\Adobe\ARM\1.0\AdobeARM.exe"',
+    r'"C:\Program Files\Microsoft OneDrive\OneDrive.exe" /background',
+    r'C:\Program Files\VMware\VMware Tools\vmtoolsd.exe -n vmusr',
+    r'%SystemRoot%\system32\svchost.exe -k netsvcs -p',
+    r'%SystemRoot%\System32\svchost.exe -k LocalServiceNetworkRestricted -p',
+    r'\SystemRoot\System32\drivers\ACPI.sys',
+    r'system32\DRIVERS\USBSTOR.SYS',
+    r'\??\C:\Windows\system32\drivers\MpKslDrv.sys',
+    r'"C:\Program Files\Common Files\microsoft shared\ClickToRun\OfficeClickToRun.exe" /service',
+    r'C:\Windows\Microsoft.NET\Framework64\v4.0.30319\mscorsvw.exe',
+    r'%SystemRoot%\system32\mswsock.dll',
+    r'%SystemRoot%\system32\NLAapi.dll',
+    r'%SystemRoot%\System32\winrnr.dll',
+    r'C:\Windows\system32\spool\drivers\x64\3\PrintConfig.dll',
+    r'localspl.dll',
+    r'tcpmon.dll',
+    r'kerberos,msv1_0,schannel,wdigest,tspkg,pku2u',
+    r'rassfm,scecli',
+    r'"C:\Program Files\Internet Explorer\iexplore.exe" %1',
+    r'C:\Windows\system32\rundll32.exe C:\Windows\system32\iesetup.dll,IEHardenUser',
+    r'%SystemRoot%\system32\unregmp2.exe /FirstLogon',
+    r'"%ProgramFiles%\Windows Mail\WinMail.exe" OCInstallUserConfigOE',
+    r'C:\Windows\System32\ie4uinit.exe -UserConfig',
+    r'msacm32.drv',
+    r'C:\Windows\system32\l3codeca.acm',
+    r'ATMFD.DLL',
+    r'%SystemRoot%\System32\Windows.Globalization.Fontgroups.dll',
+    r'C:\Program Files (x86)\Google\Update\1.3.35.452\psmachine_64.dll',
+    r'"C:\Users\user\AppData\Local\Microsoft\Teams\Update.exe" --processStart "Teams.exe" --process-start-args "--system-initiated"',
+]
+
+
+def read_autorun_values(paths):
+    values = []
+    for file_path in paths:
+        with open(file_path) as f:
+            values.extend(line.rstrip('\r\n') for line in f if line.strip())
+    return values
+
+
+def benchmark_autoruns(args):
+    values = (read_autorun_values(args.paths) if args.paths else AUTORUN_CORPUS) * args.copies
+    nbytes = sum(len(value) for value in values)
+    paths = sum(len(autorun_paths.extract_paths(value)) for value in values)
+    elapsed = timed(lambda: [autorun_paths.extract_paths(value) for value in values], args.repeat)
+    report("autorun_paths extract_paths ({0} paths)".format(paths), len(values), nbytes, elapsed)
+    # The same values as a single one, the time must grow linearly with its length
+    joined = ",".join(values)
+    elapsed = timed(lambda: autorun_paths.extract_paths(joined), args.repeat)
+    report("autorun_paths extract_paths (one joined value)", 1, len(joined), elapsed)
+
+
+def benchmark_shimcache(args):
+    for name in args.formats or sorted(SYNTHETIC_SHIMCACHE):
+        data = SYNTHETIC_SHIMCACHE[name](args.entries)
+        elapsed = timed(lambda: ShimCacheParser.read_cache(data, quiet=True), args.repeat)
+        report("ShimCacheParser read_cache {0}".format(name), args.entries, len(data), elapsed)
+
+
+def benchmark_filetime(args):
+    start, end = filetime.year_start(2000), filetime.year_start(2030)
+    values = [random.randint(start, end) for i in range(args.count)]
+    elapsed = timed(lambda: filetime.to_strings(values), args.repeat)
+    report("filetime to_strings ({0})".format("numpy" if filetime.numpy is not None else "pure Python"),
+           len(values), len(values) * 8, elapsed)
+
+
+def benchmark_lzxpress(args):
+    buffers = []
+    for file_path in list_files(args.paths, '.pf'):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if data[:3] == b'MAM':
+            buffers.append(data)
+    if not buffers:
+        print("No MAM compressed files found")
+        return
+
+    decompressed = sum(len(lzxpress.decompress_mam(data)) for data in buffers)
+    elapsed = timed(lambda: [lzxpress.decompress_mam(data) for data in buffers], args.repeat)
+    report("lzxpress decompress_mam (output)", len(buffers), decompressed, elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for the helper parsers.')
+    parser.add_argument('--repeat', help='Number of timed runs, the best is reported', type=int, default=3)
+    subparsers = parser.add_subparsers(dest='benchmark')
+
+    lzxpress_parser = subparsers.add_parser('lzxpress', help='Decompress Windows 10 MAM prefetch files')
+    lzxpress_parser.add_argument('paths', nargs='+', help='MAM compressed files or directories of .pf files')
+    lzxpress_parser.set_defaults(function=benchmark_lzxpress)
+
+    prefetch_parser = subparsers.add_parser('prefetch', help='Parse prefetch files')
+    prefetch_parser.add_argument('paths', nargs='*', help='Prefetch files or directories of .pf files')
+    prefetch_parser.add_argument('--synthetic', help='Parse this many generated prefetch files instead',
+                                 type=int)
+    prefetch_parser.add_argument('--timestamps_only', help='Only parse the header and run times',
+                                 action='store_true')
+    prefetch_parser.set_defaults(function=benchmark_prefetch)
+
+    filetime_parser = subparsers.add_parser('filetime', help='Format FILETIME values')
+    filetime_parser.add_argument('--count', help='Number of values', type=int, default=1000000)
+    filetime_parser.set_defaults(function=benchmark_filetime)
+
+    shimcache_parser = subparsers.add_parser('shimcache', help='Parse synthetic AppCompatCache values')
+    shimcache_parser.add_argument('formats', nargs='*', help='Formats to parse, defaults to all of ' +
+                                  ', '.join(sorted(SYNTHETIC_SHIMCACHE)))
+    shimcache_parser.add_argument('--entries', help='Number of entries per cache', type=int, default=10000)
+    shimcache_parser.set_defaults(function=benchmark_shimcache)
+
+    hive_parser = subparsers.add_parser('hive', help='Read AppCompatCache values from a synthetic SYSTEM hive')
+    hive_parser.add_argument('--format', help='Format of the cache values', choices=sorted(SYNTHETIC_SHIMCACHE),
+                             default='win10')
+    hive_parser.add_argument('--entries', help='Number of entries per cache', type=int, default=1024)
+    hive_parser.add_argument('--services', help='Number of filler service keys per ControlSet', type=int,
+                             default=2000)
+    hive_parser.set_defaults(function=benchmark_hive)
+
+    autoruns_parser = subparsers.add_parser('autoruns', help='Extract file paths from autorun registry values')
+    autoruns_parser.add_argument('paths', nargs='*', help='Text files with one registry value per line, '
+                                                          'defaults to a built in corpus')
+    autoruns_parser.add_argument('--copies', help='Number of times the values are repeated', type=int,
+                                 default=100)
+    autoruns_parser.set_defaults(function=benchmark_autoruns)
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
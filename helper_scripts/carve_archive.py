@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Helpers to extract carve archives whatever compression the agent applied.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+osquery can be configured to compress carves. The archive format is detected
+from its magic bytes and the archive is decompressed while it is streamed into
+the tar reader, so the uncompressed tar never has to be written to disk.
+"""
+
+import argparse
+import tarfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT_TAR = 'tar'
+FORMAT_GZIP = 'gzip'
+FORMAT_ZSTD = 'zstd'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+TAR_MAGIC_OFFSET = 257
+TAR_MAGIC = b'ustar'
+
+
+def detect_format(file_obj):
+    """ Return the archive format of file_obj from its magic bytes.
+        The file position is restored before returning.
+    """
+    position = file_obj.tell()
+    head = file_obj.read(TAR_MAGIC_OFFSET + len(TAR_MAGIC))
+    file_obj.seek(position)
+
+    if head.startswith(ZSTD_MAGIC):
+        return FORMAT_ZSTD
+    if head.startswith(GZIP_MAGIC):
+        return FORMAT_GZIP
+    if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+        return FORMAT_TAR
+    return None
+
+
+def extract(file_path, dir):
+    """ Extract the carve archive at file_path into dir.
+        :return: The detected archive format.
+    """
+    with open(file_path, 'rb') as f:
+        archive_format = detect_format(f)
+        if archive_format == FORMAT_ZSTD:
+            if zstandard is None:
+                raise Exception("zstd compressed carves require the zstandard package")
+            stream = zstandard.ZstdDecompressor().stream_reader(f)
+            tar = tarfile.open(fileobj=stream, mode='r|')
+        elif archive_format == FORMAT_GZIP:
+            tar = tarfile.open(fileobj=f, mode='r|gz')
+        elif archive_format == FORMAT_TAR:
+            tar = tarfile.open(fileobj=f, mode='r|')
+        else:
+            raise Exception("Unrecognized carve archive format: {0}".format(file_path))
+        try:
+            tar.extractall(path=dir)
+        finally:
+            tar.close()
+    return archive_format
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract a carve archive.')
+
+    parser.add_argument('--file_path', help='Carve archive path', required=True)
+    parser.add_argument('--dir', help='Directory to extract into', required=True)
+    args = parser.parse_args()
+
+    print("Extracted {0} archive".format(extract(args.file_path, args.dir)))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Simple scripts to hash and pattern scan the modules of a carved process dump.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Every module is read once and fed to MD5, SHA-1 and SHA-256 together. Hashing
+runs in a thread pool, hashlib releases the GIL while digesting large buffers.
+Rule scans are CPU bound in the regex engine and run in a process pool.
+
+Rule files hold one pattern per line, a rule matches when any of its patterns
+is found in the module:
+    # comment
+    mimikatz = "sekurlsa::logonpasswords"
+    mz_stub = { 4d 5a ?? 00 03 }
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import re
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+
+READ_SIZE = 1024 * 1024
+DEFAULT_HASH_WORKERS = 4
+DEFAULT_SCAN_WORKERS = cpu_count()
+report_columns = ['path', 'size', 'md5', 'sha1', 'sha256', 'matches']
+
+_RULE_LINE = re.compile(r'^\s*(\w+)\s*=\s*(?:"(.*)"|\{([0-9a-fA-F?\s]+)\})\s*$')
+_HEX_BYTE = re.compile(r'^(?:[0-9a-fA-F]{2}|\?\?)$')
+_compiled_rules = None
+
+
+def hash_file(path):
+    """ Hash a file with MD5, SHA-1 and SHA-256 in a single read."""
+    digests = [hashlib.md5(), hashlib.sha1(), hashlib.sha256()]
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            buf = f.read(READ_SIZE)
+            if not buf:
+                break
+            size += len(buf)
+            for digest in digests:
+                digest.update(buf)
+    return {'path': path, 'size': size, 'md5': digests[0].hexdigest(),
+            'sha1': digests[1].hexdigest(), 'sha256': digests[2].hexdigest()}
+
+
+def hash_modules(paths, workers=DEFAULT_HASH_WORKERS):
+    pool = ThreadPool(max(1, workers))
+    try:
+        return pool.map(hash_file, paths)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def load_rules(rule_file):
+    """ Read a rule file into a list of (rule name, regex bytes) tuples."""
+    rules = []
+    with open(rule_file) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            match = _RULE_LINE.match(line)
+            if not match:
+                raise Exception("Invalid rule at {0}:{1}".format(rule_file, line_number))
+            name, text, hex_pattern = match.groups()
+            if text is not None:
+                source = re.escape(_to_bytes(text))
+            else:
+                # Bytes are pairs of nibbles, spaces between them are optional.
+                # Rejected here, a bad pattern would only fail in the scan pool
+                nibbles = ''.join(hex_pattern.split())
+                hex_bytes = [nibbles[i:i + 2] for i in range(0, len(nibbles), 2)]
+                if not hex_bytes or not all(_HEX_BYTE.match(byte) for byte in hex_bytes):
+                    raise Exception("Invalid hex pattern at {0}:{1}, expected an even number of hex digits and ?? "
+                                    "for any byte".format(rule_file, line_number))
+                source = _to_bytes(''.join('.' if byte == '??' else '\\x' + byte for byte in hex_bytes))
+            try:
+                re.compile(source, re.DOTALL)
+            except re.error as e:
+                raise Exception("Invalid rule at {0}:{1}: {2}".format(rule_file, line_number, e))
+            rules.append((name, source))
+    return rules
+
+
+def _to_bytes(value):
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def _compile_rules(rules):
+    by_name = {}
+    for name, source in rules:
+        by_name.setdefault(name, []).append(source)
+    return [(name, re.compile(b'|'.join(sources), re.DOTALL))
+            for name, sources in sorted(by_name.items())]
+
+
+def _init_scanner(rules):
+    global _compiled_rules
+    _compiled_rules = _compile_rules(rules)
+
+
+def scan_file(path):
+    """ Return the names of the rules matching the file, the scanner must be initialised."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [name for name, pattern in _compiled_rules if pattern.search(data)]
+
+
+def scan_modules(paths, rules, workers=DEFAULT_SCAN_WORKERS):
+    pool = Pool(max(1, workers), _init_scanner, (rules,))
+    try:
+        return pool.map(scan_file, paths)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def analyse_modules(paths, rules=None, hash_workers=DEFAULT_HASH_WORKERS, scan_workers=DEFAULT_SCAN_WORKERS):
+    """ Hash every module and, given rules, scan it.
+        :return: One record per module with the report_columns keys.
+    """
+    records = hash_modules(paths, hash_workers)
+    matches = scan_modules(paths, rules, scan_workers) if rules else [[] for path in paths]
+    for record, matched in zip(records, matches):
+        record['matches'] = ' '.join(matched)
+    return records
+
+
+def dumped_modules(folder_path):
+    """ List the dumped modules in an extracted process dump, skipping the tag files."""
+    return sorted(os.path.join(folder_path, name) for name in os.listdir(folder_path)
+                  if not name.endswith('.tag') and os.path.isfile(os.path.join(folder_path, name)))
+
+
+def write_report(records, output_path):
+    with open(output_path, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=report_columns)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+    return output_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hash and scan the modules of a process dump.')
+
+    parser.add_argument('--dir', help='Extracted process dump folder', required=True)
+    parser.add_argument('--rules', help='Rule file for the byte pattern scan')
+    parser.add_argument('--output', help='CSV report path', required=True)
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules) if args.rules else None
+    write_report(analyse_modules(dumped_modules(args.dir), rules), args.output)
+    print("Created a file with the module hashes at : " + args.output)
@@ -6,6 +6,8 @@
 """
 
 import argparse
+import csv
+import sys
 import time
 from functools import reduce
 
@@ -94,6 +96,29 @@ def read_csv(file_path, vt):
     return file_vt_score_output_path
 
 
+def open_csv(file_path):
+    """ Open a CSV file for csv.reader, in text mode on Python 3."""
+    if sys.version_info[0] < 3:
+        return open(file_path, 'rb')
+    return open(file_path, newline='', encoding='utf-8')
+
+
+def flagged_rows(file_path):
+    """ Rows of a file written by main with a non zero vt_score."""
+    rows = []
+    with open_csv(file_path) as f:
+        for row in csv.DictReader(f):
+            try:
+                vt_score_num_denom = row['vt_score'].split("/")
+                if len(vt_score_num_denom) > 1:
+                    if float(vt_score_num_denom[0]) / float(vt_score_num_denom[1]):
+                        rows.append(row)
+            except (KeyError, AttributeError, ValueError, ZeroDivisionError):
+                # Indicators without a score
+                pass
+    return rows
+
+
 def divide_chunks(l, n):
     for i in range(0, len(l), n):
         yield l[i:i + n]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Batch conversion of Windows FILETIME values.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Parsers keep FILETIMEs as raw integers and convert them here, a whole list at
+a time, when the output is written. NumPy is used when it is installed, with
+a pure Python fallback otherwise.
+"""
+
+from datetime import datetime, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"
+FILETIME_ORIGIN = datetime(1601, 1, 1)
+EPOCH_AS_FILETIME = 116444736000000000  # January 1, 1970 as a FILETIME
+HUNDREDS_OF_NANOSECONDS = 10000000
+
+
+def from_datetime(value):
+    delta = value - FILETIME_ORIGIN
+    return (delta.days * 86400 + delta.seconds) * HUNDREDS_OF_NANOSECONDS + delta.microseconds * 10
+
+
+def year_start(year):
+    """ FILETIME of January 1 of year, to use as the minimum of a conversion."""
+    return from_datetime(datetime(year, 1, 1))
+
+
+MAX_FILETIME = from_datetime(datetime.max) + 9  # last value datetime can represent
+
+
+def is_valid(value, minimum=0):
+    return minimum <= value <= MAX_FILETIME
+
+
+def _valid(filetimes, minimum):
+    values = numpy.array(filetimes, dtype=numpy.uint64)
+    valid = (values >= minimum) & (values <= MAX_FILETIME)
+    return values.astype(numpy.int64), valid
+
+
+def to_epoch(filetimes, minimum=0):
+    """ Convert FILETIMEs to seconds since the Unix epoch.
+        :return: A float64 array with NaN for values out of range when NumPy is
+                 available, else a list of floats with None for them.
+    """
+    if numpy is not None:
+        values, valid = _valid(filetimes, minimum)
+        seconds = (values - EPOCH_AS_FILETIME) / float(HUNDREDS_OF_NANOSECONDS)
+        seconds[~valid] = numpy.nan
+        return seconds
+    return [(value - EPOCH_AS_FILETIME) / float(HUNDREDS_OF_NANOSECONDS)
+            if is_valid(value, minimum) else None for value in filetimes]
+
+
+def to_datetimes(filetimes, minimum=0):
+    """ Convert FILETIMEs to datetime objects, None for values out of range."""
+    if numpy is not None:
+        values, valid = _valid(filetimes, minimum)
+        microseconds = (values[valid] - EPOCH_AS_FILETIME) // 10
+        converted = iter(microseconds.astype("datetime64[us]").tolist())
+        return [next(converted) if in_range else None for in_range in valid.tolist()]
+    return [FILETIME_ORIGIN + timedelta(microseconds=value // 10)
+            if is_valid(value, minimum) else None for value in filetimes]
+
+
+def to_strings(filetimes, time_format=ISO_FORMAT, microseconds=False, minimum=0, invalid=None):
+    """ Format FILETIMEs as strings.
+        :param time_format: strftime format of the values.
+        :param microseconds: Append the microseconds to ISO_FORMAT values when
+                             they are not zero, the same as str(datetime).
+        :param minimum: Smallest FILETIME considered valid.
+        :param invalid: Value returned for FILETIMEs out of range.
+    """
+    if numpy is not None and time_format == ISO_FORMAT:
+        # Format the whole array at once, "YYYY-MM-DDTHH:MM:SS.ffffff"
+        values, valid = _valid(filetimes, minimum)
+        microsecond_values = (values[valid] - EPOCH_AS_FILETIME) // 10
+        converted = iter(numpy.datetime_as_string(microsecond_values.astype("datetime64[us]"), unit="us").tolist())
+        strings = []
+        for in_range in valid.tolist():
+            if not in_range:
+                strings.append(invalid)
+                continue
+            value = next(converted)
+            if microseconds and not value.endswith(".000000"):
+                strings.append(value[:10] + " " + value[11:])
+            else:
+                strings.append(value[:10] + " " + value[11:19])
+        return strings
+
+    strings = []
+    for value in to_datetimes(filetimes, minimum):
+        if value is None:
+            strings.append(invalid)
+        elif microseconds and time_format == ISO_FORMAT:
+            strings.append(str(value))
+        else:
+            try:
+                strings.append(value.strftime(time_format))
+            except ValueError:
+                # strftime of Python 2 rejects years before 1900
+                strings.append(invalid)
+    return strings
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Minimal read only parser of Windows registry hive (regf) files.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+The hive is memory mapped and only the cells on the path to the requested keys
+and values are read, so a single value can be pulled out of a SYSTEM hive of
+hundreds of MB without walking the whole tree.
+EXAMPLE USAGE:::
+with Hive("SYSTEM") as hive:
+    data = hive.root().find_key("ControlSet001\\Control\\Session Manager\\AppCompatCache").value("AppCompatCache").data
+"""
+
+import mmap
+import struct
+
+REGF_SIGNATURE = b'regf'
+BASE_BLOCK_SIZE = 0x1000
+BASE_BLOCK = struct.Struct('<4s4xL8xLLL4xL')  # signature, sequence, major, minor, type, root cell
+
+CELL_SIZE = struct.Struct('<l')
+UINT32 = struct.Struct('<L')
+LIST_HEADER = struct.Struct('<2sH')
+NK_RECORD = struct.Struct('<2sH12x4xL4xL4xL')  # signature, flags, subkey count, subkey list, value count
+NK_VALUE_LIST = struct.Struct('<L')
+NK_NAME_LENGTH = struct.Struct('<H')
+VK_RECORD = struct.Struct('<2sHLLLH2x')  # signature, name length, data size, data offset, type, flags
+DB_RECORD = struct.Struct('<2sHL')  # signature, segment count, segment list
+
+NK_VALUE_LIST_OFFSET = 0x28
+NK_NAME_OFFSET = 0x4C
+KEY_COMP_NAME = 0x0020
+VALUE_COMP_NAME = 0x0001
+DATA_INLINE = 0x80000000
+BIG_DATA_SEGMENT_SIZE = 16344
+NO_CELL = 0xFFFFFFFF
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+
+
+class HiveError(Exception):
+    pass
+
+
+def _lh_hash(name):
+    # Hash stored next to each offset of an 'lh' list, computed on the upper
+    # case name, lets lookups skip the nk cells of the other subkeys
+    value = 0
+    for char in name.upper():
+        value = (value * 37 + ord(char)) & 0xFFFFFFFF
+    return value
+
+
+def _decode_name(raw, compressed):
+    return raw.decode('latin-1') if compressed else raw.decode('utf-16-le', 'replace')
+
+
+class Hive(object):
+
+    def __init__(self, file_path):
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            self._file.close()
+            raise HiveError("{0} is not a registry hive".format(file_path))
+        if len(self._map) < BASE_BLOCK_SIZE or self._map[:4] != REGF_SIGNATURE:
+            self.close()
+            raise HiveError("{0} is not a registry hive".format(file_path))
+        signature, sequence, self.major_version, self.minor_version, file_type, self._root_offset = \
+            BASE_BLOCK.unpack_from(self._map, 0)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def cell(self, offset):
+        """ Absolute offset and size of the data of the cell at a hive bins relative offset."""
+        position = BASE_BLOCK_SIZE + offset
+        if offset == NO_CELL or position + CELL_SIZE.size > len(self._map):
+            raise HiveError("Cell offset 0x{0:x} is outside of the hive".format(offset))
+        size = abs(CELL_SIZE.unpack_from(self._map, position)[0]) - CELL_SIZE.size
+        if size < 0 or position + CELL_SIZE.size + size > len(self._map):
+            raise HiveError("Cell at 0x{0:x} is truncated".format(offset))
+        return position + CELL_SIZE.size, size
+
+    def read(self, position, size):
+        return self._map[position:position + size]
+
+    def unpack(self, layout, position):
+        return layout.unpack_from(self._map, position)
+
+    def root(self):
+        return Key(self, self._root_offset)
+
+    def offsets(self, list_offset):
+        """ Yield (nk offset, lh hash or None) of a subkey list, following 'ri' index roots."""
+        position, size = self.cell(list_offset)
+        signature, count = self.unpack(LIST_HEADER, position)
+        position += LIST_HEADER.size
+        if signature == b'ri':
+            for i in range(count):
+                for item in self.offsets(self.unpack(UINT32, position + i * 4)[0]):
+                    yield item
+        elif signature == b'li':
+            for i in range(count):
+                yield self.unpack(UINT32, position + i * 4)[0], None
+        elif signature in (b'lf', b'lh'):
+            for i in range(count):
+                offset, name_hash = struct.unpack_from('<LL', self._map, position + i * 8)
+                yield offset, (name_hash if signature == b'lh' else None)
+        else:
+            raise HiveError("Unknown subkey list signature {0!r}".format(signature))
+
+
+class Key(object):
+
+    def __init__(self, hive, offset, parent_path=None):
+        self._hive = hive
+        self._position, size = hive.cell(offset)
+        signature, self._flags, self._subkey_count, self._subkey_list, self._value_count = \
+            hive.unpack(NK_RECORD, self._position)
+        if signature != b'nk':
+            raise HiveError("Expected a key at 0x{0:x}, found {1!r}".format(offset, signature))
+        name_length = hive.unpack(NK_NAME_LENGTH, self._position + 0x48)[0]
+        self.name = _decode_name(hive.read(self._position + NK_NAME_OFFSET, name_length),
+                                 self._flags & KEY_COMP_NAME)
+        self.path = self.name if parent_path is None else parent_path + "\\" + self.name
+
+    def __repr__(self):
+        return "Key({0!r})".format(self.path)
+
+    def subkeys(self):
+        if not self._subkey_count:
+            return
+        for offset, name_hash in self._hive.offsets(self._subkey_list):
+            yield Key(self._hive, offset, self.path)
+
+    def subkey(self, name):
+        """ Case insensitive lookup of a direct subkey, None if there is none."""
+        if not self._subkey_count:
+            return None
+        name_hash = _lh_hash(name)
+        for offset, stored_hash in self._hive.offsets(self._subkey_list):
+            if stored_hash is not None and stored_hash != name_hash:
+                continue
+            key = Key(self._hive, offset, self.path)
+            if key.name.lower() == name.lower():
+                return key
+        return None
+
+    def find_key(self, path):
+        """ Follow a backslash separated path of subkeys, None if a part is missing."""
+        key = self
+        for name in path.split("\\"):
+            if name:
+                key = key.subkey(name)
+                if key is None:
+                    return None
+        return key
+
+    def values(self):
+        if not self._value_count:
+            return
+        list_offset = self._hive.unpack(NK_VALUE_LIST, self._position + NK_VALUE_LIST_OFFSET)[0]
+        position, size = self._hive.cell(list_offset)
+        for i in range(min(self._value_count, size // UINT32.size)):
+            yield Value(self._hive, self._hive.unpack(UINT32, position + i * UINT32.size)[0])
+
+    def value(self, name):
+        """ Case insensitive lookup of a value, "" is the default value. None if there is none."""
+        for value in self.values():
+            if value.name.lower() == name.lower():
+                return value
+        return None
+
+
+class Value(object):
+
+    def __init__(self, hive, offset):
+        self._hive = hive
+        position, size = hive.cell(offset)
+        signature, name_length, self._data_size, self._data_offset, self.type, flags = \
+            hive.unpack(VK_RECORD, position)
+        if signature != b'vk':
+            raise HiveError("Expected a value at 0x{0:x}, found {1!r}".format(offset, signature))
+        self.name = _decode_name(hive.read(position + VK_RECORD.size, name_length), flags & VALUE_COMP_NAME)
+        self._position = position
+
+    def __repr__(self):
+        return "Value({0!r})".format(self.name)
+
+    @property
+    def data(self):
+        """ Raw bytes of the value, read from the hive only when accessed."""
+        if self._data_size & DATA_INLINE:
+            # Up to four bytes are stored in the data offset field itself
+            size = self._data_size & ~DATA_INLINE
+            return self._hive.read(self._position + 8, min(size, 4))
+        size = self._data_size
+        if size == 0:
+            return b''
+        position, cell_size = self._hive.cell(self._data_offset)
+        if size > BIG_DATA_SEGMENT_SIZE and self._hive.minor_version > 3 and \
+                self._hive.read(position, 2) == b'db':
+            return self._big_data(position, size)
+        return self._hive.read(position, min(size, cell_size))
+
+    def _big_data(self, position, size):
+        # Data above 16344 bytes is split in segments listed by a 'db' record
+        signature, count, list_offset = self._hive.unpack(DB_RECORD, position)
+        list_position, list_size = self._hive.cell(list_offset)
+        segments = []
+        remaining = size
+        for i in range(count):
+            segment_position, segment_size = self._hive.cell(self._hive.unpack(UINT32, list_position + i * 4)[0])
+            segment_size = min(segment_size, BIG_DATA_SEGMENT_SIZE, remaining)
+            segments.append(self._hive.read(segment_position, segment_size))
+            remaining -= segment_size
+        return b''.join(segments)
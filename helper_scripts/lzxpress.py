@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Portable LZXpress-Huffman decompressor for Windows 10 MAM compressed files.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Implements the decompression algorithm of [MS-XCA] section 2.2.4 on bytes in
+memory, so Windows 10 prefetch files can be parsed on any platform without
+ntdll's RtlDecompressBufferEx.
+"""
+
+import binascii
+import struct
+
+COMPRESSION_FORMAT_XPRESS_HUFF = 4
+MAM_SIGNATURE = 0x004d414d
+MAM_HEADER = struct.Struct('<LL')
+
+CHUNK_SIZE = 65536
+TABLE_BITS = 15
+TABLE_SIZE = 1 << TABLE_BITS
+SYMBOL_COUNT = 512
+HUFFMAN_TABLE_SIZE = SYMBOL_COUNT // 2
+
+
+class DecompressionError(Exception):
+    pass
+
+
+def _build_decoding_table(src, offset):
+    """ Build the 2^15 entry decoding table from the 256 byte code length table.
+        Each entry packs the symbol and its code length as (symbol << 4) | length.
+    """
+    symbols_by_length = [[] for i in range(TABLE_BITS + 1)]
+    for i in range(HUFFMAN_TABLE_SIZE):
+        byte = src[offset + i]
+        symbols_by_length[byte & 15].append(2 * i)
+        symbols_by_length[byte >> 4].append(2 * i + 1)
+
+    table = []
+    for bit_length in range(1, TABLE_BITS + 1):
+        entry_count = 1 << (TABLE_BITS - bit_length)
+        for symbol in symbols_by_length[bit_length]:
+            table.extend([(symbol << 4) | bit_length] * entry_count)
+    if len(table) != TABLE_SIZE:
+        raise DecompressionError("Invalid Huffman table")
+    return table
+
+
+def decompress(data, decompressed_size):
+    """ Decompress an LZXpress-Huffman stream.
+        :param data: Compressed bytes.
+        :param decompressed_size: Size of the decompressed data.
+        :return: bytearray of decompressed data.
+    """
+    # Pad the input so reads past the last bit word do not need bounds checks
+    src = bytearray(data)
+    input_size = len(src)
+    src.extend(b'\x00' * 8)
+    out = bytearray()
+    append = out.append
+    out_len = 0
+    in_pos = 0
+
+    try:
+        while out_len < decompressed_size:
+            if in_pos + HUFFMAN_TABLE_SIZE + 4 > input_size:
+                raise DecompressionError("Truncated input at offset {0}".format(in_pos))
+            table = _build_decoding_table(src, in_pos)
+            pos = in_pos + HUFFMAN_TABLE_SIZE
+            next_bits = ((src[pos] | (src[pos + 1] << 8)) << 16) | src[pos + 2] | (src[pos + 3] << 8)
+            pos += 4
+            extra_bits = 16
+            block_end = min(out_len + CHUNK_SIZE, decompressed_size)
+
+            while out_len < block_end:
+                entry = table[next_bits >> 17]
+                bit_length = entry & 15
+                symbol = entry >> 4
+                next_bits = (next_bits << bit_length) & 0xFFFFFFFF
+                extra_bits -= bit_length
+                if extra_bits < 0:
+                    next_bits |= (src[pos] | (src[pos + 1] << 8)) << -extra_bits
+                    extra_bits += 16
+                    pos += 2
+
+                if symbol < 256:
+                    append(symbol)
+                    out_len += 1
+                    continue
+
+                symbol -= 256
+                match_length = symbol & 15
+                offset_bits = symbol >> 4
+                if match_length == 15:
+                    match_length = src[pos]
+                    pos += 1
+                    if match_length == 255:
+                        match_length = src[pos] | (src[pos + 1] << 8)
+                        pos += 2
+                        if match_length == 0:
+                            match_length = struct.unpack_from('<L', src, pos)[0]
+                            pos += 4
+                        if match_length < 15:
+                            raise DecompressionError("Invalid match length at offset {0}".format(pos))
+                        match_length -= 15
+                    match_length += 15
+                match_length += 3
+
+                match_offset = (next_bits >> (32 - offset_bits)) + (1 << offset_bits)
+                next_bits = (next_bits << offset_bits) & 0xFFFFFFFF
+                extra_bits -= offset_bits
+                if extra_bits < 0:
+                    next_bits |= (src[pos] | (src[pos + 1] << 8)) << -extra_bits
+                    extra_bits += 16
+                    pos += 2
+
+                start = out_len - match_offset
+                if start < 0:
+                    raise DecompressionError("Match offset before start of output")
+                if match_offset >= match_length:
+                    out += out[start:start + match_length]
+                else:
+                    # Overlapping match, repeats the last match_offset bytes
+                    pattern = out[start:]
+                    out += (pattern * (match_length // match_offset + 1))[:match_length]
+                out_len += match_length
+
+            in_pos = pos
+    except (IndexError, struct.error):
+        # Reads past the padding, the stream ends before decompressed_size
+        raise DecompressionError("Truncated input")
+
+    del out[decompressed_size:]
+    return out
+
+
+def decompress_mam(data):
+    """ Decompress a MAM compressed buffer, such as a Windows 10 prefetch file.
+        The CRC is verified when the header flags it, the same way as
+        prefetch.DecompressWin10 does.
+        :return: bytearray of decompressed data.
+    """
+    data = bytes(data)
+    header = data[:MAM_HEADER.size]
+    signature, decompressed_size = MAM_HEADER.unpack(header)
+    calgo = (signature & 0x0F000000) >> 24
+    crcck = (signature & 0xF0000000) >> 28
+    magic = signature & 0x00FFFFFF
+    if magic != MAM_SIGNATURE:
+        raise DecompressionError("Wrong signature... wrong file?")
+    if calgo != COMPRESSION_FORMAT_XPRESS_HUFF:
+        raise DecompressionError("Unsupported compression algorithm {0}".format(calgo))
+
+    compressed = data[MAM_HEADER.size:]
+    if crcck:
+        file_crc = struct.unpack('<L', compressed[:4])[0]
+        crc = binascii.crc32(header)
+        crc = binascii.crc32(struct.pack('<L', 0), crc)
+        compressed = compressed[4:]
+        crc = binascii.crc32(compressed, crc) & 0xFFFFFFFF
+        if crc != file_crc:
+            raise DecompressionError("Wrong file CRC {0:x} - {1:x}!".format(crc, file_crc))
+
+    return decompress(compressed, decompressed_size)
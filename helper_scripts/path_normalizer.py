@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Canonical spelling of the Windows file paths found in autoruns and the ShimCache.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+The same binary is referenced as %SystemRoot%\\system32\\x.dll, \\SystemRoot\\System32\\x.dll,
+\\??\\C:\\Windows\\system32\\x.dll or "C:\\Windows\\System32\\x.dll",Entry. Normalizing them
+before hashing makes every spelling one win_hash lookup. Results are memoized in a
+bounded LRU cache since the same spellings come back on every host.
+Arguments are only stripped from command lines (autorun values), a ShimCache or
+file table path may hold dots, spaces and commas anywhere.
+EXAMPLE USAGE:::
+normalizer = PathNormalizer(strip_arguments=True)
+paths = list(normalizer.normalize_all(paths))
+print(normalizer.collapsed)
+"""
+
+import re
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 65536
+
+# Default location of the folders behind the usual environment variables, names
+# are lower case
+DEFAULT_ENVIRONMENT = {
+    'systemdrive': 'c:',
+    'systemroot': 'c:\\windows',
+    'windir': 'c:\\windows',
+    'programfiles': 'c:\\program files',
+    'programw6432': 'c:\\program files',
+    'programfiles(x86)': 'c:\\program files (x86)',
+    'commonprogramfiles': 'c:\\program files\\common files',
+    'commonprogramw6432': 'c:\\program files\\common files',
+    'commonprogramfiles(x86)': 'c:\\program files (x86)\\common files',
+    'programdata': 'c:\\programdata',
+    'allusersprofile': 'c:\\programdata',
+}
+
+# Native paths of the object manager and the relative paths of service images
+NT_PREFIXES = ('\\??\\', '\\\\?\\')
+SYSTEM_ROOT_PREFIX = '\\systemroot\\'
+SYSTEM_ROOT_RELATIVE = ('system32\\', 'syswow64\\')
+
+# Extensions of the images a command line can start, the arguments of a command
+# line are cut after the first of them followed by a space or a comma
+EXECUTABLE_EXTENSIONS = ('exe', 'dll', 'sys', 'com', 'scr', 'cpl', 'ocx', 'drv', 'acm', 'ax', 'efi', 'msc', 'bat',
+                         'cmd')
+
+VARIABLE = re.compile(r'%([^%\\]+)%')
+ARGUMENTS = re.compile(r'\.(?:' + '|'.join(EXECUTABLE_EXTENSIONS) + r')(?=[\s,])', re.IGNORECASE)
+SEPARATORS = re.compile(r'\\{2,}')
+SYSNATIVE = re.compile(r'\\sysnative(?=\\|$)')
+
+
+class PathNormalizer(object):
+    """ Memoized path normalization.
+        :param cache_size: Number of spellings kept in the LRU cache.
+        :param environment: Values of environment variables overriding DEFAULT_ENVIRONMENT.
+        :param strip_arguments: The inputs are command lines, drop their quotes,
+                                rundll32 entry points and arguments.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, environment=None, strip_arguments=False):
+        self.cache_size = cache_size
+        self.strip_arguments = strip_arguments
+        self.environment = dict(DEFAULT_ENVIRONMENT)
+        for name, value in (environment or {}).items():
+            self.environment[name.lower()] = value.lower().rstrip('\\')
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._spellings = set()
+        self._paths = set()
+
+    def __call__(self, path):
+        try:
+            normalized = self._cache.pop(path)
+            self.hits += 1
+        except KeyError:
+            normalized = self.normalize(path)
+            self.misses += 1
+            if len(self._cache) >= self.cache_size:
+                self._cache.popitem(last=False)
+        # Most recently used entries are at the end
+        self._cache[path] = normalized
+        return normalized
+
+    @property
+    def collapsed(self):
+        """ Number of distinct spellings merged into another one by normalize_all."""
+        return len(self._spellings) - len(self._paths)
+
+    def normalize_all(self, paths):
+        """ Yield the normalized paths, skipping the ones left empty."""
+        for path in paths:
+            normalized = self(path)
+            self._spellings.add(path)
+            self._paths.add(normalized)
+            if normalized:
+                yield normalized
+
+    def _expand(self, match):
+        return self.environment.get(match.group(1).lower(), match.group(0))
+
+    def normalize(self, path):
+        """ Normalize a path without the cache."""
+        path = path.strip()
+        if not self.strip_arguments:
+            path = path.strip('"')
+        elif path.lstrip('@').startswith('"'):
+            path = path.lstrip('@')[1:].split('"', 1)[0]
+        else:
+            # rundll32 style entry points and command line arguments
+            path = path.lstrip('@')
+            match = ARGUMENTS.search(path)
+            if match:
+                path = path[:match.end()]
+        path = path.strip().replace('/', '\\').lower()
+
+        for prefix in NT_PREFIXES:
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+        if path.startswith(SYSTEM_ROOT_PREFIX):
+            path = '%systemroot%\\' + path[len(SYSTEM_ROOT_PREFIX):]
+        elif path.startswith(SYSTEM_ROOT_RELATIVE):
+            path = '%systemroot%\\' + path
+        path = VARIABLE.sub(self._expand, path)
+
+        unc = '\\\\' if path.startswith('\\\\') else ''
+        path = unc + SEPARATORS.sub('\\\\', path[len(unc):])
+        path = SYSNATIVE.sub('\\\\system32', path)
+        return path.rstrip('. ')
@@ -18,378 +18,276 @@
 
 
 
+from __future__ import print_function
+
 from argparse import ArgumentParser
 import binascii
+from collections import namedtuple
 import ctypes
-from datetime import datetime,timedelta
+import functools
+import multiprocessing
 import ntpath
 import os
 import struct
 import sys
-import tempfile
 
+try:
+    from helper_scripts import filetime, lzxpress
+except ImportError:
+    import filetime
+    import lzxpress
+
+
+
+# Precompiled layouts of the Prefetch structures, all little-endian
+HEADER = struct.Struct("<4I60sI4x")                  # 84 bytes
+FILE_INFORMATION_17 = struct.Struct("<9I8s16xI4x")   # 68 bytes
+FILE_INFORMATION_23 = struct.Struct("<9I8x8s16xI84x")  # 156 bytes
+FILE_INFORMATION_26 = struct.Struct("<9I8x64s16xI96x")  # 224 bytes
+METRICS_17 = struct.Struct("<8xII4x")                # 20 bytes
+METRICS_23 = struct.Struct("<12xII4xIHH")            # 32 bytes
+VOLUME_INFORMATION = struct.Struct("<IIQIIIII")      # common 36 byte prefix
+VOLUME_ENTRY_SIZE = {17: 40, 23: 104, 26: 104, 30: 96}
+FILETIME = struct.Struct("<Q")
+RUN_TIMES = {8: FILETIME, 64: struct.Struct("<8Q")}  # last run times of 17/23 and 26/30
+STRING_LENGTH = struct.Struct("<H")
+
+# Parsed Prefetch file as returned by parse_directory. Timestamps are the raw
+# FILETIME values of the last executions, error is None when parsing succeeded.
+PrefetchRecord = namedtuple("PrefetchRecord", [
+    "filename", "executable", "hash", "run_count", "mft_seq_number", "mft_record_number",
+    "timestamps", "volumes", "directories", "resources", "error"])
+
+# Optional parts of a Prefetch file, the header and file information (run
+# count and last run times) are always parsed
+METRICS = "metrics"
+VOLUMES = "volumes"
+RESOURCES = "resources"
+ALL_FIELDS = frozenset([METRICS, VOLUMES, RESOURCES])
+TIMESTAMP_FIELDS = frozenset()
+
+
+def _text(raw):
+    # Strings are UTF-16 with the NUL bytes dropped, which leaves the bytes
+    # Python 2 always printed. Python 3 decodes them so they print the same.
+    return raw if isinstance(raw, str) else raw.decode("latin-1")
+
+
+def _strings(raw):
+    # Splits the UTF-16 strings of raw the same way as
+    # [_text(i.replace(b"\x00", b"")) for i in raw.split(b"\x00\x00")].
+    # When every character is below U+0100 dropping the NUL bytes leaves the
+    # Latin-1 text, so the whole block is decoded and split in a single pass.
+    try:
+        text = raw.decode("utf-16-le")
+        latin1 = text.encode("latin-1")
+    except UnicodeError:
+        return [_text(i.replace(b"\x00", b"")) for i in raw.split(b"\x00\x00")]
+    return (latin1 if isinstance(latin1, str) else text).split("\x00")
 
 
 class Prefetch(object):
-    def __init__(self, infile):
+    def __init__(self, infile, data=None, fields=None):
+        # The file is read once and every structure is decoded in place from
+        # a memoryview over that single buffer. fields selects the optional
+        # parts to parse (see ALL_FIELDS), the others are left empty.
         self.pFileName = infile
+        self.fields = ALL_FIELDS if fields is None else frozenset(fields)
+        self.mftSeqNumber = None
+        self.mftRecordNumber = None
+        self.volumesInformationArray = []
+        self.directoryStringsArray = []
+        self.resources = []
+
+        if data is None:
+            with open(infile, "rb") as f:
+                data = f.read()
+
+        if data[:3] == b"MAM":
+            data = DecompressWin10().decompress_buffer(data, infile)
+
+        buf = memoryview(data)
+        self.parseHeader(buf)
+
+        if self.version == 17:
+            self.fileInformation17(buf)
+            metricsArray = self.metricsArray17
+        elif self.version == 23:
+            self.fileInformation23(buf)
+            metricsArray = self.metricsArray23
+        elif self.version in (26, 30):
+            self.fileInformation26(buf)
+            metricsArray = self.metricsArray23
+        else:
+            raise Exception("Unsupported Prefetch version {0}".format(self.version))
+        self.getTimeStamps(self.lastRunTime)
+
+        if METRICS in self.fields:
+            metricsArray(buf)
+        if VOLUMES in self.fields:
+            self.volumeInformation(buf)
+        if RESOURCES in self.fields:
+            self.getFilenameStrings(buf)
 
-        with open(infile, "rb") as f:
-            if f.read(3) == "MAM":
-                f.close()
-
-                d = DecompressWin10()
-                decompressed = d.decompress(infile)
-
-                t = tempfile.mkstemp()
-
-                with open(t[1], "wb+") as f:
-                    f.write(decompressed)
-                    f.seek(0)
-
-                    self.parseHeader(f)
-                    self.fileInformation26(f)
-                    self.metricsArray23(f)
-                    self.traceChainsArray30(f)
-                    self.volumeInformation30(f)
-                    self.getTimeStamps(self.lastRunTime)
-                    self.directoryStrings(f)
-                    self.getFilenameStrings(f)
-                    return
-
-        with open(infile, "rb") as f:
-            self.parseHeader(f)
-            
-            if self.version == 17:
-                self.fileInformation17(f)
-                self.metricsArray17(f)
-                self.traceChainsArray17(f)
-                self.volumeInformation17(f)
-                self.getTimeStamps(self.lastRunTime)
-                self.directoryStrings(f)
-            
-            elif self.version == 23:
-                self.fileInformation23(f)
-                self.metricsArray23(f)
-                self.traceChainsArray17(f)
-                self.volumeInformation23(f)
-                self.getTimeStamps(self.lastRunTime)
-                self.directoryStrings(f)
-
-            elif self.version == 26:
-                self.fileInformation26(f)
-                self.metricsArray23(f)
-                self.traceChainsArray17(f)
-                self.volumeInformation23(f)
-                self.getTimeStamps(self.lastRunTime)
-                self.directoryStrings(f)
-
-            self.getFilenameStrings(f)
-
-    def parseHeader(self, infile):
+    def parseHeader(self, buf):
         # Parse the file header
         # 84 bytes
-        self.version = struct.unpack_from("I", infile.read(4))[0]
-        self.signature = struct.unpack_from("I", infile.read(4))[0]
-        unknown0 = struct.unpack_from("I", infile.read(4))[0]
-        self.fileSize = struct.unpack_from("I", infile.read(4))[0]
-        executableName = struct.unpack_from("60s", infile.read(60))[0]
-        executableName = executableName.split("\x00\x00")[0]
-        self.executableName = executableName.replace("\x00", "")
-        rawhash = hex(struct.unpack_from("I", infile.read(4))[0])
-        self.hash = rawhash.lstrip("0x")
-
-        unknown1 = infile.read(4)
-
-    def fileInformation17(self, infile):
+        (self.version, self.signature, unknown0, self.fileSize,
+         executableName, rawhash) = HEADER.unpack_from(buf, 0)
+        executableName = executableName.split(b"\x00\x00")[0]
+        self.executableName = _text(executableName.replace(b"\x00", b""))
+        self.hash = hex(rawhash).lstrip("0x")
+
+    def _fileInformation(self, layout, buf):
+        (self.metricsOffset, self.metricsCount, self.traceChainsOffset, self.traceChainsCount,
+         self.filenameStringsOffset, self.filenameStringsSize, self.volumesInformationOffset,
+         self.volumesCount, self.volumesInformationSize,
+         self.lastRunTime, self.runCount) = layout.unpack_from(buf, HEADER.size)
+
+    def fileInformation17(self, buf):
         # File Information
         # 68 bytes
-        self.metricsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.metricsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsSize = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesCount = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationSize = struct.unpack_from("I", infile.read(4))[0]
-        self.lastRunTime = infile.read(8)
-        unknown0 = infile.read(16)
-        self.runCount = struct.unpack_from("I", infile.read(4))[0]
-        unknown1 = infile.read(4)
-
-    def metricsArray17(self, infile):
-        # File Metrics Array
-        # 20 bytes
-        unknown0 = infile.read(4)
-        unknown1 = infile.read(4)
-        self.filenameOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameLength = struct.unpack_from("I", infile.read(4))[0]
-        unknown2 = infile.read(4)
-
-    def traceChainsArray17(self, infile):
-        # Read through the Trace Chains Array
-        # Not being parsed for information
-        # 12 bytes
-        infile.read(12)
-
-    def volumeInformation17(self, infile):
-        # Volume information
-        # 40 bytes per entry in the array
-        
-        infile.seek(self.volumesInformationOffset)
-        self.volumesInformationArray = []
-        self.directoryStringsArray = []
-        count = 0
-        
-        while count < self.volumesCount:
-            self.volPathOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.volPathLength = struct.unpack_from("I", infile.read(4))[0]
-            self.volCreationTime = struct.unpack_from("Q", infile.read(8))[0]
-            self.volSerialNumber = hex(struct.unpack_from("I", infile.read(4))[0])
-            self.volSerialNumber = self.volSerialNumber.rstrip("L").lstrip("0x")
-            self.fileRefOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.fileRefSize = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsCount = struct.unpack_from("I", infile.read(4))[0]
-            unknown0 = infile.read(4)
-
-            self.directoryStringsArray.append(self.directoryStrings(infile))
-
-            infile.seek(self.volumesInformationOffset + self.volPathOffset)
-            volume = {}
-            volume["Volume Name"] = infile.read(self.volPathLength * 2).replace("\x00", "")
-            volume["Creation Date"] = self.convertTimestamp(self.volCreationTime)
-            volume["Serial Number"] = self.volSerialNumber
-            self.volumesInformationArray.append(volume)
-            
-            count += 1
-            infile.seek(self.volumesInformationOffset + (40 * count))
+        self._fileInformation(FILE_INFORMATION_17, buf)
 
-    def fileInformation23(self, infile):
+    def fileInformation23(self, buf):
         # File Information
         # 156 bytes
-        self.metricsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.metricsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsSize = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesCount = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationSize = struct.unpack_from("I", infile.read(4))[0]
-        unknown0 = infile.read(8)
-        self.lastRunTime = infile.read(8)
-        unknown1 = infile.read(16)
-        self.runCount = struct.unpack_from("I", infile.read(4))[0]
-        unknown2 = infile.read(84)
-
-    def metricsArray23(self, infile):
+        self._fileInformation(FILE_INFORMATION_23, buf)
+
+    def fileInformation26(self, buf):
+        # File Information
+        # 224 bytes, also used by the Windows 10 (version 30) format
+        self._fileInformation(FILE_INFORMATION_26, buf)
+
+    def metricsArray17(self, buf):
         # File Metrics Array
-        # 32 bytes per array, not parsed in this script
-        infile.seek(self.metricsOffset)
-        unknown0 = infile.read(4)
-        unknown1 = infile.read(4)
-        unknown2 = infile.read(4)
-        self.filenameOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameLength = struct.unpack_from("I", infile.read(4))[0]
-        unknown3 = infile.read(4)
-        self.mftRecordNumber = self.convertFileReference(infile.read(6))
-        self.mftSeqNumber = struct.unpack_from("H", infile.read(2))[0]
-
-    def volumeInformation23(self, infile):
-        # This function consumes the Volume Information array
-        # 104 bytes per structure in the array
-        # Returns a dictionary object which holds another dictionary
-        # for each volume information array entry
-
-        infile.seek(self.volumesInformationOffset)
+        # 20 bytes, directly follows the file information
+        self.filenameOffset, self.filenameLength = METRICS_17.unpack_from(
+            buf, HEADER.size + FILE_INFORMATION_17.size)
+
+    def metricsArray23(self, buf):
+        # File Metrics Array
+        # 32 bytes per array, only the first entry is parsed
+        (self.filenameOffset, self.filenameLength, mftLow, mftHigh,
+         self.mftSeqNumber) = METRICS_23.unpack_from(buf, self.metricsOffset)
+        self.mftRecordNumber = mftLow | (mftHigh << 32)
+
+    def volumeInformation(self, buf):
+        # Consumes the Volume Information array, 40 bytes per entry for
+        # version 17, 104 bytes for versions 23 and 26 and 96 bytes for 30
+        entrySize = VOLUME_ENTRY_SIZE[self.version]
         self.volumesInformationArray = []
         self.directoryStringsArray = []
-        
-        count = 0
-        while count < self.volumesCount:
-            self.volPathOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.volPathLength = struct.unpack_from("I", infile.read(4))[0]
-            self.volCreationTime = struct.unpack_from("Q", infile.read(8))[0]
-            volSerialNumber = hex(struct.unpack_from("I", infile.read(4))[0])
-            self.volSerialNumber = volSerialNumber.rstrip("L").lstrip("0x")
-            self.fileRefOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.fileRefCount = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsCount = struct.unpack_from("I", infile.read(4))[0]
-            unknown0 = infile.read(68)
-
-            self.directoryStringsArray.append(self.directoryStrings(infile))
-            
-            infile.seek(self.volumesInformationOffset + self.volPathOffset)
-            volume = {}
-            volume["Volume Name"] = infile.read(self.volPathLength * 2).replace("\x00", "")
-            volume["Creation Date"] = self.convertTimestamp(self.volCreationTime)
-            volume["Serial Number"] = self.volSerialNumber
-            self.volumesInformationArray.append(volume)
-            
-            count += 1
-            infile.seek(self.volumesInformationOffset + (104 * count))
 
+        for count in range(self.volumesCount):
+            offset = self.volumesInformationOffset + entrySize * count
+            (volPathOffset, volPathLength, volCreationTime, volSerialNumber,
+             self.fileRefOffset, self.fileRefCount, dirStringsOffset,
+             dirStringsCount) = VOLUME_INFORMATION.unpack_from(buf, offset)
 
-    def fileInformation26(self, infile):
-        # File Information
-        # 224 bytes
-        self.metricsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.metricsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.traceChainsCount = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.filenameStringsSize = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationOffset = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesCount = struct.unpack_from("I", infile.read(4))[0]
-        self.volumesInformationSize = struct.unpack_from("I", infile.read(4))[0]
-        unknown0 = infile.read(8)
-        self.lastRunTime = infile.read(64)
-        unknown1 = infile.read(16)
-        self.runCount = struct.unpack_from("I", infile.read(4))[0]
-        unknown2 = infile.read(96)
-
-    def traceChainsArray30(self, infile):
-        # Trace Chains Array
-        # Read though, not being parsed for information
-        # 8 bytes
-        infile.read(8)
-
-    def volumeInformation30(self, infile):
-        # Volumes Information
-        # 96 bytes
-
-        infile.seek(self.volumesInformationOffset)
-        self.volumesInformationArray = []
-        self.directoryStringsArray = []
+            self.directoryStringsArray.append(
+                self.directoryStrings(buf, self.volumesInformationOffset + dirStringsOffset, dirStringsCount))
 
-        count = 0
-        while count < self.volumesCount:
-            self.volPathOffset = struct.unpack_from("I", infile.read(4))[0] 
-            self.volPathLength = struct.unpack_from("I", infile.read(4))[0]
-            self.volCreationTime = struct.unpack_from("Q", infile.read(8))[0]
-            self.volSerialNumber = hex(struct.unpack_from("I", infile.read(4))[0])
-            self.volSerialNumber = self.volSerialNumber.rstrip("L").lstrip("0x")
-            self.fileRefOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.fileRefCount = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsOffset = struct.unpack_from("I", infile.read(4))[0]
-            self.dirStringsCount = struct.unpack_from("I", infile.read(4))[0]
-            unknown0 = infile.read(60)
-
-            self.directoryStringsArray.append(self.directoryStrings(infile))
-
-            infile.seek(self.volumesInformationOffset + self.volPathOffset)
+            start = self.volumesInformationOffset + volPathOffset
             volume = {}
-            volume["Volume Name"] = infile.read(self.volPathLength * 2).replace("\x00", "")
-            volume["Creation Date"] = self.convertTimestamp(self.volCreationTime)
-            volume["Serial Number"] = self.volSerialNumber
+            volume["Volume Name"] = _text(buf[start:start + volPathLength * 2].tobytes().replace(b"\x00", b""))
+            volume["Creation Date"] = volCreationTime  # raw FILETIME, formatted on output
+            volume["Serial Number"] = hex(volSerialNumber).rstrip("L").lstrip("0x")
             self.volumesInformationArray.append(volume)
-            
-            count += 1
-            infile.seek(self.volumesInformationOffset + (96 * count))
 
-
-
-    def getFilenameStrings(self, infile):
+    def getFilenameStrings(self, buf):
         # Parses filename strings from the PF file
-        self.resources = []
-        infile.seek(self.filenameStringsOffset)
-        self.filenames = infile.read(self.filenameStringsSize)
-
-        for i in self.filenames.split("\x00\x00"):
-            self.resources.append(i.replace("\x00", ""))
+        start = self.filenameStringsOffset
+        self.filenames = buf[start:start + self.filenameStringsSize].tobytes()
+        self.resources = _strings(self.filenames)
 
     def convertTimestamp(self, timestamp):
-        # Timestamp is a Win32 FILETIME value
-        # This function returns that value in a human-readable format
-        return str(datetime(1601,1,1) + timedelta(microseconds=timestamp / 10.))
+        return convertTimestamp(timestamp)
 
+    @property
+    def timestamps(self):
+        # Run times are kept as raw FILETIMEs and only formatted when asked for
+        return convertTimestamps(self.runTimes)
 
     def getTimeStamps(self, lastRunTime):
-        self.timestamps = []
-
-        start = 0
-        end = 8
-        while end <= len(lastRunTime):
-            timestamp = struct.unpack_from("Q", lastRunTime[start:end])[0]
-
-            if timestamp:
-                self.timestamps.append(self.convertTimestamp(timestamp))
-                start += 8
-                end += 8
-            else:
-                break
-
-    def directoryStrings(self, infile):
-        infile.seek(self.volumesInformationOffset)
-        infile.seek(self.dirStringsOffset, 1)
+        # Unused run time slots are zero, the run times end at the first one
+        self.runTimes = list(RUN_TIMES[len(lastRunTime)].unpack(lastRunTime))
+        if 0 in self.runTimes:
+            del self.runTimes[self.runTimes.index(0):]
 
+    def directoryStrings(self, buf, offset, count):
         directoryStrings = []
 
-        count = 0
-        while count < self.dirStringsCount:
-            stringLength = struct.unpack_from("<H", infile.read(2))[0] * 2
-            directoryString = infile.read(stringLength).replace("\x00", "")
-            infile.read(2) # Read through the end-of-string null byte
-            directoryStrings.append(directoryString)
-            count += 1
+        for i in range(count):
+            stringLength = STRING_LENGTH.unpack_from(buf, offset)[0] * 2
+            offset += 2
+            directoryStrings.append(_text(buf[offset:offset + stringLength].tobytes().replace(b"\x00", b"")))
+            offset += stringLength + 2  # Skip the end-of-string null character
 
         return directoryStrings
 
     def convertFileReference(self, buf):
-        byteArray = map(lambda x: '%02x' % ord(x), buf)
-            
-        byteString = ""
-        for i in byteArray[::-1]:
-            byteString += i
-        
-        return int(byteString, 16)
+        # 6 byte little-endian MFT record number
+        low, high = struct.unpack("<IH", buf)
+        return low | (high << 32)
+
 
+    def record(self, error=None):
+        # Structured view of the parsed file, see PrefetchRecord
+        return PrefetchRecord(
+            ntpath.basename(self.pFileName), self.executableName, self.hash, self.runCount,
+            self.mftSeqNumber, self.mftRecordNumber,
+            self.runTimes, self.volumesInformationArray, self.directoryStringsArray, self.resources, error)
 
     def prettyPrint(self):
         # Prints important Prefetch data in a structured format
-        banner = "=" * (len(ntpath.basename(self.pFileName)) + 2)
-        print "\n{0}\n{1}\n{0}\n".format(banner, ntpath.basename(self.pFileName))
-        print "Executable Name: {}\n".format(self.executableName)
-        print "Run count: {}".format(self.runCount)
-
-        if len(self.timestamps) > 1:
-            print "Last Executed:"
-            for i in self.timestamps:
-                print "    " + i
-        else:
-            print "Last Executed: {}".format(self.timestamps[0])
-        
-        print "\nVolume Information:"
-        for i in self.volumesInformationArray:
-            print "    Volume Name: " + i["Volume Name"]
-            print "    Creation Date: " + i["Creation Date"]
-            print "    Serial Number: " + i["Serial Number"]
-            print ""
-
-        print "Directory Strings:"
-        for volume in self.directoryStringsArray:
-            for i in volume:
-                print "    " + i
-        print ""
-
-        print "Resources loaded:\n"
-        count = 1
-        for i in self.resources:
-            if i:
-                if count > 999:
-                    print "{}: {}".format(count, i)
-                if count > 99:
-                    print "{}:  {}".format(count, i)                            
-                elif count > 9:
-                    print "{}:   {}".format(count, i)
-                else:
-                    print "{}:    {}".format(count, i)
-            count += 1
+        printRecord(self.record())
+
+
+def printRecord(record):
+    banner = "=" * (len(record.filename) + 2)
+    print("\n{0}\n{1}\n{0}\n".format(banner, record.filename))
+    print("Executable Name: {}\n".format(record.executable))
+    print("Run count: {}".format(record.run_count))
+
+    # Format every FILETIME of the record in one batch
+    dates = convertTimestamps(record.timestamps + [i["Creation Date"] for i in record.volumes])
+    timestamps, creationDates = dates[:len(record.timestamps)], dates[len(record.timestamps):]
+    if len(timestamps) > 1:
+        print("Last Executed:")
+        for i in timestamps:
+            print("    " + i)
+    else:
+        print("Last Executed: {}".format(timestamps[0]))
+
+    print("\nVolume Information:")
+    for i, creationDate in zip(record.volumes, creationDates):
+        print("    Volume Name: " + i["Volume Name"])
+        print("    Creation Date: " + creationDate)
+        print("    Serial Number: " + i["Serial Number"])
+        print("")
+
+    print("Directory Strings:")
+    for volume in record.directories:
+        for i in volume:
+            print("    " + i)
+    print("")
+
+    print("Resources loaded:\n")
+    count = 1
+    for i in record.resources:
+        if i:
+            if count > 999:
+                print("{}: {}".format(count, i))
+            if count > 99:
+                print("{}:  {}".format(count, i))
+            elif count > 9:
+                print("{}:   {}".format(count, i))
+            else:
+                print("{}:    {}".format(count, i))
+        count += 1
 
-        print ""
+    print("")
 
 
 # The code in the class below was taken and then modified from Francesco 
@@ -404,7 +302,8 @@ class Prefetch(object):
 # Source: https://github.com/dfirfpi/hotoloti/blob/master/sas/w10pfdecomp.py
 # License: http://www.apache.org/licenses/LICENSE-2.0
 
-#Windows-only utility to decompress MAM compressed files
+# Utility to decompress MAM compressed files. Uses ntdll on Windows 8+ and the
+# portable lzxpress decoder everywhere else.
 class DecompressWin10(object):
     def __init__(self):
         pass
@@ -416,6 +315,12 @@ class DecompressWin10(object):
     def decompress(self, infile):
         """Utility core."""
 
+        with open(infile, 'rb') as fin:
+            return self.decompress_buffer(fin.read(), infile)
+
+    def decompress_buffer(self, data, infile=None):
+        """Decompress the contents of a MAM compressed file held in memory."""
+
         NULL = ctypes.POINTER(ctypes.c_uint)()
         SIZE_T = ctypes.c_uint
         DWORD = ctypes.c_uint32
@@ -423,108 +328,137 @@ class DecompressWin10(object):
         UCHAR  = ctypes.c_ubyte
         ULONG = ctypes.c_uint32
 
-        # You must have at least Windows 8, or it should fail.
+        # RtlDecompressBufferEx needs at least Windows 8, fall back to the
+        # portable decoder when it is not available. Failures raise
+        # DecompressionError so parseFile can report them per file.
         try:
             RtlDecompressBufferEx = ctypes.windll.ntdll.RtlDecompressBufferEx
-        except AttributeError, e:
-            sys.exit("[ - ] {}".format(e) + \
-            "\n[ - ] Windows 8+ required for this script to decompress Win10 Prefetch files")
+        except AttributeError:
+            return lzxpress.decompress_mam(data)
 
         RtlGetCompressionWorkSpaceSize = \
             ctypes.windll.ntdll.RtlGetCompressionWorkSpaceSize
 
-        with open(infile, 'rb') as fin:
-            header = fin.read(8)
-            compressed = fin.read()
-
-            signature, decompressed_size = struct.unpack('<LL', header)
-            calgo = (signature & 0x0F000000) >> 24
-            crcck = (signature & 0xF0000000) >> 28
-            magic = signature & 0x00FFFFFF
-            if magic != 0x004d414d :
-                sys.exit('Wrong signature... wrong file?')
-
-            if crcck:
-                # I could have used RtlComputeCrc32.
-                file_crc = struct.unpack('<L', compressed[:4])[0]
-                crc = binascii.crc32(header)
-                crc = binascii.crc32(struct.pack('<L',0), crc)
-                compressed = compressed[4:]
-                crc = binascii.crc32(compressed, crc)          
-                if crc != file_crc:
-                    sys.exit('{} Wrong file CRC {0:x} - {1:x}!'.format(infile, crc, file_crc))
-
-            compressed_size = len(compressed)
-
-            ntCompressBufferWorkSpaceSize = ULONG()
-            ntCompressFragmentWorkSpaceSize = ULONG()
-
-            ntstatus = RtlGetCompressionWorkSpaceSize(USHORT(calgo),
-                ctypes.byref(ntCompressBufferWorkSpaceSize),
-                ctypes.byref(ntCompressFragmentWorkSpaceSize))
-
-            if ntstatus:
-                sys.exit('Cannot get workspace size, err: {}'.format(
-                    self.tohex(ntstatus, 32)))
-                    
-            ntCompressed = (UCHAR * compressed_size).from_buffer_copy(compressed)
-            ntDecompressed = (UCHAR * decompressed_size)()
-            ntFinalUncompressedSize = ULONG()
-            ntWorkspace = (UCHAR * ntCompressFragmentWorkSpaceSize.value)()
-            
-            ntstatus = RtlDecompressBufferEx(
-                USHORT(calgo),
-                ctypes.byref(ntDecompressed),
-                ULONG(decompressed_size),
-                ctypes.byref(ntCompressed),
-                ULONG(compressed_size),
-                ctypes.byref(ntFinalUncompressedSize),
-                ctypes.byref(ntWorkspace))
-
-            if ntstatus:
-                sys.exit('Decompression failed, err: {}'.format(
-                    tohex(ntstatus, 32)))
-
-            if ntFinalUncompressedSize.value != decompressed_size:
-                sys.exit('Decompressed with a different size than original!')
+        header = data[:8]
+        compressed = data[8:]
+
+        signature, decompressed_size = struct.unpack('<LL', header)
+        calgo = (signature & 0x0F000000) >> 24
+        crcck = (signature & 0xF0000000) >> 28
+        magic = signature & 0x00FFFFFF
+        if magic != 0x004d414d :
+            raise lzxpress.DecompressionError('Wrong signature... wrong file?')
+
+        if crcck:
+            # I could have used RtlComputeCrc32.
+            file_crc = struct.unpack('<L', compressed[:4])[0]
+            crc = binascii.crc32(header)
+            crc = binascii.crc32(struct.pack('<L',0), crc)
+            compressed = compressed[4:]
+            crc = binascii.crc32(compressed, crc) & 0xFFFFFFFF
+            if crc != file_crc:
+                raise lzxpress.DecompressionError('Wrong file CRC {0:x} - {1:x}!'.format(crc, file_crc))
+
+        compressed_size = len(compressed)
+
+        ntCompressBufferWorkSpaceSize = ULONG()
+        ntCompressFragmentWorkSpaceSize = ULONG()
+
+        ntstatus = RtlGetCompressionWorkSpaceSize(USHORT(calgo),
+            ctypes.byref(ntCompressBufferWorkSpaceSize),
+            ctypes.byref(ntCompressFragmentWorkSpaceSize))
+
+        if ntstatus:
+            raise lzxpress.DecompressionError('Cannot get workspace size, err: {}'.format(
+                self.tohex(ntstatus, 32)))
+                
+        ntCompressed = (UCHAR * compressed_size).from_buffer_copy(compressed)
+        ntDecompressed = (UCHAR * decompressed_size)()
+        ntFinalUncompressedSize = ULONG()
+        ntWorkspace = (UCHAR * ntCompressFragmentWorkSpaceSize.value)()
+        
+        ntstatus = RtlDecompressBufferEx(
+            USHORT(calgo),
+            ctypes.byref(ntDecompressed),
+            ULONG(decompressed_size),
+            ctypes.byref(ntCompressed),
+            ULONG(compressed_size),
+            ctypes.byref(ntFinalUncompressedSize),
+            ctypes.byref(ntWorkspace))
+
+        if ntstatus:
+            raise lzxpress.DecompressionError('Decompression failed, err: {}'.format(
+                self.tohex(ntstatus, 32)))
+
+        if ntFinalUncompressedSize.value != decompressed_size:
+            raise lzxpress.DecompressionError('Decompressed with a different size than original!')
 
         return bytearray(ntDecompressed)
 
 
 
-def sortTimestamps(directory):
+def parseFile(file_path, fields=None):
+    # Parses one Prefetch file into a PrefetchRecord, failures are returned
+    # in the error field instead of being raised so a pool keeps going
+    filename = ntpath.basename(file_path)
+    try:
+        if os.path.getsize(file_path) == 0:
+            raise Exception("Zero-byte Prefetch file")
+        return Prefetch(file_path, fields=fields).record()
+    except lzxpress.DecompressionError as e:
+        error = "MAM decompression failed: {0}".format(e)
+    except Exception as e:
+        error = str(e) or repr(e)
+    return PrefetchRecord(filename, None, None, None, None, None, [], [], [], [], error)
+
+
+def parse_directory(directory, workers=None, chunksize=16, fields=None):
+    """ Parse every .pf file of a directory in a pool of worker processes.
+        :param workers: Number of processes, defaults to the number of cores.
+                        With 1 the files are parsed in the calling process.
+        :param fields: Optional parts to parse, see Prefetch. Defaults to all.
+        :return: Generator of PrefetchRecord, in file name order.
+    """
+    files = [os.path.join(directory, i) for i in sorted(os.listdir(directory)) if i.endswith(".pf")]
+    parse = functools.partial(parseFile, fields=fields)
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1 or len(files) <= 1:
+        for file_path in files:
+            yield parse(file_path)
+        return
+
+    pool = multiprocessing.Pool(min(workers, len(files)))
+    try:
+        for record in pool.imap(parse, files, chunksize):
+            yield record
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def sortTimestamps(directory, workers=None):
     timestamps = []
 
-    for i in os.listdir(directory):
-        if i.endswith(".pf"):
-            if os.path.getsize(directory + i) > 0:
-                try:
-                    p = Prefetch(directory + i)
-                except Exception, e:
-                    print "[ - ] {} could not be parsed".format(i)
-                    continue
-            else:
-                continue
-            
-            start = 0
-            end = 8
-            while end <= len(p.lastRunTime):
-                tstamp = struct.unpack_from("Q", p.lastRunTime[start:end])[0]
-
-                if tstamp:
-                    timestamps.append((tstamp, i[:-3]))
-                    start += 8
-                    end += 8
-                else:
-                    break
-    
+    # Only the run times are needed, skip the metrics, volumes and resources
+    for record in parse_directory(directory, workers, fields=TIMESTAMP_FIELDS):
+        if record.error:
+            print("[ - ] {} could not be parsed".format(record.filename))
+            continue
+        for tstamp in record.timestamps:
+            timestamps.append((tstamp, record.filename[:-3]))
+
     return sorted(timestamps, key=lambda tup: tup[0], reverse=True)
-    
+
+
+def convertTimestamps(timestamps):
+    # Timestamps are Win32 FILETIME values
+    # This function returns them in a human-readable format, converted as a batch
+    return filetime.to_strings(timestamps, microseconds=True, invalid="N/A")
+
 
 def convertTimestamp(timestamp):
-        # Timestamp is a Win32 FILETIME value
-        # This function returns that value in a human-readable format
-        return str(datetime(1601,1,1) + timedelta(microseconds=timestamp / 10.))
+    return convertTimestamps([timestamp])[0]
 
 
 
@@ -534,6 +468,7 @@ def main(argv=[]):
     p.add_argument("-d", "--directory", help="Parse all PF files in a given directory")
     p.add_argument("-e", "--executed", help="Sort PF files by ALL execution times")
     p.add_argument("-f", "--file", help="Parse a given Prefetch file")
+    p.add_argument("-w", "--workers", help="Number of processes parsing a directory, defaults to the number of cores", type=int)
     args = p.parse_args(argv[1:])
 
     if args.file:
@@ -541,17 +476,17 @@ def main(argv=[]):
             if os.path.getsize(args.file) > 0:
                 try:
                     p = Prefetch(args.file)
-                except Exception, e:
-                    print "[ - ] {}".format(e)
+                except Exception as e:
+                    print("[ - ] {}".format(e))
                     sys.exit("[ - ] {} could not be parsed".format(args.file))
                 
                 if args.csv:
-                    print "Last Executed, Executable Name, Run Count"
-                    print "{}, {}-{}, {}".format(p.timestamps[0], p.executableName, p.hash, p.runCount)
+                    print("Last Executed, Executable Name, Run Count")
+                    print("{}, {}-{}, {}".format(p.timestamps[0], p.executableName, p.hash, p.runCount))
                 else:
                     p.prettyPrint()
             else:
-                print "[ - ] {}: Zero byte Prefetch file".format(args.file)
+                print("[ - ] {}: Zero byte Prefetch file".format(args.file))
 
     elif args.directory:
         if not (args.directory.endswith("/") or args.directory.endswith("\\")):
@@ -559,40 +494,26 @@ def main(argv=[]):
 
         if os.path.isdir(args.directory):
             if args.csv:
-                print "Last Executed, MFT Seq Number, MFT Record Number, Executable Name, Run Count"
-
-                for i in os.listdir(args.directory):
-                    if i.endswith(".pf"):
-                        if os.path.getsize(args.directory + i) > 0:
-                            try:
-                                p = Prefetch(args.directory + i)
-                            except Exception, e:
-                                print "[ - ] {} could not be parsed".format(i)
-                            print "{},{},{},{},{}".format(p.timestamps[0], p.mftSeqNumber, p.mftRecordNumber, p.executableName, p.runCount)
-                        else:
-                            print "[ - ] {}: Zero-byte Prefetch File".format(i)
-                    else:
-                        continue
-
-            else:
-                for i in os.listdir(args.directory):
-                    if i.endswith(".pf"):
-                        if os.path.getsize(args.directory + i):
-                            try:
-                                p = Prefetch(args.directory + i)
-                                p.prettyPrint()
-                            except Exception, e:
-                                print "[ - ] {} could not be parsed".format(i)
-                        else:
-                            print "[ - ] Zero-byte Prefetch file"
+                print("Last Executed, MFT Seq Number, MFT Record Number, Executable Name, Run Count")
+
+            fields = [METRICS] if args.csv else None
+            for record in parse_directory(args.directory, args.workers, fields=fields):
+                if record.error:
+                    print("[ - ] {} could not be parsed: {}".format(record.filename, record.error))
+                elif args.csv:
+                    print("{},{},{},{},{}".format(convertTimestamp(record.timestamps[0]), record.mft_seq_number,
+                                                   record.mft_record_number, record.executable, record.run_count))
+                else:
+                    printRecord(record)
 
     elif args.executed:
         if not (args.executed.endswith("/") or args.executed.endswith("\\")):
             sys.exit("\n[ - ] When enumerating a directory, add a trailing slash\n")
 
-        print "Execution Time, File Executed"
-        for i in  sortTimestamps(args.executed):
-            print "{}, {}".format(convertTimestamp(i[0]), i[1])
+        print("Execution Time, File Executed")
+        timestamps = sortTimestamps(args.executed, args.workers)
+        for i, date in zip(timestamps, convertTimestamps([i[0] for i in timestamps])):
+            print("{}, {}".format(date, i[1]))
 
 
 if __name__ == '__main__':
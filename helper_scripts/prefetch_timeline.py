@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Fleet wide execution timeline from carved prefetch files.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Every host's prefetch files are parsed (run times only) into a sorted run
+spilled to a temporary file, and the runs are combined with a streaming k-way
+merge. Memory is bounded by the number of hosts, not the number of events.
+EXAMPLE USAGE:::
+python -m helper_scripts.prefetch_timeline prefetch/ --start 2019-06-01 --format jsonl -o timeline.jsonl
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+try:
+    from helper_scripts import filetime, prefetch
+except ImportError:
+    import filetime
+    import prefetch
+
+DEFAULT_MAX_OPEN_RUNS = 256
+FORMAT_BATCH_SIZE = 4096
+
+
+def parse_time(value):
+    """ Parse a 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' argument into a FILETIME."""
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return filetime.from_datetime(datetime.strptime(value, date_format))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError("Invalid time '{0}', expected YYYY-MM-DD [HH:MM:SS]".format(value))
+
+
+def host_directories(root):
+    """ Every sub directory of root is a host, as laid out by scan_prefetch (prefetch/<host_identifier>/)."""
+    return [(name, os.path.join(root, name)) for name in sorted(os.listdir(root))
+            if os.path.isdir(os.path.join(root, name))]
+
+
+def _encode(line):
+    return line if isinstance(line, bytes) else line.encode('utf-8')
+
+
+def _decode(line):
+    return line if isinstance(line, str) else line.decode('utf-8')
+
+
+def new_run(run_dir):
+    fd, run_path = tempfile.mkstemp(suffix=".run", dir=run_dir)
+    os.close(fd)
+    return run_path
+
+
+def write_run(file_path, events):
+    # One tab separated "filetime host executable" line per event, none of
+    # them can hold a tab
+    with open(file_path, 'wb') as f:
+        for timestamp, host, executable in events:
+            f.write(_encode("{0}\t{1}\t{2}\n".format(timestamp, host, executable)))
+
+
+def read_run(file_path, reverse):
+    """ Yield (sort key, filetime, host, executable) tuples of a run, the key is
+        negated for newest first order since heapq.merge only merges ascending.
+    """
+    with open(file_path, 'rb') as f:
+        for line in f:
+            timestamp, host, executable = _decode(line).rstrip("\n").split("\t", 2)
+            timestamp = int(timestamp)
+            yield (-timestamp if reverse else timestamp), timestamp, host, executable
+
+
+def host_run(args):
+    """ Parse the prefetch files of one host into a sorted run file.
+        :return: (host, run file path, event count, list of (file, error)).
+    """
+    host, directory, run_dir, start, end, reverse = args
+    events = set()  # the same file carved by several sweeps yields the same runs
+    errors = []
+    for dir_path, dir_names, file_names in os.walk(directory):
+        for name in file_names:
+            if not name.endswith(".pf"):
+                continue
+            record = prefetch.parseFile(os.path.join(dir_path, name), fields=prefetch.TIMESTAMP_FIELDS)
+            if record.error:
+                errors.append((os.path.join(dir_path, name), record.error))
+                continue
+            for timestamp in record.timestamps:
+                if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                    events.add((timestamp, host, record.filename[:-3]))
+
+    run_path = new_run(run_dir)
+    write_run(run_path, sorted(events, key=lambda event: (-event[0] if reverse else event[0], event[2])))
+    return host, run_path, len(events), errors
+
+
+def merge_runs(run_paths, reverse):
+    """ Streaming k-way merge of sorted runs, yields (filetime, host, executable)."""
+    for event in heapq.merge(*[read_run(run_path, reverse) for run_path in run_paths]):
+        yield event[1:]
+
+
+def reduce_runs(run_paths, run_dir, reverse, max_open=DEFAULT_MAX_OPEN_RUNS):
+    """ Merge groups of runs into larger runs until at most max_open remain, so the
+        final merge does not hold a file handle per host.
+    """
+    while len(run_paths) > max_open:
+        merged = []
+        for i in range(0, len(run_paths), max_open):
+            group = run_paths[i:i + max_open]
+            if len(group) == 1:
+                merged.extend(group)
+                continue
+            run_path = new_run(run_dir)
+            write_run(run_path, merge_runs(group, reverse))
+            for path in group:
+                os.remove(path)
+            merged.append(run_path)
+        run_paths = merged
+    return run_paths
+
+
+def build_timeline(hosts, start=None, end=None, reverse=True, workers=None, run_dir=None,
+                   max_open=DEFAULT_MAX_OPEN_RUNS, on_host=None):
+    """ Execution timeline across hosts.
+        :param hosts: List of (host identifier, directory of carved prefetch files).
+        :param start: Only runs at or after this FILETIME.
+        :param end: Only runs before this FILETIME.
+        :param reverse: Newest first, like prefetch.sortTimestamps.
+        :param on_host: Called with (host, event count, errors) once a host is parsed.
+        :return: Generator of (filetime, host, executable).
+    """
+    temp_dir = tempfile.mkdtemp(prefix="prefetch_timeline", dir=run_dir)
+    try:
+        tasks = [(host, directory, temp_dir, start, end, reverse) for host, directory in hosts]
+        pool = multiprocessing.Pool(workers or multiprocessing.cpu_count())
+        run_paths = []
+        try:
+            for host, run_path, count, errors in pool.imap(host_run, tasks):
+                run_paths.append(run_path)
+                if on_host:
+                    on_host(host, count, errors)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+        run_paths = reduce_runs(run_paths, temp_dir, reverse, max_open)
+        for event in merge_runs(run_paths, reverse):
+            yield event
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def formatted(events, batch_size=FORMAT_BATCH_SIZE):
+    """ Yield (time, filetime, host, executable), formatting the times in batches."""
+    events = iter(events)
+    while True:
+        batch = list(itertools.islice(events, batch_size))
+        if not batch:
+            return
+        for date, event in zip(prefetch.convertTimestamps([event[0] for event in batch]), batch):
+            yield (date,) + tuple(event)
+
+
+def write_csv(events, out):
+    out.write("Execution Time,FILETIME,File Executed,Host\n")
+    for date, timestamp, host, executable in formatted(events):
+        out.write("{0},{1},{2},{3}\n".format(date, timestamp, executable, host))
+
+
+def write_jsonl(events, out):
+    for date, timestamp, host, executable in formatted(events):
+        out.write(json.dumps({'time': date, 'filetime': timestamp, 'executable': executable, 'host': host}) + "\n")
+
+
+def report_host(host, count, errors):
+    for file_path, error in errors:
+        sys.stderr.write("[ - ] {0} could not be parsed: {1}\n".format(file_path, error))
+    sys.stderr.write("{0}: {1} executions\n".format(host, count))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge the prefetch execution times of many hosts.')
+    parser.add_argument('root', help='Directory with one sub directory of carved prefetch files per host')
+    parser.add_argument('--start', help='Only executions at or after this time (YYYY-MM-DD [HH:MM:SS])',
+                        type=parse_time)
+    parser.add_argument('--end', help='Only executions before this time (YYYY-MM-DD [HH:MM:SS])', type=parse_time)
+    parser.add_argument('--oldest_first', help='Sort the oldest executions first', action='store_true')
+    parser.add_argument('--format', help='Output format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('-o', '--output', help='Output file, defaults to stdout')
+    parser.add_argument('-w', '--workers', help='Number of hosts parsed concurrently', type=int)
+    args = parser.parse_args(argv)
+
+    events = build_timeline(host_directories(args.root), args.start, args.end, not args.oldest_first,
+                            args.workers, on_host=report_host)
+    writer = write_jsonl if args.format == 'jsonl' else write_csv
+    if args.output:
+        with open(args.output, 'w') as out:
+            writer(events, out)
+    else:
+        writer(events, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
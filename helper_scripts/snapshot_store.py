@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Local per-host snapshots used by the incremental sweeps.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+A snapshot is a dict mapping an entry key to the values that identify its
+state. Snapshots are stored as JSON under <store_dir>/<host_identifier>/<name>.json.
+"""
+
+import json
+import os
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(store_dir, host_identifier, name):
+    return os.path.join(store_dir, host_identifier, name + '.json')
+
+
+def load_snapshot(store_dir, host_identifier, name):
+    """ Return the last stored snapshot, or an empty dict when there is none."""
+    file_path = snapshot_path(store_dir, host_identifier, name)
+    try:
+        with open(file_path) as f:
+            stored = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if stored.get('version') != SNAPSHOT_VERSION:
+        return {}
+    return stored.get('entries', {})
+
+
+def save_snapshot(store_dir, host_identifier, name, entries):
+    file_path = snapshot_path(store_dir, host_identifier, name)
+    try:
+        os.makedirs(os.path.dirname(file_path))
+    except OSError:
+        pass
+    # Write to a temporary file first so an interrupted run keeps the previous snapshot
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'entries': entries}, f)
+    replace(temp_path, file_path)
+    return file_path
+
+
+def replace(source, destination):
+    # Atomic rename over the destination
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+        return
+    try:
+        os.rename(source, destination)
+    except OSError:
+        # Python 2 on Windows can not rename over an existing file
+        if not os.path.exists(destination):
+            raise
+        os.remove(destination)
+        os.rename(source, destination)
+
+
+def diff_snapshots(previous, current):
+    """ Compare two snapshots.
+        :return: (added, changed, removed) lists of keys. Values are compared as
+                 lists, so a tuple matches the list it was stored as.
+    """
+    added = []
+    changed = []
+    for key, value in current.items():
+        if key not in previous:
+            added.append(key)
+        elif list(previous[key]) != list(value):
+            changed.append(key)
+    removed = [key for key in previous if key not in current]
+    return sorted(added), sorted(changed), sorted(removed)
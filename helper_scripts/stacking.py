@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Fleet wide stacking (frequency analysis) of autoruns, ShimCache and prefetch entries.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Every (category, path) is counted once per host that has it, and the entries
+found on the fewest hosts are ranked first. Counting is exact with a hash map,
+or bounded in memory with a count-min sketch and a list of heavy hitters for
+very large fleets. The output has a path column, so the long tail can be handed
+to fetch_hash_from_path and the VirusTotal lookup on its own.
+EXAMPLE USAGE:::
+python -m helper_scripts.stacking autoruns/ appcompat/ prefetch/ --threshold 2 -o rare.csv
+python -m helper_scripts.stacking autoruns/ --sketch --limit 500
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+
+try:
+    from helper_scripts import path_normalizer, prefetch
+except ImportError:
+    import path_normalizer
+    import prefetch
+
+DEFAULT_SKETCH_WIDTH = 1 << 17
+DEFAULT_SKETCH_DEPTH = 4
+DEFAULT_HEAVY_HITTERS = 20
+
+# Per host output files of the scan scripts: file name -> (category, column
+# holding the category or None)
+CSV_SOURCES = {
+    'autorun.csv': ('autoruns', 'name'),
+    'appcompat_hash.csv': ('appcompat', None),
+    'appcompat.csv': ('appcompat', None),
+}
+PREFETCH_CATEGORY = 'prefetch'
+
+_normalizer = path_normalizer.PathNormalizer()
+
+
+class ExactCounter(object):
+    """ Exact counts in a hash map, memory grows with the number of distinct keys."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+        self.total += count
+
+    def estimate(self, key):
+        return self.counts[key]
+
+    def heavy_hitters(self, n=DEFAULT_HEAVY_HITTERS):
+        return self.counts.most_common(n)
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def _key_bytes(key):
+    return b"\x00".join(part if isinstance(part, bytes) else part.encode('utf-8') for part in key)
+
+
+class SketchCounter(object):
+    """ Count-min sketch with conservative update. Memory is width * depth
+        counters whatever the number of keys. Estimates are never below the true
+        count and exceed it by at most e / width * total with probability
+        1 - exp(-depth). The most frequent keys are tracked on the side.
+    """
+
+    def __init__(self, width=DEFAULT_SKETCH_WIDTH, depth=DEFAULT_SKETCH_DEPTH, heavy_hitters=DEFAULT_HEAVY_HITTERS):
+        self.width = width
+        self.depth = depth
+        self.table = array('I', [0]) * (width * depth)
+        self.total = 0
+        self.capacity = heavy_hitters
+        self.top = {}
+        self._floor = 0
+
+    def _cells(self, key):
+        # Double hashing, row i uses h1 + i * h2
+        h1, h2 = struct.unpack('<QQ', hashlib.md5(_key_bytes(key)).digest())
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        cells = self._cells(key)
+        table = self.table
+        estimate = min(table[cell] for cell in cells) + count
+        # Only the counters below the new estimate are raised
+        for cell in cells:
+            if table[cell] < estimate:
+                table[cell] = estimate
+        self.total += count
+        self._track(key, estimate)
+
+    def _track(self, key, estimate):
+        top = self.top
+        if key in top or len(top) < self.capacity:
+            top[key] = estimate
+        elif self.capacity and estimate > self._floor:
+            victim = min(top, key=top.get)
+            if estimate > top[victim]:
+                del top[victim]
+                top[key] = estimate
+            self._floor = min(top.values())
+
+    def estimate(self, key):
+        table = self.table
+        return min(table[cell] for cell in self._cells(key))
+
+    def heavy_hitters(self, n=DEFAULT_HEAVY_HITTERS):
+        return sorted(self.top.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def __len__(self):
+        return len(self.top)
+
+
+def _rank(item):
+    key, count = item
+    return count, key
+
+
+def rarest(counter, keys, limit=None, threshold=None):
+    """ Rank the distinct keys of a pass over the records, least frequent first.
+        :param counter: ExactCounter or SketchCounter filled with the same records.
+        :param limit: Keep only this many keys, memory is then bounded by 2 * limit.
+        :param threshold: Keep only the keys counted at most this many times.
+        :return: List of (key, count).
+    """
+    kept = {}
+    cutoff = None
+    for key in keys:
+        if key in kept:
+            continue
+        count = counter.estimate(key)
+        if threshold is not None and count > threshold:
+            continue
+        if cutoff is not None and (count, key) >= cutoff:
+            continue
+        kept[key] = count
+        if limit and len(kept) >= 2 * limit:
+            ranked = sorted(kept.items(), key=_rank)[:limit]
+            kept = dict(ranked)
+            cutoff = _rank(ranked[-1])
+    ranked = sorted(kept.items(), key=_rank)
+    return ranked[:limit] if limit else ranked
+
+
+def stack(hosts, counter):
+    """ Count each key once per host.
+        :param hosts: Iterable of (host, iterable of keys).
+        :return: Number of hosts.
+    """
+    count = 0
+    for host, keys in hosts:
+        for key in set(keys):
+            counter.add(key)
+        count += 1
+    return count
+
+
+def normalize_path(path):
+    # Every spelling of a path is stacked as the same entry
+    return _normalizer(path)
+
+
+def read_csv_keys(file_path, category, category_column=None):
+    """ Yield (category, path) of a CSV with a path column."""
+    with open(file_path) as f:
+        reader = csv.reader(f)
+        header = [column.lower() for column in next(reader, [])]
+        if 'path' not in header:
+            return
+        path_index = header.index('path')
+        category_index = header.index(category_column) if category_column in header else None
+        for row in reader:
+            if len(row) <= path_index:
+                continue
+            path = normalize_path(row[path_index])
+            # ShimCacheParser output repeats its own header below the first row
+            if not path or path == 'path':
+                continue
+            if category_index is not None and len(row) > category_index:
+                yield row[category_index], path
+            else:
+                yield category, path
+
+
+def host_keys(directories, errors=None):
+    """ Yield the (category, path) entries of a host from the outputs of
+        scan_autoruns, scan_appcompat and scan_prefetch under its directories.
+    """
+    for directory in directories:
+        for dir_path, dir_names, file_names in os.walk(directory):
+            dir_names.sort()
+            for name in sorted(file_names):
+                file_path = os.path.join(dir_path, name)
+                if name in CSV_SOURCES:
+                    category, category_column = CSV_SOURCES[name]
+                    for key in read_csv_keys(file_path, category, category_column):
+                        yield key
+                elif name.endswith('.pf'):
+                    record = prefetch.parseFile(file_path, fields=prefetch.TIMESTAMP_FIELDS)
+                    if record.error:
+                        if errors is not None:
+                            errors.append((file_path, record.error))
+                        continue
+                    yield PREFETCH_CATEGORY, normalize_path(record.executable)
+
+
+def fleet(roots):
+    """ List of (host, directories) with one sub directory per host in every root,
+        the directories of a host found in several roots are grouped.
+    """
+    hosts = {}
+    for root in roots:
+        for name in os.listdir(root):
+            if os.path.isdir(os.path.join(root, name)):
+                hosts.setdefault(name, []).append(os.path.join(root, name))
+    return sorted(hosts.items())
+
+
+def fleet_keys(hosts, errors=None):
+    for host, directories in hosts:
+        yield host, host_keys(directories, errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rank the rarest autoruns, ShimCache and prefetch entries '
+                                                 'across hosts.')
+    parser.add_argument('roots', nargs='+', help='Output directories of the scan scripts, with one sub directory '
+                                                 'per host (autoruns/, appcompat/, prefetch/)')
+    parser.add_argument('--threshold', help='Only entries found on at most this many hosts', type=int)
+    parser.add_argument('--limit', help='Only the N rarest entries', type=int)
+    parser.add_argument('--sketch', help='Count with a fixed size count-min sketch instead of a hash map',
+                        action='store_true')
+    parser.add_argument('--width', help='Counters per row of the sketch', type=int, default=DEFAULT_SKETCH_WIDTH)
+    parser.add_argument('--depth', help='Rows of the sketch', type=int, default=DEFAULT_SKETCH_DEPTH)
+    parser.add_argument('--top', help='Number of most common entries reported', type=int,
+                        default=DEFAULT_HEAVY_HITTERS)
+    parser.add_argument('-o', '--output', help='Output CSV file, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    hosts = fleet(args.roots)
+    if args.sketch:
+        counter = SketchCounter(args.width, args.depth, args.top)
+    else:
+        counter = ExactCounter()
+    errors = []
+    host_count = stack(fleet_keys(hosts, errors), counter)
+    for file_path, error in errors:
+        sys.stderr.write("[ - ] {0} could not be parsed: {1}\n".format(file_path, error))
+
+    # The keys are read again for the ranking, a sketch does not keep them
+    keys = (key for host, host_iter in fleet_keys(hosts) for key in host_iter)
+    ranked = rarest(counter, keys, args.limit, args.threshold)
+
+    sys.stderr.write("{0} hosts, {1} entries counted\n".format(host_count, counter.total))
+    for (category, path), count in counter.heavy_hitters(args.top):
+        sys.stderr.write("Most common: {0} hosts {1} {2}\n".format(count, category, path))
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(['hosts', 'category', 'path'])
+        for (category, path), count in ranked:
+            writer.writerow([count, category, path])
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Split large carves into size-bounded batches that are carved, downloaded
+and retried independently.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+"""
+
+import time
+from multiprocessing.pool import ThreadPool
+
+DEFAULT_MAX_BATCH_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_BATCH_FILES = 256
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 2
+carve_wait_time = 30
+max_carve_polls = 20
+
+
+def plan_batches(files, max_batch_bytes=DEFAULT_MAX_BATCH_BYTES, max_batch_files=DEFAULT_MAX_BATCH_FILES):
+    """ Group file rows into batches bounded by total size and file count.
+        :param files: Rows with 'path' and 'size' keys, as returned by the file table.
+        :return: List of batches, each a list of paths. A file larger than
+                 max_batch_bytes gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+    for row in sorted(files, key=lambda row: row['path']):
+        size = int(row.get('size') or 0)
+        if current and (current_bytes + size > max_batch_bytes or len(current) >= max_batch_files):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(row['path'])
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def carve_query(paths):
+    return "select carve(path) from file where path in ({0});".format(
+        ",".join("'" + path.replace("'", "''") + "'" for path in paths))
+
+
+def send_carve(polylogyx_api, host_identifier, paths):
+    """ Start carving paths on the host.
+        :return: query_id of the carve query, or None if it could not be sent.
+    """
+    request = polylogyx_api.send_distributed_query(sql=carve_query(paths), tags=[],
+                                                   host_identifiers=[host_identifier])
+    if request.get('response_code') and 'results' in request and request['results']['status'] == 'success':
+        query_id = request['results']['data']['query_id']
+        # Wait for the agent to pick the query up before polling for the carve
+        polylogyx_api.get_distributed_query_results(query_id).recv()
+        return query_id
+    return None
+
+
+def wait_for_carve(polylogyx_api, host_identifier, query_id):
+    """ Poll the server until the carve for query_id has been archived.
+        :return: session_id of the carve, or None once max_carve_polls is reached.
+    """
+    for poll in range(max_carve_polls):
+        time.sleep(carve_wait_time)
+        carve_response = polylogyx_api.get_carve_by_query_id(host_identifier=host_identifier, query_id=query_id)
+        if 'results' in carve_response and 'data' in carve_response['results']:
+            carve = carve_response['results']['data']
+            if carve['archive']:
+                return carve['session_id']
+    return None
+
+
+def carve_batches(polylogyx_api, host_identifier, batches, handle_carve,
+                  workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    """ Carve and download batches concurrently, retrying each batch on its own.
+        :param handle_carve: Called as handle_carve(session_id) once a batch is
+                             archived; raises to have the batch carved again.
+        :return: List of (paths, result) per batch, result is None for batches
+                 that failed every attempt.
+    """
+
+    def run(indexed_batch):
+        index, paths = indexed_batch
+        for attempt in range(retries + 1):
+            try:
+                query_id = send_carve(polylogyx_api, host_identifier, paths)
+                session_id = query_id and wait_for_carve(polylogyx_api, host_identifier, query_id)
+                if session_id:
+                    return paths, handle_carve(session_id)
+                print("Carve of batch {0} timed out (attempt {1}/{2})".format(index + 1, attempt + 1, retries + 1))
+            except Exception as e:
+                print("Carve of batch {0} failed (attempt {1}/{2}) : {3}".format(index + 1, attempt + 1,
+                                                                               retries + 1, e))
+        return paths, None
+
+    pool = ThreadPool(max(1, min(workers, len(batches))))
+    try:
+        return pool.map(run, list(enumerate(batches)))
+    finally:
+        pool.close()
+        pool.join()
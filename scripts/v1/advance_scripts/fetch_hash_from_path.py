@@ -8,7 +8,6 @@
 import argparse
 import ast
 import json
-from functools import reduce
 
 from scripts.v1.polylogyx_apis.api import PolylogyxApi
 
@@ -27,8 +26,20 @@ def main(domain, username, password, host_identifier, file_path, limit):
     return read_csv(file_path, host_identifier, limit)
 
 
+def main_for_paths(domain, username, password, host_identifier, paths, output_path, limit=None):
+    """ Same as main for paths already in memory, paths can be any iterable and
+        is only consumed until limit unique paths are found.
+    """
+    global polylogyx_api
+    polylogyx_api = PolylogyxApi(domain=domain, username=username,
+                                 password=password)
+
+    return write_hashes(paths, host_identifier, output_path, limit)
+
+
 def read_csv(file_path, host_identifier, limit):
     import csv
+    import os
     with open(file_path) as csv_file:
         csv_reader = csv.reader(csv_file, delimiter=',')
         line_count = 0
@@ -45,45 +56,58 @@ def read_csv(file_path, host_identifier, limit):
             else:
                 existing_paths.append(row[indicator_index])
                 line_count += 1
-        unique_paths = reduce(lambda l, x: l if x in l else l + [x], existing_paths, [])
-
-        if limit and len(unique_paths) >= limit:
-            unique_paths = unique_paths[0:limit]
-
-        path_groups = list(divide_chunks(unique_paths, max_hash_per_request))
-
-        if len(unique_paths) > 0:
-            import os
-            file_name = os.path.basename(file_path)
-            location = os.path.dirname(file_path)
-            file_hash_output_path = location + "/" + file_name.split(".")[0] + "_hash" + "." + file_name.split(".")[1]
-            columns = ['path', 'md5']
-            with open(file_hash_output_path, 'w') as f:
-                writer = csv.writer(f)
-                writer.writerow(columns)
-
-                for path_list in path_groups:
-                    if len(path_list) > 1:
-                        t = tuple(path_list)
-                        query = 'SELECT path,md5 FROM win_hash WHERE path IN {}'.format(t)
-                    elif len(path_list) == 1:
-                        query = "SELECT path,md5 FROM win_hash WHERE path  ='" + path_list[0] + "'"
-
-                    query_id = polylogyx_api.send_distributed_query(sql=query, tags=[],
-                                                                    host_identifiers=[host_identifier])
-                    try:
-                        conn = polylogyx_api.get_distributed_query_results(
-                            query_id['results']['data']['query_id'])
-                        result = conn.recv()
-                        result = result.decode('utf8')
-                        results = ast.literal_eval(result)
-                        if 'data' in results and len(results['data']) > 0:
-                            for elem in results['data']:
-                                writer.writerow([elem['path'], elem['md5']])
-                    except Exception as e:
-                        print ("Error getting hashes for file paths")
-                print("Created a file with the hashes at : " + file_hash_output_path)
-                return file_hash_output_path
+
+    file_name = os.path.basename(file_path)
+    location = os.path.dirname(file_path)
+    file_hash_output_path = location + "/" + file_name.split(".")[0] + "_hash" + "." + file_name.split(".")[1]
+    return write_hashes(existing_paths, host_identifier, file_hash_output_path, limit)
+
+
+def unique(paths, limit=None):
+    seen = set()
+    for path in paths:
+        if path in seen:
+            continue
+        seen.add(path)
+        yield path
+        if limit and len(seen) >= limit:
+            break
+
+
+def write_hashes(paths, host_identifier, file_hash_output_path, limit=None):
+    import csv
+    unique_paths = list(unique(paths, limit))
+
+    path_groups = list(divide_chunks(unique_paths, max_hash_per_request))
+
+    if len(unique_paths) > 0:
+        columns = ['path', 'md5']
+        with open(file_hash_output_path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+
+            for path_list in path_groups:
+                if len(path_list) > 1:
+                    t = tuple(path_list)
+                    query = 'SELECT path,md5 FROM win_hash WHERE path IN {}'.format(t)
+                elif len(path_list) == 1:
+                    query = "SELECT path,md5 FROM win_hash WHERE path  ='" + path_list[0] + "'"
+
+                query_id = polylogyx_api.send_distributed_query(sql=query, tags=[],
+                                                                host_identifiers=[host_identifier])
+                try:
+                    conn = polylogyx_api.get_distributed_query_results(
+                        query_id['results']['data']['query_id'])
+                    result = conn.recv()
+                    result = result.decode('utf8')
+                    results = ast.literal_eval(result)
+                    if 'data' in results and len(results['data']) > 0:
+                        for elem in results['data']:
+                            writer.writerow([elem['path'], elem['md5']])
+                except Exception as e:
+                    print ("Error getting hashes for file paths")
+            print("Created a file with the hashes at : " + file_hash_output_path)
+            return file_hash_output_path
 
 
 def divide_chunks(l, n):
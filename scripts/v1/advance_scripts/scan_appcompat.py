@@ -13,16 +13,15 @@ import os
 import sys
 import time
 
-if sys.version_info[0] >= 3 or sys.version_info[0] < 2  :
-    raise Exception("Must be using Python 2.* to run this script")
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.getcwd())))
 
-from helper_scripts import ShimCacheParser, fetch_vt_reputation
-from scripts.v1.advance_scripts import fetch_hash_from_path
+from helper_scripts import ShimCacheParser, fetch_vt_reputation, path_normalizer, snapshot_store
+from scripts.v1.advance_scripts import fetch_hash_from_path, signature_pruner
 from scripts.v1.polylogyx_apis.api import PolylogyxApi
 
 
 APPCOMPAT_SHIM_QUERY = "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Session Manager\AppCompatCache%%' and name='AppCompatCache';"
+SNAPSHOT_NAME = 'appcompat_snapshot'
 
 polylogyx_api = None
 
@@ -46,32 +45,86 @@ def get_distributed_query_data_over_websocket(sql, host_identifier):
     return []
 
 
-def analyse_binary_file(source_file_path, output_path, host_identifier, creds):
-
-    ShimCacheParser.main(["ShimCacheParser.py", "-b", source_file_path, "-o", output_path])
+def changed_paths(records, host_identifier, store_dir, limit=None):
+    """ Diff the cache entries against the last snapshot of the host.
+        :return: (paths added or changed since then in cache order, at most limit
+                 of them, current snapshot). Changed entries past the limit keep
+                 their previous state so the next sweep picks them up.
+    """
+    previous = snapshot_store.load_snapshot(store_dir, host_identifier, SNAPSHOT_NAME)
+    current = {}
+    for record in records:
+        # The first entry of a path is its most recent one
+        if record.path not in current:
+            current[record.path] = [record.last_modified, record.exec_flag]
+    added, changed, removed = snapshot_store.diff_snapshots(previous, current)
+    print ("{0} new, {1} modified and {2} removed app compatibility entries since the last sweep".format(
+        len(added), len(changed), len(removed)))
+
+    modified = set(added + changed)
+    paths = []
+    for record in records:
+        if record.path in modified:
+            modified.discard(record.path)
+            if limit and len(paths) >= limit:
+                if record.path in previous:
+                    current[record.path] = previous[record.path]
+                else:
+                    current.pop(record.path)
+            else:
+                paths.append(record.path)
+    return paths, current
+
+
+def analyse_appcompat(bin_data, output_path, host_identifier, creds, incremental=False, prune_signed=False,
+                      limit=None):
+    # The cache is parsed in memory and its paths go straight to the hash
+    # stage, only as many entries as limit are parsed into records. creds
+    # holds the server credentials and the VirusTotal api key.
+    if incremental:
+        store_dir = os.getcwd() + '/appcompat'
+        paths, current = changed_paths(list(ShimCacheParser.parse_appcompat(bin_data)), host_identifier,
+                                       store_dir, limit)
+        if not paths:
+            snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+            print ("No new or modified app compatibility entry to be scanned!")
+            return None
+    else:
+        # The limit applies to the paths left after pruning
+        paths = (record.path for record in ShimCacheParser.parse_appcompat(bin_data,
+                                                                           None if prune_signed else limit))
+
+    normalizer = path_normalizer.PathNormalizer()
+    paths = normalizer.normalize_all(paths)
+    if prune_signed:
+        print ("Pruning the binaries signed by trusted publishers...")
+        paths = signature_pruner.prune_signed(polylogyx_api, host_identifier, paths,
+                                              os.getcwd() + '/authenticode')
 
     print ("Acquiring hashes for the obtained file paths...")
 
-    with open(output_path, 'rb') as inp, open(output_path.replace("appcompat.csv", "appcompat_limit.csv"), 'wb') as out:
-        writer = csv.writer(out)
-        current_index = 0
-        for row in csv.reader(inp):
-            current_index = current_index + 1
-            if current_index >= args.limit:
-                break
-            writer.writerow(row)
-    output_path = output_path.replace("appcompat.csv", "appcompat_limit.csv")
-
-    output_hash_path = fetch_hash_from_path.main(creds['domain'], creds['username'], creds['password'], host_identifier,
-                                                 output_path, args.limit)
+    output_hash_path = fetch_hash_from_path.main_for_paths(creds['domain'], creds['username'], creds['password'],
+                                                           host_identifier, paths, output_path, limit)
+    print ("Normalization merged {0} spellings of the same paths".format(normalizer.collapsed))
+    if not output_hash_path:
+        # The delta was pruned or normalized away, it is done. A failed
+        # pruning query keeps its paths, so this is not a failed sweep.
+        if incremental:
+            snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+        print ("No file path left to be scanned in the app compatibility cache!")
+        return None
 
     print ("Fetching virustotal for the collected hashes...")
-    file_score_path = fetch_vt_reputation.main(args.vt_api_key, output_hash_path)
+    file_score_path = fetch_vt_reputation.main(creds['vt_api_key'], output_hash_path)
 
+    # Only saved once the delta went through, a failed sweep is diffed again
+    if incremental:
+        snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
     return file_score_path
 
 
-def main(domain, username, password, host_identifier, vt_api_key):
+def main(domain, username, password, host_identifier, vt_api_key, incremental=False, prune_signed=False,
+         limit=None):
     global polylogyx_api
     creds = {'username': username, 'password': password, 'domain': domain, 'vt_api_key': vt_api_key}
     polylogyx_api = PolylogyxApi(domain=domain, username=username,
@@ -86,24 +139,21 @@ def main(domain, username, password, host_identifier, vt_api_key):
                 os.makedirs(base_folder_path)
             except OSError as e:
                 pass
-            file_path = base_folder_path + '/' + 'appcompat.bin'
-            with open(file_path, 'wb') as f:
-                hb = binascii.a2b_hex(response[0]['data'])
-                f.write(hb)
-                f.close()
-                print('Generated appcompat bin file for host  : {0} at {1}'.format(host_identifier,
-                                                                                   file_path))
-            vt_score_path = analyse_binary_file(file_path, base_folder_path + '/' + "appcompat.csv", host_identifier,
-                                                creds)
-
-            anaylyse_vt_score_file(vt_score_path, host_identifier)
+            bin_data = binascii.a2b_hex(response[0]['data'])
+            print('Acquired app compatibility cache of {0} bytes for host : {1}'.format(len(bin_data),
+                                                                                      host_identifier))
+            vt_score_path = analyse_appcompat(bin_data, base_folder_path + '/' + "appcompat_hash.csv",
+                                              host_identifier, creds, incremental, prune_signed, limit)
+
+            if vt_score_path:
+                anaylyse_vt_score_file(vt_score_path, host_identifier)
 
         else:
             print("Nothing to acquire from the host : {0}".format(host_identifier))
 
 
 def anaylyse_vt_score_file(file_path, host_identifier):
-    with open(file_path, 'rb') as f:
+    with open(file_path) as f:
         reader = csv.DictReader(f)
         rows = []
         for row in reader:
@@ -140,6 +190,14 @@ if __name__ == '__main__':
 
                         help='Vt Api Key', required=True)
     parser.add_argument('--limit', help='Limit', type=int)
+    parser.add_argument('--incremental',
+
+                        help='Only hash the entries added or modified since the last sweep of the host',
+                        action='store_true')
+    parser.add_argument('--prune_signed',
+
+                        help='Skip the binaries signed by Microsoft before hashing them',
+                        action='store_true')
 
     args = parser.parse_args()
 
@@ -149,6 +207,7 @@ if __name__ == '__main__':
     base_folder_path = os.getcwd() + '/appcompat/' + args.host_identifier + '/' + str(
         int(time.time()))
 
-    main(args.domain, args.username, args.password, args.host_identifier, args.vt_api_key)
+    main(args.domain, args.username, args.password, args.host_identifier, args.vt_api_key, args.incremental,
+         args.prune_signed, args.limit)
 
 
@@ -8,110 +8,127 @@
 import argparse
 import ast
 import csv
-import json
 import os
 import re
 import time
 import sys
+from multiprocessing.pool import ThreadPool
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.getcwd())))
 
-from helper_scripts import fetch_vt_reputation
+from helper_scripts import autorun_paths, fetch_vt_reputation, path_normalizer, snapshot_store
 from scripts.v1.polylogyx_apis.api import PolylogyxApi
-from scripts.v1.advance_scripts import fetch_hash_from_path
+from scripts.v1.advance_scripts import fetch_hash_from_path, signature_pruner
 
 
 AUTORUN_QUERIES = {
     'BootExecute': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Session Manager%%' and name='BootExecute';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Session Manager%%' and name='BootExecute';",
     ],
     'office addon': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Outlook\Addins%%' and name='FileName';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\Excel\Addins%%';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Excel\Addins%%';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\PowerPoint\Addins%%';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\PowerPoint\Addins%%';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\Word\Addins%%';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Word\Addins%%';"
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Outlook\Addins%%' and name='FileName';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\Excel\Addins%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Excel\Addins%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\PowerPoint\Addins%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\PowerPoint\Addins%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Office\Word\Addins%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Office\Word\Addins%%';"
     ],
     'Hijacks': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Classes\Htmlfile\Shell\Open\Command%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Classes\Htmlfile\Shell\Open\Command%%';",
     ],
     'Drivers & services': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services%%' and name='ImagePath';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services%%' and name='ImagePath';",
     ],
     'Font Drivers': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Font Drivers%%';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Font Drivers%%';",
     ],
     'winlogon': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon\GpExtensions%%' and name='DllName';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon\GpExtensions%%' and name='DllName';",
     ],
     'Print Monitors': [
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Print\Monitors%%' and name='Driver';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Print\Monitors%%' and name='Driver';",
     ],
     'WinSock': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services\WinSock2\Parameters\Protocol_Catalog9\Catalog_Entries%%' and name='ProtocolName';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\System\CurrentControlSet\\Services\\WinSock2\\Parameters\\NameSpace_Catalog5\\Catalog_Entries%%' and name='LibraryPath';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services\WinSock2\Parameters\Protocol_Catalog9\Catalog_Entries64%%' and name='ProtocolName';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\System\\CurrentControlSet\\Services\\WinSock2\\Parameters\\NameSpace_Catalog5\\Catalog_Entries64%%' and name='LibraryPath';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services\WinSock2\Parameters\Protocol_Catalog9\Catalog_Entries%%' and name='ProtocolName';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\System\CurrentControlSet\\Services\\WinSock2\\Parameters\\NameSpace_Catalog5\\Catalog_Entries%%' and name='LibraryPath';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Services\WinSock2\Parameters\Protocol_Catalog9\Catalog_Entries64%%' and name='ProtocolName';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\System\\CurrentControlSet\\Services\\WinSock2\\Parameters\\NameSpace_Catalog5\\Catalog_Entries64%%' and name='LibraryPath';",
     ],
     'LSA Providers': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\SecurityProviders%' and name='SecurityProviders';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Lsa%' and name = 'Authentication Packages';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Lsa%' and name = 'Notification Packages';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\SecurityProviders%' and name='SecurityProviders';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Lsa%' and name = 'Authentication Packages';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\Lsa%' and name = 'Notification Packages';",
     ],
     'Network Providers': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\SYSTEM\\CurrentControlSet\\Control\\NetworkProvider\\Order%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\\SYSTEM\\CurrentControlSet\\Control\\NetworkProvider\\Order%';",
     ],
     'Logon': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Terminal Server\Wds\rdpwd%' and name='StartupPrograms';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='Userinit';",
-        "select name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='VMApplet';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='Shell';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\SafeBoot%' and name='AlternateShell';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows\CurrentVersion\Run%';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Run%';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Active Setup\Installed Components%%' and name='StubPath';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Wow6432Node\Microsoft\Active Setup\Installed Components%%' and name='StubPath';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Windows NT\CurrentVersion\Windows%' and name='IconServiceLib';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Terminal Server\Wds\rdpwd%' and name='StartupPrograms';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='Userinit';",
+        "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='VMApplet';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon%' and name='Shell';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SYSTEM\CurrentControlSet\Control\SafeBoot%' and name='AlternateShell';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows\CurrentVersion\Run%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Run%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Active Setup\Installed Components%%' and name='StubPath';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\SOFTWARE\Wow6432Node\Microsoft\Active Setup\Installed Components%%' and name='StubPath';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Windows NT\CurrentVersion\Windows%' and name='IconServiceLib';",
     ],
     'KnownDlls': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Session Manager\KnownDlls%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\System\CurrentControlSet\Control\Session Manager\KnownDlls%';",
     ],
     'Internet Explorer': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Internet Explorer\Extensions%%' and name='HotIcon';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Internet Explorer\Extensions%%' and name='HotIcon';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Internet Explorer\Extensions%%' and name='HotIcon';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Internet Explorer\Extensions%%' and name='HotIcon';",
     ],
     'codecs': [
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Windows NT\CurrentVersion\Drivers32%';",
-        "select name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Windows NT\CurrentVersion\Drivers32%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Microsoft\Windows NT\CurrentVersion\Drivers32%';",
+        "select key, name, data, type from registry where key like 'HKEY_LOCAL_MACHINE\Software\Wow6432Node\Microsoft\Windows NT\CurrentVersion\Drivers32%';",
     ],
     'clsid': [
         "select name, data, key from registry where key like 'HKEY_CLASSES_ROOT\CLSID\%\InProcServer32%%' and name like '%Default%';",
     ]
     ,
     'Queries in current users': [
-        "select name, data, type from registry where key like 'HKEY_CURRENT_USER\SOFTWARE\Microsoft\Windows\CurrentVersion\Run%';",
-        "select name, data, type from registry where key like 'HKEY_CURRENT_USER\SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Run%';"
+        "select key, name, data, type from registry where key like 'HKEY_CURRENT_USER\SOFTWARE\Microsoft\Windows\CurrentVersion\Run%';",
+        "select key, name, data, type from registry where key like 'HKEY_CURRENT_USER\SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Run%';"
     ]
 }
 
+# Sweeps too wide for a single result frame, split into one query per first
+# character of the subkeys of a key: category -> (key, subkey name prefixes)
+CHUNKED_QUERIES = {
+    'clsid': ('HKEY_CLASSES_ROOT\\CLSID\\', ['{' + digit for digit in '0123456789abcdef']),
+}
+DEFAULT_CHUNK_WORKERS = 4
+
+# key and name constraints of the queries, to tell which snapshot entries a
+# failed query would have returned
+CONSTRAINT = re.compile(r"\b(key|name)\s*(not\s+like|like|=)\s*'([^']*)'", re.IGNORECASE)
+
+SNAPSHOT_NAME = 'autoruns_snapshot'
+
 polylogyx_api = None
 
 result_dict = {}
 
 
-def main(domain, username, password, host_identifier):
+def main(domain, username, password, host_identifier, incremental=False, chunk_workers=DEFAULT_CHUNK_WORKERS,
+         prune_signed=False):
     global polylogyx_api
     polylogyx_api = PolylogyxApi(domain=domain, username=username,
                                  password=password)
     host_identifiers = host_identifier.split(',')
     path_parser = PathParser()
+    normalizer = path_normalizer.PathNormalizer(strip_arguments=True)
     finished=False
     for host_identifier in host_identifiers:
         print ('Scanning for autoruns from the host : {0}'.format(host_identifier))
 
         hashes = []
+        entries = []
+        failed = []
         for name, queries in AUTORUN_QUERIES.items():
             print ("Getting data for the {0}".format(name))
             if finished:
@@ -120,23 +137,171 @@ def main(domain, username, password, host_identifier):
                 query = queries[i]
                 print ("Getting data for the query {0}".format(str(i + 1) + "/" + str(len(queries)) + " " + name))
 
-                query_results = get_distributed_query_data_over_websocket(query, host_identifier)
-                response = path_parser.parse_resgistry_paths(query_results, name)
-                hashes.extend(response)
-
-                if args.limit and len(hashes) >= args.limit:
-                    hashes = hashes[0:args.limit]
-                    finished=True
+                for sent_query, query_results in get_query_results(name, query, host_identifier, chunk_workers):
+                    if query_results is None:
+                        failed.append((name, sent_query))
+                        continue
+                    if incremental:
+                        # Every entry is needed for the snapshot, the paths are
+                        # only extracted from the changed ones below
+                        entries.extend((name, row) for row in query_results)
+                        continue
+                    response = path_parser.parse_resgistry_paths(query_results, name)
+                    hashes.extend(response)
+
+                    if args.limit and len(hashes) >= args.limit:
+                        hashes = hashes[0:args.limit]
+                        finished=True
+                        break
+                if finished:
                     break
+        if incremental:
+            store_dir = os.getcwd() + '/autoruns'
+            hashes, current = changed_autoruns(entries, host_identifier, store_dir, path_parser, args.limit,
+                                               failed)
+            if not hashes:
+                snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+                print ("No new or modified autoruns to be scanned!")
+                continue
+        # The normalizer is shared by the hosts, its cache is warm after the first one
+        spellings = set(hash['path'] for hash in hashes)
+        for hash in hashes:
+            hash['path'] = normalizer(hash['path'])
+        hashes = [hash for hash in hashes if hash['path']]
+        print ("Normalization merged {0} spellings of the same paths".format(
+            len(spellings) - len(set(hash['path'] for hash in hashes))))
+        if prune_signed:
+            print ("Pruning the binaries signed by trusted publishers...")
+            unsigned = set(signature_pruner.prune_signed(polylogyx_api, host_identifier,
+                                                         [hash['path'] for hash in hashes],
+                                                         os.getcwd() + '/authenticode'))
+            hashes = [hash for hash in hashes if hash['path'] in unsigned]
+            if not hashes:
+                if incremental:
+                    snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+                print ("No autorun left to be scanned!")
+                continue
         file_path=write_to_csv(hashes, host_identifier)
         print ("Fetching hashes for the path obtained")
         filepath = fetch_hashes(args.domain, args.username, args.password, host_identifier,file_path)
         print ("Fetching virustotal reputation for the hashes obtained")
         vt_score_path = fetch_vt_reputation.main(args.vt_api_key, filepath)
         anaylyse_vt_score_file(vt_score_path, host_identifier)
+        if incremental:
+            snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+
+
+def entry_key(name, row):
+    # Category, registry key and value name identify an autorun entry
+    return "\t".join([name, row.get('key', ''), row.get('name', '')])
+
+
+def like(pattern, value):
+    # SQL LIKE, case insensitive like SQLite for ASCII
+    expression = '.*'.join('.'.join(re.escape(part) for part in chunk.split('_')) for chunk in pattern.split('%'))
+    return re.match(expression + '$', value, re.IGNORECASE | re.DOTALL) is not None
+
+
+def query_matches(query, key, name):
+    """ Whether query could return the value name of the registry key."""
+    for column, operator, pattern in CONSTRAINT.findall(query):
+        value = key if column.lower() == 'key' else name
+        if operator == '=':
+            matched = value.lower() == pattern.lower()
+        else:
+            matched = like(pattern, value)
+        if matched == operator.lower().startswith('not'):
+            return False
+    return True
+
+
+def changed_autoruns(entries, host_identifier, store_dir, path_parser, limit=None, failed=()):
+    """ Diff the autorun entries of a host against its last snapshot.
+        :param entries: List of (category, query result row).
+        :param failed: List of (category, query) that could not be run, the
+                       entries they would have returned keep their previous state.
+        :return: (paths of the entries added or modified since then, at most
+                 limit of them, current snapshot). Changed entries past the
+                 limit keep their previous state so the next sweep picks them up.
+    """
+    previous = snapshot_store.load_snapshot(store_dir, host_identifier, SNAPSHOT_NAME)
+    current = {}
+    for name, row in entries:
+        current[entry_key(name, row)] = [row.get('data', '')]
+    for key, value in previous.items():
+        if key not in current:
+            category, registry_key, value_name = key.split("\t", 2)
+            if any(name == category and query_matches(query, registry_key, value_name) for name, query in failed):
+                current[key] = value
+    added, changed, removed = snapshot_store.diff_snapshots(previous, current)
+    if failed:
+        print ("{0} queries failed, their previous entries are kept".format(len(failed)))
+    print ("{0} new, {1} modified and {2} removed autoruns since the last sweep".format(
+        len(added), len(changed), len(removed)))
+    for key in removed:
+        print ("Removed: {0}".format(key.replace("\t", " ")))
+
+    modified = set(added + changed)
+    hashes = []
+    for name, row in entries:
+        key = entry_key(name, row)
+        if key not in modified:
+            continue
+        modified.discard(key)
+        response = path_parser.parse_resgistry_paths([row], name)
+        if limit and hashes and len(hashes) + len(response) > limit:
+            if key in previous:
+                current[key] = previous[key]
+            else:
+                current.pop(key)
+            continue
+        hashes.extend(response)
+    return hashes, current
+
+
+def chunk_queries(query, key, prefixes):
+    """ Split a query on the subkeys of key into one query per subkey name prefix,
+        plus one for the subkeys starting with none of them.
+    """
+    pattern = "'" + key + "%"
+    if pattern not in query:
+        return [query]
+    queries = [query.replace(pattern, "'" + key + prefix + "%", 1) for prefix in prefixes]
+    others = " and ".join("key not like '{0}{1}%'".format(key, prefix) for prefix in prefixes)
+    queries.append(query.rstrip(';') + " and " + others + ";")
+    return queries
+
+
+def get_query_results(name, query, host_identifier, workers=DEFAULT_CHUNK_WORKERS):
+    """ Yield (query sent, result rows) of a query, rows are None when it failed.
+        The sweeps of CHUNKED_QUERIES are sent as concurrent chunks, each yielded
+        as soon as it arrives so the rows of a host never have to fit in one frame.
+    """
+    if name not in CHUNKED_QUERIES:
+        yield run_query(query, host_identifier)
+        return
+    queries = chunk_queries(query, *CHUNKED_QUERIES[name])
+    pool = ThreadPool(max(1, min(workers, len(queries))))
+    try:
+        for result in pool.imap_unordered(lambda chunk: run_query(chunk, host_identifier), queries):
+            yield result
+        pool.close()
+    finally:
+        # Also reached when the caller stops early at the limit
+        pool.terminate()
+        pool.join()
+
+
+def run_query(sql, host_identifier):
+    try:
+        return sql, get_distributed_query_data_over_websocket(sql, host_identifier)
+    except Exception as e:
+        print ("Error running the query {0} : {1}".format(sql, e))
+        return sql, None
 
 
 def get_distributed_query_data_over_websocket(sql, host_identifier):
+    """ Result rows of a query, None if it failed."""
     response = polylogyx_api.send_distributed_query(sql=sql, tags=[],
                                                     host_identifiers=[host_identifier])
     if response['response_code'] == 200 and 'results' in response:
@@ -152,7 +317,7 @@ def get_distributed_query_data_over_websocket(sql, host_identifier):
             return query_results
         else:
             print (response['results']['message'])
-    return []
+    return None
 
 
 def write_to_csv(hashes, host_identifier):
@@ -199,58 +364,13 @@ def anaylyse_vt_score_file(file_path, host_identifier):
 class PathParser:
 
     def parse_resgistry_paths(self, input_list, name):
+        # Each value is tokenized in a single pass, see helper_scripts/autorun_paths.py
         hashes = []
-        json.dumps(input_list)
         for input in input_list:
-            input = input['data']
-
-            self.process_path_with_quotes(input, name, hashes)
+            for path in autorun_paths.extract_paths(input['data']):
+                hashes.append({'path': path, 'name': name})
         return hashes
 
-    def process_path_string(self, input, name, hashes):
-        self.process_path_with_quotes(input, name, hashes)
-        self.process_path_containing_comma(input, name, hashes)
-        self.process_path_with_spaces(input, name, hashes)
-        self.process_path_without_spaces(input, name, hashes)
-
-    def process_path_with_quotes(self, input, name, hashes):
-        file_paths_within_quotes = re.findall(r'"(.*?)"', input)
-        if len(file_paths_within_quotes) > 0:
-            for path in file_paths_within_quotes:
-                self.process_path_containing_comma(path, name, hashes)
-                input = input.replace('"' + path + '"', '')
-        else:
-            input = self.process_path_containing_comma(input, name, hashes)
-        return input
-
-    def process_path_containing_comma(self, input, name, hashes):
-        if "," in input:
-            file_path_separated_by_comma = input.split(",")
-            for path in file_path_separated_by_comma:
-                if path and path[0] != "-":
-                    hashes.append({'path': path.split(" ")[0], 'name': name})
-                input = input.replace(path, '')
-            input = input.replace(",", '')
-        else:
-            input = self.process_path_with_spaces(input, name, hashes)
-        return input
-
-    def process_path_with_spaces(self, input, name, hashes):
-        file_paths_with_spaces = re.findall(r'\S+\\\S+\s\S+\\\S+\.\S+', input)
-        if len(file_paths_with_spaces):
-            for path in file_paths_with_spaces:
-                input = input.replace(path, '')
-                hashes.append({'path': '"' + path + '"', 'name': name})
-        input = self.process_path_without_spaces(input, name, hashes)
-        return input
-
-    def process_path_without_spaces(self, input, name, hashes):
-        file_paths_without_spaces = re.findall(r'\S+\.\S+', input)
-        for path in file_paths_without_spaces:
-            input = input.replace(path, '')
-            hashes.append({'path': path, 'name': name})
-        return input
-
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='User credentials.')
@@ -275,7 +395,20 @@ if __name__ == '__main__':
     parser.add_argument('--limit',
 
                         help='Limit',type=int)
+    parser.add_argument('--incremental',
+
+                        help='Only hash the autoruns added or modified since the baseline of the last sweep',
+                        action='store_true')
+    parser.add_argument('--chunk_workers',
+
+                        help='Number of chunks of the wide registry sweeps queried concurrently', type=int,
+                        default=DEFAULT_CHUNK_WORKERS)
+    parser.add_argument('--prune_signed',
+
+                        help='Skip the binaries signed by Microsoft before hashing them',
+                        action='store_true')
     args = parser.parse_args()
     print ('PolyLogyx')
     print ('Scanning for autoruns across the hosts... ')
-    main(args.domain, args.username, args.password, args.host_identifier)
+    main(args.domain, args.username, args.password, args.host_identifier, args.incremental, args.chunk_workers,
+         args.prune_signed)
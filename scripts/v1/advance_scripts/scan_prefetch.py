@@ -8,39 +8,71 @@
 import argparse
 
 import os
-import tarfile
 import time
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.getcwd())))
-from helper_scripts import prefetch
+from helper_scripts import carve_archive, prefetch, snapshot_store
+from scripts.v1.advance_scripts import carve_planner
+from scripts.v1.polylogyx_apis import transfer
 from scripts.v1.polylogyx_apis.api import PolylogyxApi
 import json
 
 
-PREFETCH_QUERY = "select carve(path) from file where path like 'C:\WINDOWS\Prefetch\%.pf' ;"
-PREFETCH_QUERY_COUNT = "select count(*) from file where path like 'C:\WINDOWS\Prefetch\%.pf' ;"
-carve_wait_time = 30
+PREFETCH_FILES_QUERY = "select path, size, mtime from file where path like 'C:\WINDOWS\Prefetch\%.pf' ;"
+SNAPSHOT_NAME = 'prefetch_snapshot'
 
 polylogyx_api=None
 
 
-def main(domain, username, password, host_identifier):
+def main(domain, username, password, host_identifier, max_batch_bytes=carve_planner.DEFAULT_MAX_BATCH_BYTES,
+         max_batch_files=carve_planner.DEFAULT_MAX_BATCH_FILES, workers=carve_planner.DEFAULT_WORKERS,
+         retries=carve_planner.DEFAULT_RETRIES, incremental=False, parse_workers=None):
     global polylogyx_api
 
     polylogyx_api = PolylogyxApi(domain=domain, username=username,
                                  password=password)
 
-    distributed_result = exec_distributed_query(host_identifier, PREFETCH_QUERY_COUNT)
+    distributed_result = exec_distributed_query(host_identifier, PREFETCH_FILES_QUERY)
     if distributed_result:
-        distributed_result = distributed_result[0]
-        if 'data' in json.loads(distributed_result) and int(json.loads(distributed_result)['data'][0]['count(*)']):
-            sql = PREFETCH_QUERY
+        prefetch_files = json.loads(distributed_result[0]).get('data') or []
+        store_dir = os.getcwd() + '/prefetch'
+        if incremental:
+            previous = snapshot_store.load_snapshot(store_dir, host_identifier, SNAPSHOT_NAME)
+            current = dict((row['path'], [row.get('mtime'), row.get('size')]) for row in prefetch_files)
+            added, changed, removed = snapshot_store.diff_snapshots(previous, current)
+            print ("{0} new, {1} modified and {2} removed prefetch files since the last sweep".format(
+                len(added), len(changed), len(removed)))
+            modified = set(added + changed)
+            prefetch_files = [row for row in prefetch_files if row['path'] in modified]
+            if not prefetch_files:
+                snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
+                print ("No new or modified prefetch file to be scanned!")
+                return
+        if prefetch_files:
+            batches = carve_planner.plan_batches(prefetch_files, max_batch_bytes, max_batch_files)
             print ("PolyLogyx")
-            print ("Acquiring prefetch files for the node : {0}".format(host_identifier))
-            distributed_result = exec_distributed_query(host_identifier, sql)
-            if distributed_result:
-                query_id = distributed_result[1]
-                sleep_and_download_file(host_identifier, query_id)
+            print ("Acquiring {0} prefetch files in {1} batches for the node : {2}".format(len(prefetch_files),
+                                                                                         len(batches),
+                                                                                         host_identifier))
+            base_folder_path = os.getcwd() + '/prefetch/' + host_identifier + '/' + str(int(time.time()))
+            results = carve_planner.carve_batches(
+                polylogyx_api, host_identifier, batches,
+                lambda session_id: download_carve(base_folder_path, session_id),
+                workers=workers, retries=retries)
+            for paths, dir in results:
+                if dir:
+                    anylase_using_prefetch(dir, parse_workers)
+                else:
+                    print ("Unable to acquire a batch of {0} prefetch files".format(len(paths)))
+                    if incremental:
+                        # Keep failed files out of the snapshot so the next sweep carves them again
+                        for path in paths:
+                            if path in previous:
+                                current[path] = previous[path]
+                            else:
+                                current.pop(path, None)
+            if incremental:
+                snapshot_store.save_snapshot(store_dir, host_identifier, SNAPSHOT_NAME, current)
         else:
             print ("No prefetch file found to be scanned!")
     else:
@@ -69,41 +101,34 @@ def exec_distributed_query(host_identifier, sql):
 
 
 def untar_file(file_path, dir):
-    tar = tarfile.open(file_path)
-    tar.extractall(path=dir)  # untar file into same directory
-    tar.close()
-    anylase_using_prefetch(file_path, dir)
+    carve_archive.extract(file_path, dir)  # plain, gzip or zstd compressed tar
+    return dir
 
 
-def anylase_using_prefetch(file_path, dir):
-    prefetch.main(["prefetch.py", "--directory", dir + "/"])
-
-
-def sleep_and_download_file(host_identifier, query_id):
-    time.sleep(carve_wait_time)
-    carve_response = polylogyx_api.get_carve_by_query_id(host_identifier=host_identifier, query_id=query_id)
-    if 'results' in carve_response and 'data' in carve_response['results']:
-        carve = carve_response['results']['data']
-        if carve['archive']:
-            download_carve(host_identifier, carve['session_id'])
+def anylase_using_prefetch(dir, workers=None):
+    failed = 0
+    for record in prefetch.parse_directory(dir, workers):
+        if record.error:
+            failed += 1
+            print ("Unable to parse {0} : {1}".format(record.filename, record.error))
         else:
-            sleep_and_download_file(host_identifier, query_id)
-    else:
-        sleep_and_download_file(host_identifier, query_id)
+            prefetch.printRecord(record)
+    if failed:
+        print ("{0} prefetch files could not be parsed".format(failed))
 
 
-def download_carve(host_identifier, session_id):
-    base_folder_path = os.getcwd() + '/prefetch/' + host_identifier + '/' + str(int(time.time()))
-    file = polylogyx_api.download_carve(session_id=session_id)
+def download_carve(base_folder_path, session_id):
+    file = polylogyx_api.download_carve(session_id=session_id, priority=transfer.PRIORITY_BATCH)
+    if isinstance(file, dict):
+        raise Exception(file.get('error'))
     file_path = base_folder_path + '/' + session_id + ".tar"
     try:
         os.makedirs(base_folder_path)
-    except OSError as e:
-        print(e)
+    except OSError:
         pass
     with open(file_path, 'wb') as s:
         s.write(file)
-    untar_file(file_path, base_folder_path + '/' + session_id)
+    return untar_file(file_path, base_folder_path + '/' + session_id)
 
 
 if __name__ == '__main__':
@@ -122,7 +147,44 @@ if __name__ == '__main__':
     parser.add_argument('--host_identifier',
 
                         help='host_identifer of agent', required=True)
+    parser.add_argument('--max_transfers',
+
+                        help='Maximum number of concurrent carve downloads', type=int)
+    parser.add_argument('--bandwidth',
+
+                        help='Carve download bandwidth cap in bytes per second', type=int)
+    parser.add_argument('--transfer_stats',
+
+                        help='Print the queue wait and throughput of each carve download', action='store_true')
+    parser.add_argument('--max_batch_bytes',
+
+                        help='Maximum total size of the files carved in one batch', type=int,
+                        default=carve_planner.DEFAULT_MAX_BATCH_BYTES)
+    parser.add_argument('--max_batch_files',
+
+                        help='Maximum number of files carved in one batch', type=int,
+                        default=carve_planner.DEFAULT_MAX_BATCH_FILES)
+    parser.add_argument('--batch_workers',
+
+                        help='Number of batches carved concurrently', type=int,
+                        default=carve_planner.DEFAULT_WORKERS)
+    parser.add_argument('--batch_retries',
+
+                        help='Number of times a failed batch is carved again', type=int,
+                        default=carve_planner.DEFAULT_RETRIES)
+    parser.add_argument('--incremental',
+
+                        help='Only carve prefetch files added or modified since the last sweep of the host',
+                        action='store_true')
+    parser.add_argument('--parse_workers',
+
+                        help='Number of processes parsing the carved prefetch files, defaults to the number of cores',
+                        type=int)
 
     args = parser.parse_args()
+    transfer.configure(max_transfers=args.max_transfers, bytes_per_sec=args.bandwidth,
+                       reporter=transfer.print_report if args.transfer_stats else None)
 
-    main(args.domain, args.username, args.password, args.host_identifier)
+    main(args.domain, args.username, args.password, args.host_identifier, args.max_batch_bytes,
+         args.max_batch_files, args.batch_workers, args.batch_retries, args.incremental,
+         args.parse_workers)
@@ -8,13 +8,14 @@
 import argparse
 import ast
 import os
-import tarfile
 import time
 import glob
 import sys
 import websocket
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.getcwd())))
 
+from helper_scripts import carve_archive, dump_analysis, fetch_vt_reputation
+from scripts.v1.polylogyx_apis import transfer
 from scripts.v1.polylogyx_apis.api import PolylogyxApi
 
 polylogyx_api = None
@@ -22,8 +23,8 @@ carve_wait_time = 30
 SUSPICIOUS_QUERY = "select * from win_suspicious_process_scan where modules_suspicious >0 and (modules_replaced>0 or modules_detached>0 or modules_hooked>0 or modules_implanted);"
 
 
-def download_carve(host_identifier, session_id, suspiciousProcess):
-    file = polylogyx_api.download_carve(session_id=session_id)
+def download_carve(host_identifier, session_id, suspiciousProcess, analysis):
+    file = polylogyx_api.download_carve(session_id=session_id, priority=transfer.PRIORITY_BATCH)
     file_path = base_folder_path + '/' + session_id + ".tar"
     try:
         os.makedirs(base_folder_path)
@@ -31,14 +32,13 @@ def download_carve(host_identifier, session_id, suspiciousProcess):
         pass
     with open(file_path, 'wb') as s:
         s.write(file)
-    untar_file(file_path, base_folder_path + '/' + session_id, suspiciousProcess)
+    untar_file(file_path, base_folder_path + '/' + session_id, suspiciousProcess, analysis)
 
 
-def untar_file(file_path, dir, suspiciousProcess):
-    tar = tarfile.open(file_path)
-    tar.extractall(path=dir)  # untar file into same directory
-    tar.close()
+def untar_file(file_path, dir, suspiciousProcess, analysis):
+    carve_archive.extract(file_path, dir)  # plain, gzip or zstd compressed tar
     read_tag_file(dir, suspiciousProcess)
+    analyse_dump(dir, suspiciousProcess, **analysis)
 
 
 def read_tag_file(folder_path, suspiciousProcess):
@@ -68,14 +68,43 @@ def read_tag_file(folder_path, suspiciousProcess):
             print('There is no suspicious module in the process : {0}'.format(suspiciousProcess['process_name']))
 
 
-def main(domain, username, password, host_identifier):
+def analyse_dump(folder_path, suspiciousProcess, rules=None, vt_api_key=None,
+                 hash_workers=dump_analysis.DEFAULT_HASH_WORKERS, scan_workers=dump_analysis.DEFAULT_SCAN_WORKERS):
+    """ Hash and scan the modules of an extracted process dump.
+        :param rules: Rules loaded by dump_analysis.load_rules, no scan when None.
+        :param vt_api_key: Vt Api Key, the reputation of the modules is fetched when given.
+    """
+    records = dump_analysis.analyse_modules(dump_analysis.dumped_modules(folder_path), rules,
+                                            hash_workers, scan_workers)
+    for record in records:
+        if record['matches']:
+            print('{0} in the process {1} matches the rules : {2}'.format(os.path.basename(record['path']),
+                                                                        suspiciousProcess['process_name'],
+                                                                        record['matches']))
+    report_path = dump_analysis.write_report(records, folder_path + '/modules.csv')
+    print("Created a file with the module hashes at : " + report_path)
+
+    if vt_api_key:
+        print("Fetching virustotal reputation for the dumped modules")
+        vt_score_path = fetch_vt_reputation.main(vt_api_key, report_path)
+        anaylyse_vt_score_file(vt_score_path)
+
+
+def anaylyse_vt_score_file(file_path):
+    rows = fetch_vt_reputation.flagged_rows(file_path)
+    for row in rows:
+        print(row)
+
+
+def main(domain, username, password, host_identifier, **analysis):
+    """ :param analysis: Keyword arguments of analyse_dump for every dump."""
     global polylogyx_api
     polylogyx_api = PolylogyxApi(domain=domain, username=username,
                                  password=password)
-    fetch_suspicous_process_data(host_identifier)
+    fetch_suspicous_process_data(host_identifier, analysis)
 
 
-def fetch_suspicous_process_data(host_identifier):
+def fetch_suspicous_process_data(host_identifier, analysis):
     suspicous_process_query_results = get_distributed_query_data_over_websocket(SUSPICIOUS_QUERY, host_identifier)
     if len(suspicous_process_query_results)>0:
         for i in range(len(suspicous_process_query_results)):
@@ -103,7 +132,8 @@ def fetch_suspicous_process_data(host_identifier):
                             request['results']['data']['query_id'])
 
                         data = query_data.recv()
-                        sleep_and_download_file(host_identifier=host_identifier, query_id=request['results']['data']['query_id'], suspiciousProcess=None)
+                        sleep_and_download_file(host_identifier=host_identifier, query_id=request['results']['data']['query_id'], suspiciousProcess=suspiciousProcess,
+                                                analysis=analysis)
 
                     except Exception as e:
                         print(e)
@@ -115,17 +145,18 @@ def fetch_suspicous_process_data(host_identifier):
         print("No suspicious processes found for the host : {0}".format(host_identifier))
 
 
-def sleep_and_download_file(host_identifier, suspiciousProcess,query_id):
+def sleep_and_download_file(host_identifier, suspiciousProcess,query_id, analysis):
     time.sleep(carve_wait_time)
     carve_response = polylogyx_api.get_carve_by_query_id(host_identifier=host_identifier, query_id=query_id)
     if 'results' in carve_response and 'data' in carve_response['results']:
         carve = carve_response['results']['data']
         if carve['archive']:
-            download_carve(host_identifier=host_identifier, session_id=carve['session_id'],suspiciousProcess=None)
+            download_carve(host_identifier=host_identifier, session_id=carve['session_id'],suspiciousProcess=suspiciousProcess,
+                           analysis=analysis)
         else:
-            sleep_and_download_file(host_identifier,suspiciousProcess, query_id)
+            sleep_and_download_file(host_identifier,suspiciousProcess, query_id, analysis)
     else:
-        sleep_and_download_file(host_identifier,suspiciousProcess, query_id)
+        sleep_and_download_file(host_identifier,suspiciousProcess, query_id, analysis)
 
 
 def get_distributed_query_data_over_websocket(sql, host_identifier):
@@ -174,10 +205,37 @@ if __name__ == '__main__':
     parser.add_argument('--max_retries',
                         help='no of maximum retries of web socket client to connect', required=False, type=int, default=5)
 
+    parser.add_argument('--max_transfers',
+                        help='Maximum number of concurrent carve downloads', type=int)
+
+    parser.add_argument('--bandwidth',
+                        help='Carve download bandwidth cap in bytes per second', type=int)
+
+    parser.add_argument('--transfer_stats',
+                        help='Print the queue wait and throughput of each carve download', action='store_true')
+
+    parser.add_argument('--rules',
+                        help='Rule file for the byte pattern scan of the dumped modules', required=False)
+
+    parser.add_argument('--vt_api_key',
+                        help='Vt Api Key, checks the reputation of the dumped modules when given', required=False)
+
+    parser.add_argument('--hash_workers',
+                        help='Number of threads hashing dumped modules', type=int,
+                        default=dump_analysis.DEFAULT_HASH_WORKERS)
+
+    parser.add_argument('--scan_workers',
+                        help='Number of processes scanning dumped modules', type=int,
+                        default=dump_analysis.DEFAULT_SCAN_WORKERS)
+
     args = parser.parse_args()
+    transfer.configure(max_transfers=args.max_transfers, bytes_per_sec=args.bandwidth,
+                       reporter=transfer.print_report if args.transfer_stats else None)
+    rules = dump_analysis.load_rules(args.rules) if args.rules else None
     print('PolyLogyx')
     print('Scanning for suspicious process modules across all the hosts.')
 
     base_folder_path = os.getcwd() + '/suspicious_process/' + args.host_identifier + '/' + str(int(time.time()))
 
-    main(args.domain, args.username, args.password, args.host_identifier)
+    main(args.domain, args.username, args.password, args.host_identifier, rules=rules, vt_api_key=args.vt_api_key,
+         hash_workers=args.hash_workers, scan_workers=args.scan_workers)
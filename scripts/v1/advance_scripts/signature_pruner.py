@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Drop the binaries signed by trusted publishers before they are hashed and
+sent to VirusTotal.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+The size and mtime of the candidate paths are read from the file table in
+batches, and only the files not seen with the same size and mtime by an
+earlier sweep are checked against the authenticode table. Verdicts are cached
+per host under <store_dir>/<host_identifier>/, only for the files the table
+returned a row for, and dropped once a file is gone or has not been a
+candidate for CACHE_MAX_AGE seconds.
+"""
+
+import ast
+import time
+
+from helper_scripts import snapshot_store
+
+TRUSTED_SIGNERS = ('Microsoft Windows', 'Microsoft Corporation')
+CACHE_NAME = 'authenticode_cache'
+CACHE_MAX_AGE = 30 * 24 * 3600
+max_paths_per_request = 100
+
+
+def in_clause(paths):
+    return "({0})".format(",".join("'" + path.replace("'", "''") + "'" for path in paths))
+
+
+def divide_chunks(l, n):
+    for i in range(0, len(l), n):
+        yield l[i:i + n]
+
+
+def query_rows(polylogyx_api, host_identifier, sql):
+    """ Rows returned by a distributed query, None if it failed."""
+    request = polylogyx_api.send_distributed_query(sql=sql, tags=[], host_identifiers=[host_identifier])
+    try:
+        conn = polylogyx_api.get_distributed_query_results(request['results']['data']['query_id'])
+        results = ast.literal_eval(conn.recv().decode('utf8'))
+        return results.get('data') or []
+    except Exception as e:
+        print ("Error running the query {0} : {1}".format(sql[:60], e))
+        return None
+
+
+def query_paths(polylogyx_api, host_identifier, query, paths):
+    """ Run query, which has a {0} placeholder for an IN list, over batches of paths.
+        :return: (lower case path -> row, set of the lower case paths of the
+                 batches that failed).
+    """
+    rows = {}
+    failed = set()
+    for path_list in divide_chunks(paths, max_paths_per_request):
+        batch = query_rows(polylogyx_api, host_identifier, query.format(in_clause(path_list)))
+        if batch is None:
+            failed.update(path.lower() for path in path_list)
+            continue
+        for row in batch:
+            rows[row.get('path', '').lower()] = row
+    return rows, failed
+
+
+def is_trusted(row, trusted_signers=TRUSTED_SIGNERS):
+    return row.get('result') == 'trusted' and row.get('subject_name') in trusted_signers
+
+
+def prune_signed(polylogyx_api, host_identifier, paths, store_dir, trusted_signers=TRUSTED_SIGNERS, now=None):
+    """ Remove the paths of binaries signed by one of trusted_signers.
+        :param paths: Candidate paths, duplicates are dropped.
+        :param store_dir: Directory of the per host verdict cache.
+        :param now: Time of the sweep, defaults to the current time.
+        :return: List of the remaining paths, in their original order.
+    """
+    now = int(now if now is not None else time.time())
+    unique_paths = []
+    seen = set()
+    for path in paths:
+        if path.lower() not in seen:
+            seen.add(path.lower())
+            unique_paths.append(path)
+    if not unique_paths:
+        return unique_paths
+
+    # path -> [size, mtime, trusted, last sweep the path was a candidate in]
+    cache = snapshot_store.load_snapshot(store_dir, host_identifier, CACHE_NAME)
+    stats, stats_failed = query_paths(polylogyx_api, host_identifier,
+                                      "select path, size, mtime from file where path in {0};", unique_paths)
+    unknown = []
+    for path in unique_paths:
+        key = path.lower()
+        row = stats.get(key)
+        if row is None:
+            if key not in stats_failed:
+                # The file is gone
+                cache.pop(key, None)
+            continue
+        cached = cache.get(key)
+        if cached and cached[:2] == [row.get('size'), row.get('mtime')]:
+            cache[key] = cached[:3] + [now]
+        else:
+            unknown.append(path)
+
+    if unknown:
+        signatures = query_paths(polylogyx_api, host_identifier,
+                                 "select path, result, subject_name from authenticode where path in {0};",
+                                 unknown)[0]
+        for path in unknown:
+            key = path.lower()
+            signature = signatures.get(key)
+            if signature is None:
+                # No verdict, the file is checked again by the next sweep
+                cache.pop(key, None)
+                continue
+            row = stats[key]
+            cache[key] = [row.get('size'), row.get('mtime'), is_trusted(signature, trusted_signers), now]
+
+    for key in [key for key, value in cache.items() if len(value) < 4 or value[3] < now - CACHE_MAX_AGE]:
+        del cache[key]
+    snapshot_store.save_snapshot(store_dir, host_identifier, CACHE_NAME, cache)
+
+    # Paths missing from the file table or without a verdict are kept, the
+    # hash stage reports them
+    kept = [path for path in unique_paths if not (path.lower() in stats and path.lower() in cache and
+                                                  cache[path.lower()][2])]
+    print ("{0} of {1} paths are signed by a trusted publisher, {2} checked against the authenticode table".format(
+        len(unique_paths) - len(kept), len(unique_paths), len(unknown)))
+    return kept
@@ -13,3 +13,4 @@ except ImportError:
     pass
 
 from .api import PolylogyxApi, ApiError
+from .transfer import TransferScheduler, PRIORITY_INTERACTIVE, PRIORITY_BATCH
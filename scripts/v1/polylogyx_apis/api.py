@@ -17,6 +17,8 @@ from websocket import create_connection
 import ssl
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+from .transfer import get_scheduler, CHUNK_SIZE, PRIORITY_INTERACTIVE
+
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 TIMEOUT_SECS = 30
@@ -206,19 +208,26 @@ class PolylogyxApi:
 
         return _return_response_and_status_code(response)
 
-    def download_carve(self, session_id=None):
+    def download_carve(self, session_id=None, priority=PRIORITY_INTERACTIVE):
         """ Download the carved file using the sesion_id.
-               This API allows you to execute an on-demand query on the nodes.
+               The download waits for a slot in the process-wide transfer scheduler,
+               which bounds concurrent transfers and their aggregate bandwidth.
                :param session_id: session id of a carve to be downloaded.
+               :param priority: PRIORITY_INTERACTIVE or PRIORITY_BATCH.
                :return: File content.
         """
         headers = {'x-access-token': self.AUTH_TOKEN}
-        try:
-            response = requests.get(
-                self.base + "/carves/download/" + session_id, headers=headers, verify=False)
-            return response.content
-        except requests.RequestException as e:
-            return dict(error=str(e))
+        with get_scheduler().transfer(session_id, priority) as transfer:
+            try:
+                response = requests.get(
+                    self.base + "/carves/download/" + session_id, headers=headers, verify=False, stream=True)
+                chunks = []
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    transfer.throttle(len(chunk))
+                    chunks.append(chunk)
+                return b''.join(chunks)
+            except requests.RequestException as e:
+                return dict(error=str(e))
 
     def take_action(self, data):
         """ This API allows you to get all the nodes registered.
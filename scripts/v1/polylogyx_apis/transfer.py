@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Process-wide scheduler for carve transfers.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Every PolylogyxApi.download_carve call goes through one TransferScheduler,
+which bounds the number of concurrent transfers, caps the aggregate
+bandwidth with a token bucket and hands free slots to interactive
+transfers before batch ones.
+EXAMPLE USAGE:::
+from polylogyx_apis_v1 import transfer
+transfer.configure(max_transfers=2, bytes_per_sec=512 * 1024, reporter=transfer.print_report)
+"""
+import heapq
+import itertools
+import threading
+import time
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+DEFAULT_MAX_TRANSFERS = 4
+CHUNK_SIZE = 64 * 1024
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class TokenBucket(object):
+    """ Blocking token bucket, one token per byte.
+        :param rate: tokens added per second.
+        :param capacity: maximum burst, defaults to one second worth of tokens.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.timestamp = _clock()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        # Requests larger than the bucket are served in capacity sized pieces
+        while amount > 0:
+            with self.lock:
+                now = _clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+                self.timestamp = now
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    amount -= needed
+                    continue
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class Transfer(object):
+    """ A single scheduled transfer, used as a context manager.
+        Holds a transfer slot between __enter__ and __exit__ and records the
+        queue wait and throughput once finished.
+    """
+
+    def __init__(self, scheduler, name, priority):
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.bytes = 0
+        self.queued_at = None
+        self.started_at = None
+        self.finished_at = None
+
+    def __enter__(self):
+        self.queued_at = _clock()
+        self.scheduler.acquire(self.priority)
+        self.started_at = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finished_at = _clock()
+        self.scheduler.release()
+        self.scheduler.report(self)
+        return False
+
+    def throttle(self, nbytes):
+        """ Account for nbytes of payload, blocking while over the bandwidth cap."""
+        bucket = self.scheduler.bucket
+        if bucket:
+            bucket.consume(nbytes)
+        self.bytes += nbytes
+
+    @property
+    def queue_wait(self):
+        return (self.started_at or _clock()) - self.queued_at
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or _clock()) - self.started_at
+
+    @property
+    def throughput(self):
+        """ Bytes per second while the transfer held its slot."""
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return "Transfer {0}: waited {1:.1f}s in queue, {2} bytes in {3:.1f}s ({4:.1f} KB/s)".format(
+            self.name, self.queue_wait, self.bytes, self.elapsed, self.throughput / 1024)
+
+
+class TransferScheduler(object):
+    """ Grants transfer slots in priority order, FIFO within a priority.
+        :param max_transfers: Maximum number of concurrent transfers.
+        :param bytes_per_sec: Aggregate bandwidth cap, None for no cap.
+        :param reporter: Called with each finished Transfer, nothing is reported
+                         when None.
+    """
+
+    def __init__(self, max_transfers=DEFAULT_MAX_TRANSFERS, bytes_per_sec=None, reporter=None):
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.max_transfers = max_transfers
+        self.bucket = TokenBucket(bytes_per_sec) if bytes_per_sec else None
+        self.reporter = reporter
+
+    def configure(self, max_transfers=None, bytes_per_sec=None, reporter=None):
+        with self.condition:
+            if max_transfers:
+                self.max_transfers = max_transfers
+            if bytes_per_sec is not None:
+                self.bucket = TokenBucket(bytes_per_sec) if bytes_per_sec else None
+            if reporter is not None:
+                self.reporter = reporter
+            self.condition.notify_all()
+
+    def transfer(self, name, priority=PRIORITY_INTERACTIVE):
+        return Transfer(self, name, priority)
+
+    def acquire(self, priority):
+        ticket = (priority, next(self.sequence))
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            granted = False
+            try:
+                while self.active >= self.max_transfers or self.waiting[0] != ticket:
+                    self.condition.wait()
+                granted = True
+            finally:
+                # An interrupted wait must not leave its ticket at the head of
+                # the queue, the tickets behind it would wait forever
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                if granted:
+                    self.active += 1
+                # The next ticket in line may also fit in a free slot
+                self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def report(self, transfer):
+        if self.reporter:
+            self.reporter(transfer)
+
+
+def print_report(transfer):
+    """ Reporter printing the queue wait and throughput of each transfer."""
+    print(str(transfer))
+
+
+_scheduler = TransferScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def configure(max_transfers=None, bytes_per_sec=None, reporter=None):
+    """ Reconfigure the process-wide scheduler used by download_carve."""
+    _scheduler.configure(max_transfers=max_transfers, bytes_per_sec=bytes_per_sec, reporter=reporter)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Writes the LZXpress-Huffman fixtures of tests/test_lzxpress.py.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+A small encoder following the compression side of [MS-XCA] section 2.2:
+greedy LZ77 matching over a 64 KB window, one length limited canonical
+Huffman code per 64 KB block and the bit stream interleaved with the extra
+match length bytes. The fixtures were checked against the decoders of
+libfwnt (pyfwnt) and dissect.util, they are not regenerated by the tests.
+EXAMPLE USAGE:::
+python tests/fixtures/lzxpress/generate.py
+"""
+
+import binascii
+import os
+import struct
+
+BLOCK_SIZE = 65536
+MAX_OFFSET = 65535
+MIN_MATCH = 3
+MAX_CODE_LENGTH = 15
+END_OF_DATA = 256
+MAM_SIGNATURE = 0x004d414d
+COMPRESSION_FORMAT_XPRESS_HUFF = 4
+CHAIN_DEPTH = 64
+
+
+def code_lengths(frequencies, limit=MAX_CODE_LENGTH):
+    """ Length limited Huffman code lengths by package-merge."""
+    leaves = sorted((frequency, [symbol]) for symbol, frequency in enumerate(frequencies) if frequency)
+    if len(leaves) == 1:
+        # A code needs two symbols
+        symbol = 1 if leaves[0][1][0] == 0 else 0
+        leaves = sorted(leaves + [(1, [symbol])])
+    packages = list(leaves)
+    for i in range(limit - 1):
+        merged = [(packages[j][0] + packages[j + 1][0], packages[j][1] + packages[j + 1][1])
+                  for j in range(0, len(packages) - 1, 2)]
+        packages = sorted(leaves + merged, key=lambda item: item[0])
+    lengths = [0] * len(frequencies)
+    for weight, symbols in packages[:2 * len(leaves) - 2]:
+        for symbol in symbols:
+            lengths[symbol] += 1
+    return lengths
+
+
+def canonical_codes(lengths):
+    """ Codes assigned by increasing length, then symbol, as the decoder expects."""
+    codes = [0] * len(lengths)
+    code = 0
+    for length in range(1, MAX_CODE_LENGTH + 1):
+        for symbol, symbol_length in enumerate(lengths):
+            if symbol_length == length:
+                codes[symbol] = code
+                code += 1
+        code <<= 1
+    return codes
+
+
+def find_matches(data):
+    """ Greedy LZ77 parse into literals (int) and (length, offset) matches.
+        Matches may reach back into earlier blocks but end inside their block.
+    """
+    heads = {}
+    previous = [0] * len(data)
+    tokens = []
+    position = 0
+
+    def insert(at):
+        key = data[at:at + MIN_MATCH]
+        previous[at] = heads.get(key, -1)
+        heads[key] = at
+
+    while position < len(data):
+        block_end = (position // BLOCK_SIZE + 1) * BLOCK_SIZE
+        limit = min(block_end, len(data)) - position
+        best_length, best_offset = 0, 0
+        if limit >= MIN_MATCH:
+            candidate = heads.get(data[position:position + MIN_MATCH], -1)
+            depth = 0
+            while candidate >= 0 and position - candidate <= MAX_OFFSET and depth < CHAIN_DEPTH:
+                length = 0
+                while length < limit and data[candidate + length] == data[position + length]:
+                    length += 1
+                if length > best_length:
+                    best_length, best_offset = length, position - candidate
+                    if length == limit:
+                        break
+                candidate = previous[candidate]
+                depth += 1
+        if best_length >= MIN_MATCH:
+            tokens.append((best_length, best_offset))
+            for at in range(position, min(position + best_length, len(data) - MIN_MATCH + 1)):
+                insert(at)
+            position += best_length
+        else:
+            tokens.append(ord(data[position:position + 1]))
+            if position <= len(data) - MIN_MATCH:
+                insert(position)
+            position += 1
+    return tokens
+
+
+def bit_length(value):
+    return len(bin(value)) - 2
+
+
+def match_symbol(length, offset):
+    return 256 + (min(length - MIN_MATCH, 15) | ((bit_length(offset) - 1) << 4))
+
+
+class BitWriter(object):
+    """ 16 bit words of the bit stream are written to slots reserved ahead
+        of the byte data, so the decoder finds the extra length bytes right
+        after the last word it has read.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.slots = []
+        self.reserved = 0
+        self.word = 0
+        self.word_bits = 0
+        self.total_bits = 0
+        self._reserve()
+
+    def _reserve(self):
+        # The decoder reads two words up front, then one more each time
+        # fewer than 16 bits are left past the current one
+        needed = max(2, (self.total_bits + 15) // 16 + 1)
+        while self.reserved < needed:
+            self.slots.append(len(self.out))
+            self.out.extend(b'\x00\x00')
+            self.reserved += 1
+
+    def write(self, count, value):
+        for shift in range(count - 1, -1, -1):
+            self.word = (self.word << 1) | ((value >> shift) & 1)
+            self.word_bits += 1
+            self.total_bits += 1
+            if self.word_bits == 16:
+                struct.pack_into('<H', self.out, self.slots.pop(0), self.word)
+                self.word = 0
+                self.word_bits = 0
+        self._reserve()
+
+    def write_bytes(self, data):
+        self.out.extend(data)
+
+    def flush(self):
+        if self.word_bits:
+            struct.pack_into('<H', self.out, self.slots.pop(0), self.word << (16 - self.word_bits))
+
+
+def compress(data):
+    """ Compress data into an LZXpress-Huffman stream."""
+    tokens = find_matches(data)
+    out = bytearray()
+    blocks = []
+    size = 0
+    for token in tokens:
+        if size % BLOCK_SIZE == 0 and (not blocks or blocks[-1]):
+            blocks.append([])
+        blocks[-1].append(token)
+        size += 1 if isinstance(token, int) else token[0]
+    for index, block in enumerate(blocks):
+        symbols = [token if isinstance(token, int) else match_symbol(*token) for token in block]
+        if index == len(blocks) - 1:
+            symbols.append(END_OF_DATA)
+        frequencies = [0] * 512
+        for symbol in symbols:
+            frequencies[symbol] += 1
+        lengths = code_lengths(frequencies)
+        codes = canonical_codes(lengths)
+        out.extend(bytearray(lengths[2 * i] | (lengths[2 * i + 1] << 4) for i in range(256)))
+        writer = BitWriter(out)
+        for symbol, token in zip(symbols, block + [None]):
+            writer.write(lengths[symbol], codes[symbol])
+            if symbol < 256 or token is None:
+                continue
+            length, offset = token
+            extra = length - MIN_MATCH
+            if extra >= 15:
+                if extra - 15 < 255:
+                    writer.write_bytes(struct.pack('<B', extra - 15))
+                elif extra < 65536:
+                    writer.write_bytes(struct.pack('<BH', 255, extra))
+                else:
+                    writer.write_bytes(struct.pack('<BHL', 255, 0, extra))
+            offset_bits = bit_length(offset) - 1
+            writer.write(offset_bits, offset - (1 << offset_bits))
+        writer.flush()
+    return bytes(out)
+
+
+def compress_mam(data, crc=False):
+    """ Wrap a compressed stream in a MAM header, as Windows 10 prefetch files are."""
+    signature = MAM_SIGNATURE | (COMPRESSION_FORMAT_XPRESS_HUFF << 24) | ((1 << 28) if crc else 0)
+    header = struct.pack('<LL', signature, len(data))
+    compressed = compress(data)
+    if not crc:
+        return header + compressed
+    checksum = binascii.crc32(header)
+    checksum = binascii.crc32(struct.pack('<L', 0), checksum)
+    checksum = binascii.crc32(compressed, checksum) & 0xFFFFFFFF
+    return header + struct.pack('<L', checksum) + compressed
+
+
+def pseudo_random(count, seed):
+    # Linear congruential generator, identical on every Python version
+    out = bytearray()
+    for i in range(count):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        out.append(seed >> 16 & 0xFF)
+    return bytes(out)
+
+
+def single_block():
+    lines = [u"C:\\Windows\\System32\\module{0}.dll loaded by process {1}\r\n".format(i % 7, i * 37)
+             for i in range(150)]
+    return u"".join(lines).encode('utf-16-le')[:9000]
+
+
+def multi_block():
+    text = single_block()
+    parts = [text[:30000],
+             pseudo_random(20000, 7),              # literals of every value
+             b'ABCDEFG' * 1500,                    # overlapping match, 16 bit length
+             text[1000:1300],                      # 16 bit length at a large offset
+             pseudo_random(15000, 11),
+             text[5000:5100],                      # one byte length
+             b'\x00' * 70000,                      # runs across a block boundary
+             pseudo_random(3000, 13),
+             text[:20000]]
+    return b''.join(parts)
+
+
+FIXTURES = [
+    ('single_block', single_block, False),
+    ('multi_block', multi_block, True),
+]
+
+
+def main():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name, build, crc in FIXTURES:
+        data = build()
+        with open(os.path.join(directory, name + '.bin'), 'wb') as f:
+            f.write(data)
+        with open(os.path.join(directory, name + '.mam'), 'wb') as f:
+            f.write(compress_mam(data, crc))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Writes the ShimCache fixtures of tests/test_shimcache_parser.py.
+:copyright: (c) 2019 by PolyLogyx.
+:license: MIT, see LICENSE for more details.
+Binary caches of every supported format, SYSTEM hives and .reg exports are
+built with the synthetic builders of helper_scripts/benchmark.py. The paths
+mix ASCII, Latin-1 and other characters and repeat, and some dates are out of
+range, so the fixtures cover the text handling, deduplication and bad entry
+data of the parser. The expected CSV files are the output of the Python 2
+parser, run this script with Python 2 to write them.
+EXAMPLE USAGE:::
+python2 tests/fixtures/shimcache/generate.py
+"""
+
+import codecs
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from helper_scripts import benchmark
+from tests.test_shimcache_parser import CASES, run_parser
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ENTRIES = 24
+NAMES = [u'program{0}.exe', u'caf\u00e9{0}.exe', u'\u0141\u00f3d\u017a{0}.dll', u'\u8a18\u4e8b{0}.exe']
+
+
+def fixture_path(index):
+    # Every 8th path repeats an earlier one
+    name = NAMES[index % len(NAMES)].format(index % 8 if index % 8 == 7 else index)
+    return u"\\??\\C:\\Windows\\System32\\{0}".format(name).encode('utf-16-le')
+
+
+def fixture_filetime(index):
+    # Zero, a date before 1900 and dates past the year 9999 are bad entry data
+    if index % 11 == 5:
+        return (0, 94354848000000000 - 1, 2 ** 63 + index)[index % 3]
+    return 130000000000000000 + index * 123456789
+
+
+def hex_lines(name, data):
+    prefix = u'"{0}"=hex:'.format(name)
+    items = [u'{0:02x}'.format(byte) for byte in bytearray(data)]
+    lines = []
+    line = prefix
+    for i, item in enumerate(items):
+        piece = item + (u',' if i < len(items) - 1 else u'')
+        if len(line) + len(piece) > 77:
+            lines.append(line + u'\\')
+            line = u'  '
+        line += piece
+    lines.append(line)
+    return lines
+
+
+def reg_export(control_sets, utf16=True):
+    """ Text of a regedit export with one AppCompatCache value per control set."""
+    lines = [u'Windows Registry Editor Version 5.00', u'',
+             u'[HKEY_LOCAL_MACHINE\\SYSTEM\\ControlSet001\\Services\\Service0]', u'"Start"=dword:00000002']
+    lines += hex_lines(u'Blob', b'x' * 60) + [u'']
+    for index, data in enumerate(control_sets):
+        lines += [u'[HKEY_LOCAL_MACHINE\\SYSTEM\\ControlSet{0:03d}\\Control\\Session Manager\\AppCompatCache]'.format(
+            index + 1), u'"CacheMainSdb"=hex:00,01']
+        lines += hex_lines(u'AppCompatCache', data) + [u'"Other"="x"', u'']
+    text = u'\r\n'.join(lines) + u'\r\n'
+    if utf16:
+        return codecs.BOM_UTF16_LE + text.encode('utf-16-le')
+    return text.encode('latin-1')
+
+
+def caches():
+    benchmark.synthetic_path = fixture_path
+    benchmark.synthetic_filetime = fixture_filetime
+    return dict((name, build(ENTRIES)) for name, build in benchmark.SYNTHETIC_SHIMCACHE.items())
+
+
+def inputs(data):
+    files = {}
+    for name, cache in data.items():
+        files[name + '.bin'] = cache
+    files['SYSTEM_win10'] = benchmark.synthetic_hive(data['win10'], control_sets=2, services=8)
+    files['SYSTEM_winxp'] = benchmark.synthetic_hive(data['winxp'], control_sets=1, services=8)
+    # The second control set repeats the first half of the entries
+    files['nt6_64.reg'] = reg_export([data['nt6_64'], benchmark.SYNTHETIC_SHIMCACHE['nt6_64'](ENTRIES // 2)])
+    files['winxp.reg'] = reg_export([data['winxp']], utf16=False)
+    return files
+
+
+def main():
+    for name, data in inputs(caches()).items():
+        with open(os.path.join(DIRECTORY, name), 'wb') as f:
+            f.write(data)
+    expected = os.path.join(DIRECTORY, 'expected')
+    if not os.path.isdir(expected):
+        os.makedirs(expected)
+    for output, args, name in CASES:
+        run_parser(args, os.path.join(DIRECTORY, name), os.path.join(expected, output))
+
+
+if __name__ == '__main__':
+    main()
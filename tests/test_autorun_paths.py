@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+
+from helper_scripts.autorun_paths import extract_paths
+
+
+class ExtractPathsTest(unittest.TestCase):
+
+    def assertPaths(self, data, expected):
+        self.assertEqual(extract_paths(data), expected, data)
+
+    def test_empty(self):
+        self.assertPaths('', [])
+        self.assertPaths(None, [])
+        self.assertPaths('autocheck autochk *', [])
+        self.assertPaths('kerberos,msv1_0,schannel,wdigest', [])
+
+    def test_bare_paths_and_switches(self):
+        self.assertPaths('explorer.exe', ['explorer.exe'])
+        self.assertPaths('C:\\Windows\\system32\\userinit.exe,', ['C:\\Windows\\system32\\userinit.exe'])
+        self.assertPaths('%SystemRoot%\\system32\\svchost.exe -k netsvcs -p', ['%SystemRoot%\\system32\\svchost.exe'])
+        self.assertPaths('SystemPropertiesPerformance.exe /pagefile', ['SystemPropertiesPerformance.exe'])
+        self.assertPaths('\\??\\C:\\Windows\\system32\\drivers\\MpKslDrv.sys',
+                         ['\\??\\C:\\Windows\\system32\\drivers\\MpKslDrv.sys'])
+        self.assertPaths('-flag.x /y.z', [])
+
+    def test_quoted_paths(self):
+        self.assertPaths('"C:\\Program Files\\Microsoft OneDrive\\OneDrive.exe" /background',
+                         ['C:\\Program Files\\Microsoft OneDrive\\OneDrive.exe'])
+        self.assertPaths('"C:\\Users\\u\\Teams\\Update.exe" --processStart "Teams.exe" --args "--system-initiated"',
+                         ['C:\\Users\\u\\Teams\\Update.exe', 'Teams.exe'])
+        self.assertPaths('"a.dll,b.dll"', ['a.dll', 'b.dll'])
+
+    def test_spaces_in_directories(self):
+        self.assertPaths('C:\\Program Files\\VMware\\VMware Tools\\vmtoolsd.exe -n vmusr',
+                         ['C:\\Program Files\\VMware\\VMware Tools\\vmtoolsd.exe'])
+        self.assertPaths('C:\\Program Files (x86)\\Google\\Update\\1.3.35.452\\psmachine_64.dll',
+                         ['C:\\Program Files (x86)\\Google\\Update\\1.3.35.452\\psmachine_64.dll'])
+        self.assertPaths('C:\\a.exe C:\\b.txt', ['C:\\a.exe', 'C:\\b.txt'])
+
+    def test_lists_and_duplicates(self):
+        self.assertPaths('C:\\Windows\\system32\\rundll32.exe C:\\Windows\\system32\\iesetup.dll,IEHardenUser',
+                         ['C:\\Windows\\system32\\rundll32.exe', 'C:\\Windows\\system32\\iesetup.dll'])
+        self.assertPaths('C:\\x.exe,C:\\x.exe "C:\\x.exe"', ['C:\\x.exe'])
+
+    def test_long_value(self):
+        # A failed path match must not rescan the rest of the value from every word
+        data = 'C:\\dir\\' + 'word ' * 20000 + 'C:\\end.exe'
+        start = time.time()
+        self.assertPaths(data, ['C:\\end.exe'])
+        self.assertLess(time.time() - start, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
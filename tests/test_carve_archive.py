@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from helper_scripts import carve_archive
+
+
+def tar_bytes(files):
+    buffer = io.BytesIO()
+    tar = tarfile.open(fileobj=buffer, mode='w', format=tarfile.USTAR_FORMAT)
+    for name, data in files.items():
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    tar.close()
+    return buffer.getvalue()
+
+
+def gzip_bytes(data):
+    buffer = io.BytesIO()
+    f = gzip.GzipFile(fileobj=buffer, mode='wb')
+    f.write(data)
+    f.close()
+    return buffer.getvalue()
+
+
+class CarveArchiveTest(unittest.TestCase):
+
+    files = {'C_Windows_x.dll': b'MZ' + b'\x00' * 1000, 'sub/y.exe': b'MZ\x90'}
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data):
+        file_path = os.path.join(self.dir, 'carve.tar')
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
+
+    def assertExtracted(self, file_path, archive_format):
+        out = os.path.join(self.dir, 'out')
+        self.assertEqual(carve_archive.extract(file_path, out), archive_format)
+        for name, data in self.files.items():
+            with open(os.path.join(out, name), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_detect_format_restores_position(self):
+        f = io.BytesIO(b'junk' + gzip_bytes(b'x'))
+        f.seek(4)
+        self.assertEqual(carve_archive.detect_format(f), carve_archive.FORMAT_GZIP)
+        self.assertEqual(f.tell(), 4)
+        self.assertEqual(carve_archive.detect_format(io.BytesIO(tar_bytes(self.files))), carve_archive.FORMAT_TAR)
+        self.assertIsNone(carve_archive.detect_format(io.BytesIO(b'PK\x03\x04')))
+
+    def test_tar(self):
+        self.assertExtracted(self.write(tar_bytes(self.files)), carve_archive.FORMAT_TAR)
+
+    def test_gzip(self):
+        self.assertExtracted(self.write(gzip_bytes(tar_bytes(self.files))), carve_archive.FORMAT_GZIP)
+
+    @unittest.skipIf(carve_archive.zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        data = carve_archive.zstandard.ZstdCompressor().compress(tar_bytes(self.files))
+        self.assertExtracted(self.write(data), carve_archive.FORMAT_ZSTD)
+
+    def test_zstd_without_zstandard(self):
+        file_path = self.write(carve_archive.ZSTD_MAGIC + b'\x00' * 600)
+        zstandard = carve_archive.zstandard
+        carve_archive.zstandard = None
+        try:
+            self.assertRaises(Exception, carve_archive.extract, file_path, self.dir)
+        finally:
+            carve_archive.zstandard = zstandard
+
+    def test_unrecognized(self):
+        self.assertRaises(Exception, carve_archive.extract, self.write(b'\x00' * 600), self.dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import dump_analysis
+
+
+class LoadRulesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, *lines):
+        rule_file = os.path.join(self.dir, 'rules.txt')
+        with open(rule_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return dump_analysis.load_rules(rule_file)
+
+    def test_rules(self):
+        rules = self.load('# comment', '', 'mimikatz = "sekurlsa::logon"', 'mz_stub = { 4d 5a ?? 00 }',
+                          'packed = {4d5a9000}')
+        self.assertEqual([name for name, source in rules], ['mimikatz', 'mz_stub', 'packed'])
+        dump_analysis._init_scanner(rules)
+        module = os.path.join(self.dir, 'a.dll')
+        with open(module, 'wb') as f:
+            f.write(b'MZ\x90\x00 sekurlsa::logon')
+        self.assertEqual(dump_analysis.scan_file(module), ['mimikatz', 'mz_stub', 'packed'])
+
+    def test_invalid_hex_patterns(self):
+        for pattern in ('{ 4d 5 }', '{ 4d5 }', '{ 4? }', '{ ? }', '{ }'):
+            with self.assertRaises(Exception) as context:
+                self.load('mz = "MZ"', 'bad = ' + pattern)
+            self.assertIn('rules.txt:2', str(context.exception))
+
+    def test_invalid_line(self):
+        self.assertRaises(Exception, self.load, 'bad = sekurlsa')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import fetch_vt_reputation
+
+
+class FlaggedRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_flagged_rows(self):
+        file_path = os.path.join(self.dir, 'modules_vt_reputation.csv')
+        with io.open(file_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(u'path,md5,vt_score\r\n'
+                    u'C:\\a.dll,aa,3/70\r\n'
+                    u'C:\\b.dll,bb,0/70\r\n'
+                    u'C:\\c.dll,cc,0\r\n'
+                    u'C:\\d.dll,dd\r\n'
+                    u'"C:\\caf\u00e9, inc\\e.dll",ee,1/68\r\n')
+        rows = fetch_vt_reputation.flagged_rows(file_path)
+        self.assertEqual([row['md5'] for row in rows], ['aa', 'ee'])
+        self.assertEqual(rows[1]['vt_score'], '1/68')
+
+    def test_no_score_column(self):
+        file_path = os.path.join(self.dir, 'modules.csv')
+        with open(file_path, 'w') as f:
+            f.write('path,md5\nC:\\a.dll,aa\n')
+        self.assertEqual(fetch_vt_reputation.flagged_rows(file_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime
+
+from helper_scripts import filetime
+
+# 2019-03-04 05:06:07.123456
+SAMPLE = filetime.from_datetime(datetime(2019, 3, 4, 5, 6, 7, 123456))
+
+
+class FiletimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.numpy = filetime.numpy
+
+    def tearDown(self):
+        filetime.numpy = self.numpy
+
+    def convert(self, function, *args, **kwargs):
+        """ Result of function with and without NumPy, which must agree."""
+        results = []
+        for numpy in (self.numpy, None):
+            filetime.numpy = numpy
+            result = function(*args, **kwargs)
+            results.append([None if value != value else value for value in list(result)])
+        self.assertEqual(results[0], results[1])
+        return results[1]
+
+    def test_from_datetime(self):
+        self.assertEqual(filetime.from_datetime(datetime(1970, 1, 1)), filetime.EPOCH_AS_FILETIME)
+        self.assertEqual(filetime.year_start(1601), 0)
+
+    def test_is_valid(self):
+        self.assertTrue(filetime.is_valid(SAMPLE))
+        self.assertTrue(filetime.is_valid(filetime.MAX_FILETIME))
+        self.assertFalse(filetime.is_valid(filetime.MAX_FILETIME + 1))
+        self.assertFalse(filetime.is_valid(SAMPLE, minimum=SAMPLE + 1))
+
+    def test_to_epoch(self):
+        epoch = self.convert(filetime.to_epoch, [filetime.EPOCH_AS_FILETIME + 15000000, 0], minimum=1)
+        self.assertEqual(epoch, [1.5, None])
+
+    def test_to_datetimes(self):
+        self.assertEqual(self.convert(filetime.to_datetimes, [SAMPLE, 2 ** 64 - 1]),
+                         [datetime(2019, 3, 4, 5, 6, 7, 123456), None])
+
+    def test_to_strings(self):
+        values = [SAMPLE, SAMPLE - 1234560, 0]
+        self.assertEqual(self.convert(filetime.to_strings, values, minimum=1, invalid='N/A'),
+                         ['2019-03-04 05:06:07', '2019-03-04 05:06:07', 'N/A'])
+        self.assertEqual(self.convert(filetime.to_strings, values, microseconds=True, minimum=1),
+                         ['2019-03-04 05:06:07.123456', '2019-03-04 05:06:07', None])
+        self.assertEqual(self.convert(filetime.to_strings, values[:1], "%m/%d/%y %H:%M:%S"),
+                         ['03/04/19 05:06:07'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from helper_scripts import ShimCacheParser, benchmark, hive_reader
+
+CACHE_KEY = 'Control\\Session Manager\\AppCompatCache'
+
+
+class HiveReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data, name='SYSTEM'):
+        file_path = os.path.join(self.dir, name)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
+
+    def hive(self, cache_data, **kwargs):
+        return self.write(benchmark.synthetic_hive(cache_data, **kwargs))
+
+    def test_keys(self):
+        with hive_reader.Hive(self.hive(b'\x01' * 100, services=50)) as hive:
+            root = hive.root()
+            self.assertEqual(root.name, 'ROOT')
+            self.assertEqual([key.name for key in root.subkeys()], ['ControlSet001', 'ControlSet002', 'Select'])
+            key = root.find_key('controlset002\\CONTROL\\session manager\\AppCompatCache')
+            self.assertEqual(key.path, 'ROOT\\ControlSet002\\Control\\Session Manager\\AppCompatCache')
+            self.assertEqual(root.find_key('ControlSet001\\Services\\Service42').name, 'Service42')
+            self.assertIsNone(root.find_key('ControlSet001\\Control\\Missing'))
+            self.assertIsNone(root.find_key('Select\\Missing'))
+            self.assertEqual(len(list(root.find_key('ControlSet001\\Services').subkeys())), 50)
+
+    def test_values(self):
+        with hive_reader.Hive(self.hive(b'', services=3)) as hive:
+            service = hive.root().find_key('ControlSet001\\Services\\Service1')
+            self.assertEqual([value.name for value in service.values()], ['ImagePath', 'Start'])
+            self.assertEqual(service.value('imagepath').data, benchmark.synthetic_path(1))
+            self.assertEqual(service.value('Start').data, struct.pack('<L', 2))
+            self.assertEqual(service.value('Start').type, hive_reader.REG_BINARY)
+            self.assertIsNone(service.value('Missing'))
+            self.assertEqual(list(hive.root().find_key('Select').values()), [])
+            self.assertEqual(hive.root().find_key('ControlSet001\\' + CACHE_KEY).value('AppCompatCache').data, b'')
+
+    def test_data_sizes(self):
+        # Inline, single cell and big data split in 'db' segments
+        for data in (b'\x01\x02\x03', b'\x01' * 4, bytes(bytearray(range(256))) * 20,
+                     os.urandom(hive_reader.BIG_DATA_SEGMENT_SIZE * 3 + 17)):
+            with hive_reader.Hive(self.hive(data, services=0)) as hive:
+                key = hive.root().find_key('ControlSet001\\' + CACHE_KEY)
+                self.assertEqual(key.value('AppCompatCache').data, data)
+
+    def test_not_a_hive(self):
+        for data in (b'', b'regf', b'\x00' * hive_reader.BASE_BLOCK_SIZE * 2):
+            self.assertRaises(hive_reader.HiveError, hive_reader.Hive, self.write(data))
+
+    def test_truncated_hive(self):
+        data = benchmark.synthetic_hive(b'\x01' * 100, services=200)
+        file_path = self.write(data[:len(data) // 2])
+        with hive_reader.Hive(file_path) as hive:
+            self.assertRaises(hive_reader.HiveError, lambda: list(hive.root().subkeys()))
+
+    def test_iter_hive_cache(self):
+        data = benchmark.SYNTHETIC_SHIMCACHE['win10'](10)
+        found = list(ShimCacheParser.iter_hive_cache(self.hive(data, control_sets=2, services=10)))
+        self.assertEqual(found, [('ROOT\\ControlSet001\\' + CACHE_KEY, data),
+                                 ('ROOT\\ControlSet002\\' + CACHE_KEY, data)])
+
+
+if __name__ == '__main__':
+    unittest.main()
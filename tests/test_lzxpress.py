@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+import unittest
+
+from helper_scripts import lzxpress
+
+# Written by fixtures/lzxpress/generate.py and checked against libfwnt
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'lzxpress')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class LzxpressTest(unittest.TestCase):
+
+    def stream(self, name):
+        """ Compressed stream and decompressed size of a MAM fixture."""
+        mam = read_fixture(name + '.mam')
+        signature, size = lzxpress.MAM_HEADER.unpack_from(mam)
+        header_size = lzxpress.MAM_HEADER.size + (4 if signature >> 28 else 0)
+        return mam[header_size:], size
+
+    def test_single_block(self):
+        stream, size = self.stream('single_block')
+        self.assertEqual(bytes(lzxpress.decompress(stream, size)), read_fixture('single_block.bin'))
+        self.assertEqual(bytes(lzxpress.decompress_mam(read_fixture('single_block.mam'))),
+                         read_fixture('single_block.bin'))
+
+    def test_multi_block(self):
+        # Three blocks with 8 and 16 bit match lengths, overlapping matches,
+        # offsets up to 64 KB and runs reaching a block boundary
+        expected = read_fixture('multi_block.bin')
+        stream, size = self.stream('multi_block')
+        self.assertTrue(size > 2 * lzxpress.CHUNK_SIZE)
+        self.assertEqual(bytes(lzxpress.decompress(stream, size)), expected)
+        self.assertEqual(bytes(lzxpress.decompress_mam(read_fixture('multi_block.mam'))), expected)
+
+    def test_crc_mismatch(self):
+        mam = bytearray(read_fixture('multi_block.mam'))
+        mam[-1] ^= 1
+        self.assertRaises(lzxpress.DecompressionError, lzxpress.decompress_mam, bytes(mam))
+
+    def test_invalid_header(self):
+        mam = read_fixture('single_block.mam')
+        self.assertRaises(lzxpress.DecompressionError, lzxpress.decompress_mam, b'MAX' + mam[3:])
+        signature, size = lzxpress.MAM_HEADER.unpack_from(mam)
+        lznt1 = lzxpress.MAM_HEADER.pack((signature & 0xF0FFFFFF) | (2 << 24), size) + mam[8:]
+        self.assertRaises(lzxpress.DecompressionError, lzxpress.decompress_mam, lznt1)
+
+    def test_truncated(self):
+        stream, size = self.stream('multi_block')
+        self.assertRaises(lzxpress.DecompressionError, lzxpress.decompress, stream[:len(stream) // 2], size)
+        self.assertRaises(lzxpress.DecompressionError, lzxpress.decompress, stream[:100], size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from helper_scripts.path_normalizer import PathNormalizer
+
+
+class PathNormalizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = PathNormalizer()
+        self.command_lines = PathNormalizer(strip_arguments=True)
+
+    def test_prefixes_and_variables(self):
+        for path in ('%SystemRoot%\\system32\\x.dll', '\\SystemRoot\\System32\\x.dll',
+                     '\\??\\C:\\Windows\\system32\\x.dll', '\\\\?\\C:\\Windows\\system32\\x.dll',
+                     'system32\\x.dll', 'C:/Windows//System32/x.dll', 'C:\\Windows\\Sysnative\\x.dll',
+                     '%WINDIR%\\system32\\x.dll'):
+            self.assertEqual(self.paths(path), 'c:\\windows\\system32\\x.dll', path)
+        self.assertEqual(self.paths('%ProgramFiles(x86)%\\a\\b.exe'), 'c:\\program files (x86)\\a\\b.exe')
+        self.assertEqual(self.paths('%AppData%\\evil.exe'), '%appdata%\\evil.exe')
+        self.assertEqual(self.paths('C:\\Windows\\SysWOW64\\x.dll'), 'c:\\windows\\syswow64\\x.dll')
+        self.assertEqual(self.paths('\\\\server\\share\\\\a.exe'), '\\\\server\\share\\a.exe')
+
+    def test_environment_override(self):
+        normalizer = PathNormalizer(environment={'SystemRoot': 'D:\\WINNT\\'})
+        self.assertEqual(normalizer('%systemroot%\\x.exe'), 'd:\\winnt\\x.exe')
+
+    def test_paths_keep_dots_spaces_and_commas(self):
+        for path in ('C:\\Program Files\\Node.js Tools\\x.exe', 'C:\\Users\\a\\Report v1.2 final\\tool.exe',
+                     'C:\\Data\\a,b\\x.exe', 'C:\\Tools\\app.exe backup\\app.exe',
+                     'C:\\Windows\\Microsoft.NET\\Framework\\v4.0\\a.exe'):
+            self.assertEqual(self.paths(path), path.lower(), path)
+            self.assertEqual(self.paths('"' + path + '"'), path.lower(), path)
+
+    def test_command_lines(self):
+        cases = [
+            ('"C:\\Program Files\\App\\app.exe" /background', 'c:\\program files\\app\\app.exe'),
+            ('C:\\Windows\\system32\\svchost.exe -k netsvcs', 'c:\\windows\\system32\\svchost.exe'),
+            ('C:\\Windows\\System32\\x.dll,Entry', 'c:\\windows\\system32\\x.dll'),
+            ('"C:\\Windows\\System32\\x.dll",Entry', 'c:\\windows\\system32\\x.dll'),
+            ('@%SystemRoot%\\system32\\shell32.dll,-100', 'c:\\windows\\system32\\shell32.dll'),
+            ('C:\\Program Files\\Node.js Tools\\x.exe', 'c:\\program files\\node.js tools\\x.exe'),
+            ('C:\\Users\\a\\Report v1.2 final\\tool.exe /q', 'c:\\users\\a\\report v1.2 final\\tool.exe'),
+            ('C:\\Data\\a,b\\x.exe', 'c:\\data\\a,b\\x.exe'),
+        ]
+        for command_line, expected in cases:
+            self.assertEqual(self.command_lines(command_line), expected, command_line)
+
+    def test_cache(self):
+        normalizer = PathNormalizer(cache_size=2)
+        normalizer('a.exe')
+        normalizer('b.exe')
+        normalizer('a.exe')
+        normalizer('c.exe')
+        self.assertEqual((normalizer.hits, normalizer.misses), (1, 3))
+        # b.exe was the least recently used entry
+        self.assertEqual(list(normalizer._cache), ['a.exe', 'c.exe'])
+
+    def test_collapsed(self):
+        paths = ['%SystemRoot%\\x.dll', 'C:\\Windows\\x.dll', 'c:\\windows\\x.dll', 'C:\\y.dll', '']
+        self.assertEqual(list(self.paths.normalize_all(paths)),
+                         ['c:\\windows\\x.dll', 'c:\\windows\\x.dll', 'c:\\windows\\x.dll', 'c:\\y.dll'])
+        self.assertEqual(self.paths.collapsed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import benchmark, lzxpress, prefetch
+from tests.test_lzxpress import read_fixture
+
+
+def corrupt_crc(mam):
+    # Flip a byte of the compressed stream behind the CRC
+    mam = bytearray(mam)
+    mam[100] ^= 0xFF
+    return bytes(mam)
+
+
+def reference_strings(raw):
+    return [prefetch._text(i.replace(b"\x00", b"")) for i in raw.split(b"\x00\x00")]
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_strings(self):
+        for raw in (b"", b"\x00\x00", u"A.DLL\x00B.DLL\x00".encode("utf-16-le"),
+                    u"\x00\x00A\x00\xe9\x00".encode("utf-16-le"), u"Ł.DLL\x00".encode("utf-16-le"),
+                    b"A\x00\x00", b"\x00A\x00\x00\x00B", u"\ud800".encode("utf-16-le", "surrogatepass")
+                    if str is not bytes else b"\x00\xd8"):
+            self.assertEqual(prefetch._strings(raw), reference_strings(raw), raw)
+
+    def test_versions(self):
+        for version in sorted(benchmark.SYNTHETIC_LAYOUTS):
+            parsed = prefetch.Prefetch("APP7.EXE-00001007.pf", data=benchmark.synthetic_prefetch(version, 7))
+            self.assertEqual(parsed.executableName, "APP7.EXE")
+            self.assertEqual(parsed.runCount, 7)
+            self.assertEqual(len(parsed.runTimes), 8 if version == 26 else 1)
+            self.assertEqual(parsed.resources[:2], ["\\DEVICE\\HARDDISKVOLUME2\\WINDOWS\\SYSTEM32\\MODULE0.DLL",
+                                                    "\\DEVICE\\HARDDISKVOLUME2\\WINDOWS\\SYSTEM32\\MODULE1.DLL"])
+            self.assertEqual(parsed.directoryStringsArray, [["\\DEVICE\\HARDDISKVOLUME2\\WINDOWS",
+                                                             "\\DEVICE\\HARDDISKVOLUME2\\WINDOWS\\SYSTEM32"]])
+
+    def test_decompression_errors_are_raised(self):
+        decompressor = prefetch.DecompressWin10()
+        self.assertEqual(bytes(decompressor.decompress_buffer(read_fixture('multi_block.mam'))),
+                         read_fixture('multi_block.bin'))
+        for data in (corrupt_crc(read_fixture('multi_block.mam')), b'MAM\x04\x10\x00\x00\x00\x00'):
+            self.assertRaises(lzxpress.DecompressionError, decompressor.decompress_buffer, data)
+            self.assertRaises(lzxpress.DecompressionError, prefetch.Prefetch, 'BROKEN.EXE-00000000.pf', data)
+
+    def test_parse_directory_reports_corrupt_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            files = {'APP1.EXE-00001001.pf': benchmark.synthetic_prefetch(26, 1),
+                     'BROKEN.EXE-00000000.pf': corrupt_crc(read_fixture('multi_block.mam')),
+                     'EMPTY.EXE-00000000.pf': b'',
+                     'APP2.EXE-00001002.pf': benchmark.synthetic_prefetch(23, 2)}
+            for name, data in files.items():
+                with open(os.path.join(directory, name), 'wb') as f:
+                    f.write(data)
+            for workers in (1, 2):
+                records = list(prefetch.parse_directory(directory, workers, chunksize=1))
+                self.assertEqual([record.filename for record in records], sorted(files))
+                self.assertEqual([record.executable for record in records], ['APP1.EXE', 'APP2.EXE', None, None])
+                self.assertTrue(records[2].error.startswith('MAM decompression failed: Wrong file CRC'),
+                                records[2].error)
+                self.assertEqual(records[3].error, 'Zero-byte Prefetch file')
+        finally:
+            shutil.rmtree(directory)
+
+    def test_timestamps_only(self):
+        parsed = prefetch.Prefetch("APP1.EXE-00001001.pf", data=benchmark.synthetic_prefetch(26, 1),
+                                   fields=prefetch.TIMESTAMP_FIELDS)
+        self.assertEqual(parsed.runTimes, [131000000001000000 + i for i in range(8)])
+        self.assertEqual(parsed.resources, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import benchmark, prefetch_timeline
+from tests.test_lzxpress import read_fixture
+from tests.test_prefetch import corrupt_crc
+
+# Version 26 prefetch files hold eight run times, older ones one
+HOSTS = {'host-a': [(26, 1), (23, 3)], 'host-b': [(26, 2), (17, 4)]}
+
+
+def run_times(version, index):
+    return [131000000000000000 + index * 1000000 + i for i in range(8 if version == 26 else 1)]
+
+
+class PrefetchTimelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.hosts = []
+        self.events = []
+        for host in sorted(HOSTS):
+            directory = os.path.join(self.dir, 'prefetch', host)
+            # A file carved again by a later sweep yields the same runs
+            os.makedirs(os.path.join(directory, 'sweep2'))
+            for version, index in HOSTS[host]:
+                name = 'APP{0}.EXE-{1:08X}.pf'.format(index, 0x1000 + index)
+                for sub_dir in ('', 'sweep2'):
+                    with open(os.path.join(directory, sub_dir, name), 'wb') as f:
+                        f.write(benchmark.synthetic_prefetch(version, index))
+                self.events.extend((timestamp, host, name[:-3]) for timestamp in run_times(version, index))
+            self.hosts.append((host, directory))
+        self.run_dir = os.path.join(self.dir, 'runs')
+        os.makedirs(self.run_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, run_path, reverse=True):
+        return [event[1:] for event in prefetch_timeline.read_run(run_path, reverse)]
+
+    def test_host_run(self):
+        host, directory = self.hosts[0]
+        expected = sorted([event for event in self.events if event[1] == host], reverse=True)
+        found_host, run_path, count, errors = prefetch_timeline.host_run(
+            (host, directory, self.run_dir, None, None, True))
+        self.assertEqual((found_host, count, errors), (host, 9, []))
+        self.assertEqual(self.read(run_path), expected)
+
+        start, end = expected[6][0], expected[1][0]
+        run_path = prefetch_timeline.host_run((host, directory, self.run_dir, start, end, False))[1]
+        self.assertEqual(self.read(run_path, False), sorted(expected[2:7]))
+
+    def test_unparsable_file(self):
+        host, directory = self.hosts[1]
+        with open(os.path.join(directory, 'BROKEN.EXE-00000000.pf'), 'wb') as f:
+            f.write(corrupt_crc(read_fixture('multi_block.mam')))
+        found_host, run_path, count, errors = prefetch_timeline.host_run(
+            (host, directory, self.run_dir, None, None, True))
+        self.assertEqual(count, 9)
+        self.assertEqual([os.path.basename(file_path) for file_path, error in errors], ['BROKEN.EXE-00000000.pf'])
+
+        reported = []
+        events = list(prefetch_timeline.build_timeline(self.hosts, workers=2, run_dir=self.run_dir,
+                                                       on_host=lambda *args: reported.append(args)))
+        self.assertEqual(events, sorted(self.events, reverse=True))
+        self.assertEqual([(host, count, len(errors)) for host, count, errors in reported],
+                         [('host-a', 9, 0), ('host-b', 9, 1)])
+
+    def test_merge_across_hosts(self):
+        for reverse in (True, False):
+            events = list(prefetch_timeline.build_timeline(self.hosts, reverse=reverse, workers=2,
+                                                           run_dir=self.run_dir))
+            self.assertEqual(events, sorted(self.events, key=lambda event: event[0], reverse=reverse))
+            self.assertEqual(set(host for timestamp, host, executable in events[:9]), set(HOSTS))
+        self.assertEqual(os.listdir(self.run_dir), [])
+
+    def test_reduce_runs(self):
+        run_paths = []
+        for i in range(5):
+            run_path = prefetch_timeline.new_run(self.run_dir)
+            prefetch_timeline.write_run(run_path, sorted(self.events[i::5], reverse=True))
+            run_paths.append(run_path)
+        reduced = prefetch_timeline.reduce_runs(run_paths, self.run_dir, True, max_open=2)
+        self.assertEqual(len(reduced), 2)
+        self.assertEqual(sorted(os.path.join(self.run_dir, name) for name in os.listdir(self.run_dir)),
+                         sorted(reduced))
+        self.assertEqual(list(prefetch_timeline.merge_runs(reduced, True)), sorted(self.events, reverse=True))
+        self.assertEqual(prefetch_timeline.reduce_runs(reduced, self.run_dir, True, max_open=2), reduced)
+
+
+if __name__ == '__main__':
+    unittest.main()
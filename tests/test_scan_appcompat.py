@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import ShimCacheParser, benchmark, fetch_vt_reputation, snapshot_store
+from scripts.v1.advance_scripts import fetch_hash_from_path, scan_appcompat, signature_pruner
+
+CREDS = {'domain': 'server', 'username': 'admin', 'password': 'secret', 'vt_api_key': 'vt-key'}
+
+
+class AnalyseAppcompatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.bin_data = benchmark.SYNTHETIC_SHIMCACHE['win10'](5)
+        self.hashed = []
+        self.scored = []
+        self.all_signed = False
+        self.patched = [(fetch_hash_from_path, 'main_for_paths', self.main_for_paths),
+                        (fetch_vt_reputation, 'main', self.vt_main),
+                        (signature_pruner, 'prune_signed', self.prune_signed)]
+        for module, name, replacement in self.patched:
+            setattr(self, name + '_original', getattr(module, name))
+            setattr(module, name, replacement)
+
+    def tearDown(self):
+        for module, name, replacement in self.patched:
+            setattr(module, name, getattr(self, name + '_original'))
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def main_for_paths(self, domain, username, password, host_identifier, paths, output_path, limit=None):
+        paths = list(fetch_hash_from_path.unique(paths, limit))
+        self.hashed.append(paths)
+        return output_path if paths else None
+
+    def vt_main(self, vt_api_key, file_path):
+        self.scored.append(vt_api_key)
+        return file_path + '.vt'
+
+    def prune_signed(self, polylogyx_api, host_identifier, paths, store_dir):
+        return [] if self.all_signed else list(paths)
+
+    def analyse(self, **kwargs):
+        return scan_appcompat.analyse_appcompat(self.bin_data, os.path.join(self.dir, 'hash.csv'), 'host', CREDS,
+                                                **kwargs)
+
+    def test_settings_are_parameters(self):
+        self.assertEqual(self.analyse(limit=2), os.path.join(self.dir, 'hash.csv.vt'))
+        self.assertEqual(len(self.hashed[0]), 2)
+        self.assertEqual(self.scored, ['vt-key'])
+
+    def snapshot(self):
+        return snapshot_store.load_snapshot(os.path.join(self.dir, 'appcompat'), 'host', scan_appcompat.SNAPSHOT_NAME)
+
+    def test_pruned_delta_advances_the_snapshot(self):
+        paths = [record.path for record in ShimCacheParser.parse_appcompat(self.bin_data)]
+        self.all_signed = True
+        self.assertIsNone(self.analyse(incremental=True, prune_signed=True))
+        self.assertEqual(sorted(self.snapshot()), sorted(paths))
+        # The next sweep has no delta left and does not query again
+        self.assertIsNone(self.analyse(incremental=True, prune_signed=True))
+        self.assertEqual(len(self.hashed), 1)
+
+    def test_failed_sweep_keeps_the_snapshot(self):
+        def failing(vt_api_key, file_path):
+            raise IOError('VirusTotal is unreachable')
+        fetch_vt_reputation.main = failing
+        self.assertRaises(IOError, self.analyse, incremental=True)
+        self.assertEqual(self.snapshot(), {})
+        fetch_vt_reputation.main = self.vt_main
+        self.analyse(incremental=True)
+        self.assertEqual(len(self.hashed[1]), 5)
+        self.assertEqual(len(self.snapshot()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import snapshot_store
+from scripts.v1.advance_scripts import scan_autoruns
+
+RUN_QUERY = ("select key, name, data, type from registry where key like "
+             "'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run%';")
+CLSID_QUERY = scan_autoruns.AUTORUN_QUERIES['clsid'][0]
+
+
+def row(key, name, data):
+    return {'key': key, 'name': name, 'data': data}
+
+
+class ChangedAutorunsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.parser = scan_autoruns.PathParser()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def sweep(self, entries, limit=None, failed=()):
+        hashes, current = scan_autoruns.changed_autoruns(entries, 'host', self.store_dir, self.parser, limit, failed)
+        snapshot_store.save_snapshot(self.store_dir, 'host', scan_autoruns.SNAPSHOT_NAME, current)
+        return [hash['path'] for hash in hashes], current
+
+    def test_delta(self):
+        run_key = 'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run'
+        entries = [('Logon', row(run_key, 'a', 'C:\\a.exe')), ('Logon', row(run_key, 'b', 'C:\\b.exe /x'))]
+        self.assertEqual(self.sweep(entries)[0], ['C:\\a.exe', 'C:\\b.exe'])
+        self.assertEqual(self.sweep(entries)[0], [])
+        entries[1] = ('Logon', row(run_key, 'b', 'C:\\evil.exe'))
+        paths, current = self.sweep(entries[1:])
+        self.assertEqual(paths, ['C:\\evil.exe'])
+        self.assertEqual(len(current), 1)
+
+    def test_limit_defers_entries(self):
+        entries = [('Logon', row('k', name, 'C:\\{0}.exe'.format(name))) for name in 'abc']
+        self.assertEqual(self.sweep(entries, limit=2)[0], ['C:\\a.exe', 'C:\\b.exe'])
+        self.assertEqual(self.sweep(entries, limit=2)[0], ['C:\\c.exe'])
+
+    def test_failed_queries_keep_their_entries(self):
+        run_key = 'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run'
+        clsid_key = 'HKEY_CLASSES_ROOT\\CLSID\\{0A1B}\\InProcServer32'
+        other_clsid_key = 'HKEY_CLASSES_ROOT\\CLSID\\{F00D}\\InProcServer32'
+        entries = [('Logon', row(run_key, 'a', 'C:\\a.exe')),
+                   ('clsid', row(clsid_key, '(Default)', 'C:\\com.dll')),
+                   ('clsid', row(other_clsid_key, '(Default)', 'C:\\other.dll'))]
+        self.sweep(entries)
+
+        chunks = scan_autoruns.chunk_queries(CLSID_QUERY, *scan_autoruns.CHUNKED_QUERIES['clsid'])
+        # The Run query and the {0 chunk failed, the {F chunk returned nothing
+        failed = [('Logon', RUN_QUERY), ('clsid', chunks[0])]
+        paths, current = self.sweep([], failed=failed)
+        self.assertEqual(paths, [])
+        self.assertEqual(sorted(current), sorted(scan_autoruns.entry_key(name, entry) for name, entry in entries[:2]))
+        # Nothing is rescanned once the queries work again
+        self.assertEqual(self.sweep(entries[:2])[0], [])
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_query_matches(self):
+        query = "select key, name, data from registry where key like 'HKEY_LOCAL_MACHINE\\Svc%%' and name='ImagePath';"
+        self.assertTrue(scan_autoruns.query_matches(query, 'hkey_local_machine\\Svc\\x', 'ImagePath'))
+        self.assertFalse(scan_autoruns.query_matches(query, 'HKEY_LOCAL_MACHINE\\Svc\\x', 'Start'))
+        self.assertFalse(scan_autoruns.query_matches(query, 'HKEY_LOCAL_MACHINE\\Other', 'ImagePath'))
+
+    def test_chunk_queries(self):
+        chunks = scan_autoruns.chunk_queries(CLSID_QUERY, *scan_autoruns.CHUNKED_QUERIES['clsid'])
+        self.assertEqual(len(chunks), 17)
+        key = 'HKEY_CLASSES_ROOT\\CLSID\\{AB}\\InProcServer32'
+        self.assertEqual([chunk for chunk in chunks if scan_autoruns.query_matches(chunk, key, '(Default)')],
+                         [chunks[10]])
+        key = 'HKEY_CLASSES_ROOT\\CLSID\\Other\\InProcServer32'
+        self.assertEqual([chunk for chunk in chunks if scan_autoruns.query_matches(chunk, key, '(Default)')],
+                         [chunks[-1]])
+        self.assertEqual(scan_autoruns.chunk_queries(RUN_QUERY, 'HKEY_CLASSES_ROOT\\CLSID\\', ['{0']), [RUN_QUERY])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import dump_analysis
+from scripts.v1.advance_scripts import scan_process_modules
+
+
+class AnalyseDumpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name, data in (('a.dll', b'MZ sekurlsa::logonpasswords'), ('b.dll', b'MZ'), ('a.dll.tag', b'')):
+            with open(os.path.join(self.dir, name), 'wb') as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_settings_are_parameters(self):
+        rules = [('mimikatz', b'sekurlsa::logonpasswords')]
+        calls = []
+        analyse_modules = dump_analysis.analyse_modules
+
+        def recording(*args):
+            calls.append(args[1:])
+            return analyse_modules(*args)
+        dump_analysis.analyse_modules = recording
+        try:
+            scan_process_modules.analyse_dump(self.dir, {'process_name': 'lsass.exe'}, rules=rules,
+                                              hash_workers=1, scan_workers=1)
+        finally:
+            dump_analysis.analyse_modules = analyse_modules
+        self.assertEqual(calls, [(rules, 1, 1)])
+        with open(os.path.join(self.dir, 'modules.csv')) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(',mimikatz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from helper_scripts import ShimCacheParser
+
+# Two FILETIMEs a tenth of a second apart, within the same second
+FIRST = 131962383671234560
+SECOND = FIRST + 1000000
+
+# Written by fixtures/shimcache/generate.py, the expected CSV files are the
+# output of the parser on Python 2
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'shimcache')
+
+# Expected CSV file, command line and input fixture, IN stands for the input
+CASES = [(name + '.csv', ['-b', 'IN'], name + '.bin') for name in
+         ['nt5_32', 'nt5_64', 'nt6_32', 'nt6_64', 'win10', 'win10_creators', 'win8', 'win81', 'winxp']] + [
+    ('win10_iso_bom.csv', ['-t', '-B', '-b', 'IN'], 'win10.bin'),
+    ('SYSTEM_win10.csv', ['-i', 'IN'], 'SYSTEM_win10'),
+    ('SYSTEM_winxp.csv', ['-t', '-i', 'IN'], 'SYSTEM_winxp'),
+    ('nt6_64_reg.csv', ['-r', 'IN'], 'nt6_64.reg'),
+    ('winxp_reg.csv', ['-t', '-r', 'IN'], 'winxp.reg'),
+]
+
+
+def run_parser(args, input_path, output_path, python=sys.executable):
+    """ Run the ShimCacheParser command line in a new process, the options are
+        module globals of the parser.
+    """
+    script = os.path.splitext(ShimCacheParser.__file__)[0] + '.py'
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call([python, script] + [input_path if arg == 'IN' else arg for arg in args] +
+                              ['-o', output_path], stdout=devnull)
+
+
+class RowDeduplicatorTest(unittest.TestCase):
+
+    def test_dates_compared_to_the_second(self):
+        for streaming in (False, True):
+            rows = [[FIRST, 'N/A', 'C:\\a.exe', 'N/A', 'True'],
+                    [SECOND, 'N/A', 'C:\\a.exe', 'N/A', 'True'],
+                    [FIRST + 10000000, 'N/A', 'C:\\a.exe', 'N/A', 'True'],
+                    [FIRST, 'N/A', 'C:\\b.exe', 'N/A', 'True']]
+            unique = list(ShimCacheParser.RowDeduplicator(streaming).filter(rows))
+            self.assertEqual(unique, [rows[0], rows[2], rows[3]])
+
+    def test_other_integer_columns_are_exact(self):
+        rows = [[FIRST, SECOND, 'C:\\a.exe', 1234, 'N/A'], [FIRST, SECOND, 'C:\\a.exe', 5678, 'N/A'],
+                [SECOND, FIRST, 'C:\\a.exe', 1234, 'N/A']]
+        self.assertEqual(ShimCacheParser.unique_list(rows), [rows[0], rows[1]])
+        zip_rows = [['host'] + row for row in rows]
+        deduplicator = ShimCacheParser.RowDeduplicator(date_columns=ShimCacheParser.ZIP_DATE_COLUMNS)
+        self.assertEqual(list(deduplicator.filter(zip_rows)), [zip_rows[0], zip_rows[1]])
+
+    def test_winxp_entries_differing_in_size(self):
+        data = struct.pack('<LLL', ShimCacheParser.WINXP_MAGIC32, 0, 2).ljust(ShimCacheParser.WINXP_HEADER_SIZE32,
+                                                                           b'\x00')
+        for size in (1234, 5678):
+            data += u'C:\\a.exe\x00'.encode('utf-16-le').ljust(ShimCacheParser.MAX_PATH + 8, b'\x00')
+            data += struct.pack('<QQQ', FIRST, size, SECOND)
+        rows = ShimCacheParser.read_winxp_entries(data)
+        self.assertEqual([row[3] for row in rows], [1234, 5678])
+
+    def test_formatted_rows(self):
+        rows = [['2019-03-04 05:06:07', 'C:\\a.exe'], ['2019-03-04 05:06:07', 'C:\\a.exe']]
+        self.assertEqual(ShimCacheParser.unique_list(rows), rows[:1])
+
+
+class ParserOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def outputs(self, python=sys.executable):
+        for output, args, name in CASES:
+            output_path = os.path.join(self.dir, output)
+            run_parser(args, os.path.join(FIXTURES, name), output_path, python)
+            with open(output_path, 'rb') as f:
+                yield output, f.read()
+
+    def test_expected_csv(self):
+        # Byte for byte the CSV files of the Python 2 parser
+        for output, data in self.outputs():
+            with open(os.path.join(FIXTURES, 'expected', output), 'rb') as f:
+                self.assertEqual(data, f.read(), output)
+
+    @unittest.skipUnless(os.environ.get('PYTHON2'), 'PYTHON2 is not set to a Python 2 interpreter')
+    def test_python2_output(self):
+        python2 = dict(self.outputs(os.environ['PYTHON2']))
+        for output, data in self.outputs():
+            self.assertEqual(data, python2[output], output)
+
+
+if __name__ == '__main__':
+    unittest.main()
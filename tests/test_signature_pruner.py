@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import re
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import snapshot_store
+from scripts.v1.advance_scripts import signature_pruner
+
+DAY = 24 * 3600
+
+
+class Connection(object):
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def recv(self):
+        return repr({'data': self.rows}).encode('utf8')
+
+
+class FakeApi(object):
+    """ Answers the file and authenticode queries from dicts keyed by path."""
+
+    def __init__(self, files, signatures):
+        self.files = files
+        self.signatures = signatures
+        self.queries = []
+        self.fail_authenticode = False
+
+    def send_distributed_query(self, sql, tags, host_identifiers):
+        self.queries.append(sql)
+        return {'results': {'data': {'query_id': len(self.queries)}}}
+
+    def get_distributed_query_results(self, query_id):
+        sql = self.queries[query_id - 1]
+        paths = [path.replace("''", "'") for path in re.findall(r"'((?:[^']|'')*)'", sql)]
+        if ' from file ' in sql:
+            return Connection([dict(path=path, size=self.files[path][0], mtime=self.files[path][1])
+                               for path in paths if path in self.files])
+        if self.fail_authenticode:
+            raise IOError("timed out")
+        return Connection([dict(path=path, result=self.signatures[path][0], subject_name=self.signatures[path][1])
+                           for path in paths if path in self.signatures])
+
+
+class PruneSignedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.api = FakeApi(
+            files={'c:\\windows\\a.dll': ('10', '100'), 'c:\\evil.exe': ('5', '7'), "c:\\o'brien.exe": ('1', '1'),
+                   'c:\\unsigned.exe': ('3', '9')},
+            signatures={'c:\\windows\\a.dll': ('trusted', 'Microsoft Windows'),
+                        'c:\\evil.exe': ('trusted', 'Evil Inc'), "c:\\o'brien.exe": ('distrusted', 'Microsoft Windows'),
+                        'c:\\unsigned.exe': ('nosignature', '')})
+        self.paths = ['c:\\windows\\a.dll', 'C:\\Windows\\A.dll', 'c:\\evil.exe', "c:\\o'brien.exe",
+                      'c:\\unsigned.exe', 'c:\\missing.exe']
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def prune(self, now=1000 * DAY):
+        return signature_pruner.prune_signed(self.api, 'host', self.paths, self.store_dir, now=now)
+
+    def cache(self):
+        return snapshot_store.load_snapshot(self.store_dir, 'host', signature_pruner.CACHE_NAME)
+
+    def authenticode_queries(self):
+        return len([sql for sql in self.api.queries if 'authenticode' in sql])
+
+    def test_prune_and_cache(self):
+        expected = ['c:\\evil.exe', "c:\\o'brien.exe", 'c:\\unsigned.exe', 'c:\\missing.exe']
+        self.assertEqual(self.prune(), expected)
+        self.assertEqual(self.authenticode_queries(), 1)
+        self.assertEqual(self.prune(), expected)
+        self.assertEqual(self.authenticode_queries(), 1)
+
+        # A modified file is checked again
+        self.api.files['c:\\windows\\a.dll'] = ('11', '200')
+        self.api.signatures['c:\\windows\\a.dll'] = ('unsigned', '')
+        self.assertEqual(self.prune(), ['c:\\windows\\a.dll'] + expected)
+        self.assertEqual(self.authenticode_queries(), 2)
+
+    def test_failed_batches_are_not_cached(self):
+        self.api.fail_authenticode = True
+        self.assertEqual(len(self.prune()), 5)
+        self.assertEqual(self.cache(), {})
+        self.api.fail_authenticode = False
+        self.assertEqual(len(self.prune()), 4)
+        self.assertEqual(len(self.cache()), 4)
+
+    def test_eviction(self):
+        self.prune()
+        self.assertEqual(len(self.cache()), 4)
+        # Gone files are dropped at once
+        del self.api.files['c:\\evil.exe']
+        self.prune(1001 * DAY)
+        self.assertNotIn('c:\\evil.exe', self.cache())
+        # Entries no sweep asked about for CACHE_MAX_AGE are dropped
+        self.paths = ['c:\\unsigned.exe']
+        signature_pruner.prune_signed(self.api, 'host', self.paths, self.store_dir,
+                                      now=1001 * DAY + signature_pruner.CACHE_MAX_AGE - 1)
+        self.assertEqual(len(self.cache()), 3)
+        signature_pruner.prune_signed(self.api, 'host', self.paths, self.store_dir,
+                                      now=1001 * DAY + signature_pruner.CACHE_MAX_AGE + 1)
+        self.assertEqual(list(self.cache()), ['c:\\unsigned.exe'])
+
+
+if __name__ == '__main__':
+    unittest.main()
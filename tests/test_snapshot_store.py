@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from helper_scripts import snapshot_store
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def test_round_trip(self):
+        entries = {'a.pf': [1, 'x'], 'b.pf': [2, 'y']}
+        file_path = snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', entries)
+        self.assertEqual(file_path, os.path.join(self.store_dir, 'host1', 'prefetch.json'))
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), entries)
+        self.assertFalse(os.path.exists(file_path + '.tmp'))
+
+    def test_overwrite(self):
+        snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'a.pf': [1]})
+        snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'b.pf': [2]})
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), {'b.pf': [2]})
+
+    def test_overwrite_is_atomic(self):
+        snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'a.pf': [1]})
+        remove = os.remove
+        os.remove = None
+        try:
+            snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'b.pf': [2]})
+        finally:
+            os.remove = remove
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), {'b.pf': [2]})
+
+    def test_hosts_are_separate(self):
+        snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'a.pf': [1]})
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host2', 'prefetch'), {})
+
+    def test_missing_corrupt_or_other_version(self):
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), {})
+        file_path = snapshot_store.save_snapshot(self.store_dir, 'host1', 'prefetch', {'a.pf': [1]})
+        with open(file_path, 'w') as f:
+            f.write('{"version": 1, "entries": {')
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), {})
+        with open(file_path, 'w') as f:
+            json.dump({'version': snapshot_store.SNAPSHOT_VERSION + 1, 'entries': {'a.pf': [1]}}, f)
+        self.assertEqual(snapshot_store.load_snapshot(self.store_dir, 'host1', 'prefetch'), {})
+
+    def test_diff(self):
+        previous = {'same': [1, 2], 'changed': [1, 2], 'removed': [1]}
+        current = {'same': (1, 2), 'changed': [1, 3], 'added': [4], 'added2': [5]}
+        self.assertEqual(snapshot_store.diff_snapshots(previous, current),
+                         (['added', 'added2'], ['changed'], ['removed']))
+        self.assertEqual(snapshot_store.diff_snapshots({}, {}), ([], [], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
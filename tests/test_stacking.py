@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+from helper_scripts import benchmark, stacking
+
+
+def write_csv(file_path, rows):
+    directory = os.path.dirname(file_path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(file_path, 'w') as f:
+        writer = csv.writer(f)
+        for row in rows:
+            writer.writerow(row)
+
+
+class CounterTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.keys = [('autoruns', 'c:\\x{0}.exe'.format(int(rng.paretovariate(1.2)))) for i in range(5000)]
+        self.exact = stacking.ExactCounter()
+        for key in self.keys:
+            self.exact.add(key)
+
+    def test_sketch_never_underestimates(self):
+        sketch = stacking.SketchCounter(width=64, depth=4, heavy_hitters=5)
+        for key in self.keys:
+            sketch.add(key)
+        self.assertEqual(sketch.total, self.exact.total)
+        for key in set(self.keys):
+            self.assertGreaterEqual(sketch.estimate(key), self.exact.estimate(key))
+        self.assertEqual(len(sketch), 5)
+        self.assertEqual(sketch.heavy_hitters(1)[0][0], self.exact.heavy_hitters(1)[0][0])
+
+    def test_wide_sketch_is_exact(self):
+        sketch = stacking.SketchCounter(width=1 << 16)
+        for key in self.keys:
+            sketch.add(key)
+        for key in set(self.keys):
+            self.assertEqual(sketch.estimate(key), self.exact.estimate(key))
+        self.assertEqual(sketch.heavy_hitters(5), self.exact.heavy_hitters(5))
+
+    def test_rarest(self):
+        expected = sorted(self.exact.counts.items(), key=lambda item: (item[1], item[0]))
+        self.assertEqual(stacking.rarest(self.exact, self.keys), expected)
+        for limit in (1, 3, 10):
+            self.assertEqual(stacking.rarest(self.exact, self.keys, limit=limit), expected[:limit])
+        self.assertEqual(stacking.rarest(self.exact, self.keys, threshold=2),
+                         [item for item in expected if item[1] <= 2])
+
+    def test_stack_counts_hosts(self):
+        counter = stacking.ExactCounter()
+        hosts = [('a', [('autoruns', 'x'), ('autoruns', 'x'), ('prefetch', 'y')]), ('b', [('autoruns', 'x')])]
+        self.assertEqual(stacking.stack(hosts, counter), 2)
+        self.assertEqual(counter.estimate(('autoruns', 'x')), 2)
+        self.assertEqual(counter.estimate(('prefetch', 'y')), 1)
+
+
+class FleetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        autoruns = os.path.join(self.dir, 'autoruns')
+        appcompat = os.path.join(self.dir, 'appcompat')
+        prefetch = os.path.join(self.dir, 'prefetch')
+        for host in ('host1', 'host2', 'host3'):
+            write_csv(os.path.join(autoruns, host, 'autorun.csv'),
+                      [['name', 'path'], ['Run', '%SystemRoot%\\system32\\common.exe'],
+                       ['Run', 'C:\\Windows\\System32\\COMMON.exe']])
+            write_csv(os.path.join(appcompat, host, 'appcompat.csv'),
+                      [['Last Modified', 'Path'], ['', 'c:\\tools\\shared.exe']])
+        write_csv(os.path.join(autoruns, 'host2', 'autorun.csv'),
+                  [['name', 'path'], ['Run', 'c:\\windows\\system32\\common.exe'],
+                   ['Services', 'C:\\Users\\a\\evil.exe'], ['Run', '']])
+        write_csv(os.path.join(appcompat, 'host3', 'appcompat.csv'),
+                  [['Last Modified', 'Path'], ['', 'c:\\tools\\shared.exe'], ['Last Modified', 'Path'],
+                   ['', 'c:\\temp\\dropper.exe']])
+        os.makedirs(os.path.join(prefetch, 'host1'))
+        with open(os.path.join(prefetch, 'host1', 'APP7.EXE-00001007.pf'), 'wb') as f:
+            f.write(benchmark.synthetic_prefetch(23, 7))
+        with open(os.path.join(prefetch, 'host1', 'BROKEN.EXE-00000000.pf'), 'wb') as f:
+            f.write(b'\x00' * 100)
+        self.roots = [autoruns, appcompat, prefetch]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_fleet(self):
+        hosts = stacking.fleet(self.roots)
+        self.assertEqual([host for host, directories in hosts], ['host1', 'host2', 'host3'])
+        self.assertEqual(len(hosts[0][1]), 3)
+        self.assertEqual(len(hosts[1][1]), 2)
+
+    def test_host_keys(self):
+        errors = []
+        keys = list(stacking.host_keys(dict(stacking.fleet(self.roots))['host1'], errors))
+        self.assertEqual(keys, [('Run', 'c:\\windows\\system32\\common.exe'),
+                                ('Run', 'c:\\windows\\system32\\common.exe'),
+                                ('appcompat', 'c:\\tools\\shared.exe'),
+                                ('prefetch', 'app7.exe')])
+        self.assertEqual([os.path.basename(file_path) for file_path, error in errors], ['BROKEN.EXE-00000000.pf'])
+
+    def test_main(self):
+        for sketch in ([], ['--sketch', '--width', '4096']):
+            output = os.path.join(self.dir, 'rare.csv')
+            stderr = sys.stderr
+            sys.stderr = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+            try:
+                stacking.main(self.roots + ['--threshold', '2', '-o', output] + sketch)
+            finally:
+                sys.stderr = stderr
+            with open(output) as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows, [['hosts', 'category', 'path'],
+                                    ['1', 'Services', 'c:\\users\\a\\evil.exe'],
+                                    ['1', 'appcompat', 'c:\\temp\\dropper.exe'],
+                                    ['1', 'prefetch', 'app7.exe']], sketch)
+
+
+if __name__ == '__main__':
+    unittest.main()
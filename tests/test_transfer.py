@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from scripts.v1.polylogyx_apis import transfer
+
+
+class FakeTime(object):
+    """ Clock advanced by sleep only."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.001)
+
+
+class TransferSchedulerTest(unittest.TestCase):
+
+    def start(self, scheduler, priority, granted):
+        def run():
+            scheduler.acquire(priority)
+            granted.append(priority)
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def test_priority_order(self):
+        scheduler = transfer.TransferScheduler(max_transfers=1)
+        granted = []
+        scheduler.acquire(transfer.PRIORITY_INTERACTIVE)
+        self.start(scheduler, transfer.PRIORITY_BATCH, granted)
+        wait_for(lambda: len(scheduler.waiting) == 1)
+        self.start(scheduler, transfer.PRIORITY_INTERACTIVE, granted)
+        wait_for(lambda: len(scheduler.waiting) == 2)
+        for expected in ([transfer.PRIORITY_INTERACTIVE],
+                         [transfer.PRIORITY_INTERACTIVE, transfer.PRIORITY_BATCH]):
+            scheduler.release()
+            wait_for(lambda: granted == expected)
+            self.assertEqual(scheduler.active, 1)
+        self.assertEqual(scheduler.waiting, [])
+
+    def test_max_transfers(self):
+        scheduler = transfer.TransferScheduler(max_transfers=2)
+        granted = []
+        threads = [self.start(scheduler, transfer.PRIORITY_BATCH, granted) for i in range(3)]
+        wait_for(lambda: len(granted) == 2 and len(scheduler.waiting) == 1)
+        self.assertEqual(scheduler.active, 2)
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual((len(granted), scheduler.active, scheduler.waiting), (3, 2, []))
+
+    def test_interrupted_wait(self):
+        scheduler = transfer.TransferScheduler(max_transfers=1)
+        granted = []
+        scheduler.acquire(transfer.PRIORITY_BATCH)
+        thread = self.start(scheduler, transfer.PRIORITY_BATCH, granted)
+        wait_for(lambda: len(scheduler.waiting) == 1)
+
+        wait = scheduler.condition.wait
+        main = threading.current_thread()
+
+        def interrupted_wait(*args):
+            if threading.current_thread() is main:
+                raise KeyboardInterrupt()
+            return wait(*args)
+        scheduler.condition.wait = interrupted_wait
+        # The interrupted ticket is ahead of the waiting batch transfer
+        self.assertRaises(KeyboardInterrupt, scheduler.acquire, transfer.PRIORITY_INTERACTIVE)
+        self.assertEqual(len(scheduler.waiting), 1)
+        scheduler.release()
+        thread.join(5)
+        self.assertEqual((granted, scheduler.active, scheduler.waiting), ([transfer.PRIORITY_BATCH], 1, []))
+
+    def test_reporting_is_opt_in(self):
+        reports = []
+        scheduler = transfer.TransferScheduler()
+        with scheduler.transfer('quiet') as t:
+            t.throttle(10)
+        scheduler.configure(reporter=reports.append)
+        with scheduler.transfer('reported') as t:
+            t.throttle(10)
+        self.assertEqual([report.name for report in reports], ['reported'])
+        self.assertEqual((reports[0].bytes, scheduler.active), (10, 0))
+        self.assertIn('Transfer reported: ', str(reports[0]))
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeTime()
+        self.clock, self.time = transfer._clock, transfer.time
+        transfer._clock, transfer.time = self.fake.clock, self.fake
+
+    def tearDown(self):
+        transfer._clock, transfer.time = self.clock, self.time
+
+    def test_consume(self):
+        bucket = transfer.TokenBucket(100)
+        bucket.consume(100)
+        self.assertEqual(self.fake.sleeps, [])
+        bucket.consume(50)
+        self.assertEqual(self.fake.sleeps, [0.5])
+
+    def test_larger_than_capacity(self):
+        bucket = transfer.TokenBucket(100, capacity=50)
+        bucket.consume(200)
+        self.assertEqual(self.fake.now, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()